@@ -13,6 +13,18 @@ class Settings(BaseSettings):
     # Server
     port: int = 8000
 
+    # Logging: records below LOG_LEVEL are skipped before formatting; a background thread writes the rest
+    log_level: Literal["debug", "info", "threat", "warn", "error"] = "info"
+    log_format: Literal["text", "json"] = "text"
+    log_async: bool = True
+    log_queue_size: int = 10_000  # records waiting for the writer; further records are dropped and counted
+
+    # Request tracing: sampled /analyze traces are appended as OTLP/JSON lines (empty path = no export)
+    trace_export_path: str = ""
+    trace_sample_rate: float = 0.01  # share of requests exported; X-Sentinel-Trace requests always are
+    trace_export_max_mb: int = 50  # rotate the file beyond this size
+    trace_export_backups: int = 3
+
     # LLM Provider: "openai", "gemini", or "groq"
     llm_provider: Literal["openai", "gemini", "groq"] = "openai"
 
@@ -20,6 +32,7 @@ class Settings(BaseSettings):
     openai_api_key: str = ""
     openai_model: str = "gpt-4o"
     embedding_model: str = "text-embedding-3-small"
+    openai_base_url: str = ""  # any OpenAI-compatible endpoint (gateway, local stub); empty = api.openai.com
 
     # Google Gemini
     gemini_api_key: str = ""
@@ -28,12 +41,62 @@ class Settings(BaseSettings):
     # Groq (free, fast inference)
     groq_api_key: str = ""
     groq_model: str = "llama-3.3-70b-versatile"
+    groq_base_url: str = ""  # empty = Groq's public endpoint
+
+    # Provider HTTP pool (shared keep-alive connections)
+    llm_pool_max_connections: int = 100
+    llm_pool_max_keepalive: int = 20
+    llm_pool_keepalive_seconds: float = 30.0
+    llm_timeout_seconds: float = 60.0
+    gemini_model_cache_size: int = 32
+
+    # Embedding cache (in-memory LRU + optional on-disk tier; empty path disables disk)
+    embedding_cache_enabled: bool = True
+    embedding_cache_size: int = 4096
+    embedding_cache_path: str = "./embedding_cache.db"
+    embedding_cache_disk_max_entries: int = 200_000
+
+    # Embedding micro-batching (coalesce concurrent requests into one API call)
+    embedding_batch_enabled: bool = True
+    embedding_batch_max_items: int = 64
+    embedding_batch_max_wait_ms: float = 5.0
+
+    # Known-attack signature index (near-duplicates of blocked prompts reuse the cached verdict)
+    signature_index_enabled: bool = True
+    signature_index_path: str = "./signatures"
+    signature_match_threshold: float = 0.95
+    signature_index_hnsw_threshold: int = 5000
+
+    # Verdict cache for repeated prompts (LLM-tier verdicts; empty path = memory only)
+    verdict_cache_enabled: bool = True
+    verdict_cache_size: int = 10_000
+    verdict_cache_ttl_seconds: int = 3600
+    verdict_cache_path: str = ""
 
     # Database
     database_url: str = "sqlite+aiosqlite:///./sentinel.db"
-
-    # Analysis mode
-    analysis_mode: Literal["heuristic", "llm", "hybrid"] = "hybrid"
+    database_read_url: str = ""  # optional read replica for the dashboard (/sessions) queries
+    # Engine profile: "tuned" applies the per-dialect settings below, "default" uses SQLAlchemy's defaults
+    db_profile: Literal["tuned", "default"] = "tuned"
+    db_pool_size: int = 10  # Postgres
+    db_max_overflow: int = 20
+    db_pool_recycle_seconds: int = 1800
+    db_statement_cache_size: int = 500  # asyncpg prepared statements per connection
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_mb: int = 256
+    # Message embedding storage: binary float32/float16 BLOB, or legacy JSON list
+    embedding_storage: Literal["float32", "float16", "json"] = "float32"
+
+    # Analysis mode ("cascade" = heuristics first, LLM only for uncertain verdicts)
+    analysis_mode: Literal["heuristic", "llm", "hybrid", "cascade"] = "hybrid"
+
+    # Fused analysis: one LLM call returns red-team, blue-team and explanation together
+    fused_analysis: bool = False
+
+    # Cascade escalation: heuristic scores in [min, max) or suspicious drift go to the LLM tier
+    cascade_escalate_min: float = 20.0
+    cascade_escalate_max: float = 85.0
+    cascade_escalate_on_drift: bool = True
 
     # Scoring thresholds (0–100)
     threshold_allow: int = 40
@@ -43,6 +106,26 @@ class Settings(BaseSettings):
     # Session
     max_conversation_history: int = 20
     session_ttl_minutes: int = 60
+    embedding_store_max_mb: int = 256  # budget for resident per-conversation FAISS stores
+
+    # Write-behind persistence: /analyze queues its messages and a background task commits them in batches
+    write_behind_enabled: bool = False
+    write_behind_batch_size: int = 200  # turns per transaction (and queue depth that triggers a flush)
+    write_behind_flush_ms: float = 100.0
+    write_behind_max_pending: int = 10_000  # enqueue waits beyond this depth
+    write_behind_max_attempts: int = 5  # failed batch transactions before rows are written (or dropped) one by one
+
+    # Retention: a background worker purges conversations idle longer than the TTL, in bounded chunks
+    retention_enabled: bool = False
+    retention_ttl_minutes: int = 0  # 0 = session_ttl_minutes
+    retention_interval_seconds: float = 300.0
+    retention_batch_size: int = 500  # conversations per delete transaction
+    retention_archive_path: str = ""  # append purged conversations here as JSONL before deleting
+
+    # Batch analysis: items per request, conversations analysed in parallel, turns per transaction
+    batch_max_items: int = 1000
+    batch_concurrency: int = 8
+    batch_commit_every: int = 200
 
     @property
     def dry_run(self) -> bool:
@@ -56,7 +139,7 @@ class Settings(BaseSettings):
     @property
     def use_llm(self) -> bool:
         """Whether LLM-based analysis is available."""
-        return self.analysis_mode in ("llm", "hybrid") and not self.dry_run
+        return self.analysis_mode in ("llm", "hybrid", "cascade") and not self.dry_run
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
@@ -2,20 +2,63 @@
 Sentinel-AI — Database Setup
 SQLAlchemy async engine + session factory.
 Supports PostgreSQL (asyncpg) and SQLite (aiosqlite).
+
+Engines are built from a named profile (DB_PROFILE): "tuned" puts SQLite
+in WAL mode with synchronous=NORMAL, a busy timeout and memory-mapped
+reads, and gives Postgres a sized, pre-pinged pool with a larger
+prepared-statement cache; "default" keeps SQLAlchemy's defaults. With
+DATABASE_READ_URL set, read-only dashboard queries use a second engine
+(e.g. a streaming replica) and may lag the primary slightly.
 """
 
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 from app.config import settings
+from app.utils.tracing import instrument_engine
+
+
+def engine_options(url: str, profile: str) -> dict:
+    """create_async_engine() keyword arguments for a profile and the URL's dialect."""
+    options = {"echo": False, "future": True}
+    if profile != "tuned":
+        return options
+    if make_url(url).get_backend_name() == "postgresql":
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_pre_ping=True,
+            pool_recycle=settings.db_pool_recycle_seconds,
+            connect_args={"prepared_statement_cache_size": settings.db_statement_cache_size},
+        )
+    return options
+
+
+def _sqlite_pragmas(dbapi_conn, connection_record):
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")  # readers no longer block the writer
+    cursor.execute("PRAGMA synchronous=NORMAL")  # fsync at checkpoints, not every commit (safe under WAL)
+    cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+    cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_mb * 1024 * 1024}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
 
 
-engine = create_async_engine(
-    settings.database_url,
-    echo=False,
-    future=True,
-)
+def build_engine(url: str, profile: str = settings.db_profile) -> AsyncEngine:
+    """Create an async engine for `url` configured by `profile`."""
+    engine = create_async_engine(url, **engine_options(url, profile))
+    if profile == "tuned" and engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", _sqlite_pragmas)
+    instrument_engine(engine)
+    return engine
+
+
+engine = build_engine(settings.database_url)
+read_engine = build_engine(settings.database_read_url) if settings.database_read_url else engine
 
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+read_session = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
 
 
 class Base(DeclarativeBase):
@@ -23,13 +66,62 @@ class Base(DeclarativeBase):
 
 
 async def init_db():
-    """Create all tables."""
+    """Create all tables and add any columns introduced since they were created."""
     async with engine.begin() as conn:
         from app.models.db_models import Conversation, Message  # noqa: F401
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_add_missing_indexes)
+
+
+def _add_missing_columns(sync_conn):
+    """Additive schema migration: ALTER TABLE ADD COLUMN for new nullable columns."""
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            col_type = column.type.compile(dialect=sync_conn.dialect)
+            sync_conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+
+
+def _add_missing_indexes(sync_conn):
+    """Create indexes declared since the table was created (create_all skips existing tables)."""
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(sync_conn)
+
+
+async def close_db():
+    """Close pooled connections of both engines."""
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+
+def db_stats() -> dict:
+    stats = {
+        "profile": settings.db_profile,
+        "dialect": engine.dialect.name,
+        "pool": engine.pool.status(),
+        "read_replica": read_engine is not engine,
+    }
+    if read_engine is not engine:
+        stats["read_pool"] = read_engine.pool.status()
+    return stats
 
 
 async def get_db() -> AsyncSession:
     """Dependency: yield an async DB session."""
     async with async_session() as session:
         yield session
+
+
+async def get_read_db() -> AsyncSession:
+    """Dependency: yield a session on the read engine (the primary when no replica is configured)."""
+    async with read_session() as session:
+        yield session
@@ -8,8 +8,9 @@ import json
 from app.config import settings
 from app.utils.llm_client import chat_completion
 from app.models.schemas import BlueTeamOutput, RedTeamOutput
-from app.utils.patterns import PATTERN_CATEGORIES
+from app.utils.patterns import ScanResult, scan_prompt
 from app.utils.logger import log
+from app.utils.metrics import FALLBACKS, record_outcome
 
 
 BLUETEAM_SYSTEM_PROMPT = """You are an AI security policy engine.
@@ -28,17 +29,24 @@ Return structured JSON:
 }"""
 
 
-async def run_blueteam(prompt: str, red_team_output: RedTeamOutput) -> BlueTeamOutput:
+async def run_blueteam(
+    prompt: str,
+    red_team_output: RedTeamOutput,
+    scan: ScanResult | None = None,
+    use_llm: bool | None = None,
+) -> BlueTeamOutput:
     """
     Run Blue-Team classification.
     Uses LLM when available, falls back to heuristic scoring.
+    `scan` is the request's shared pattern scan; computed here if not given.
+    `use_llm` overrides settings.use_llm (cascade mode picks the tier per request).
     """
-    if settings.use_llm:
-        return await _llm_blueteam(prompt, red_team_output)
-    return _heuristic_blueteam(prompt, red_team_output)
+    if settings.use_llm if use_llm is None else use_llm:
+        return await _llm_blueteam(prompt, red_team_output, scan)
+    return _heuristic_blueteam(prompt, red_team_output, scan)
 
 
-async def _llm_blueteam(prompt: str, red_team_output: RedTeamOutput) -> BlueTeamOutput:
+async def _llm_blueteam(prompt: str, red_team_output: RedTeamOutput, scan: ScanResult | None = None) -> BlueTeamOutput:
     """Call the LLM with the blue-team prompt."""
     red_team_json = json.dumps(red_team_output.model_dump(), indent=2)
     user_content = f"User Prompt:\n{prompt}\n\nRed-Team Analysis:\n{red_team_json}"
@@ -57,33 +65,34 @@ async def _llm_blueteam(prompt: str, red_team_output: RedTeamOutput) -> BlueTeam
             raw = raw.split("\n", 1)[1].rsplit("```", 1)[0].strip()
 
         data = json.loads(raw)
-        result = BlueTeamOutput(
-            risk_level=data.get("risk_level", "safe"),
-            attack_category=data.get("attack_category", "none"),
-            risk_score=round(float(data.get("risk_score", 0)), 2),
-            explanation=data.get("explanation", ""),
-            risky_phrases=data.get("risky_phrases", []),
-        )
+        result = parse_blueteam_output(data)
         log.debug(f"Blue-team LLM complete", risk_level=result.risk_level, score=result.risk_score)
+        record_outcome("blueteam", True)
         return result
 
     except Exception as e:
+        FALLBACKS.inc("blueteam")
+        record_outcome("blueteam", False)
         log.error(f"Blue-team LLM failed, using heuristic", error=str(e))
-        return _heuristic_blueteam(prompt, red_team_output)
+        return _heuristic_blueteam(prompt, red_team_output, scan)
+
+
+def parse_blueteam_output(data: dict) -> BlueTeamOutput:
+    """Validate the LLM's blue-team JSON (raises on malformed fields)."""
+    return BlueTeamOutput(
+        risk_level=data.get("risk_level", "safe"),
+        attack_category=data.get("attack_category", "none"),
+        risk_score=round(float(data.get("risk_score", 0)), 2),
+        explanation=data.get("explanation", ""),
+        risky_phrases=data.get("risky_phrases", []),
+    )
 
 
-def _heuristic_blueteam(prompt: str, red_team_output: RedTeamOutput) -> BlueTeamOutput:
+def _heuristic_blueteam(prompt: str, red_team_output: RedTeamOutput, scan: ScanResult | None = None) -> BlueTeamOutput:
     """Pattern-based blue-team fallback."""
-    matched_categories = []
-    risky_phrases = []
-
-    for cat_name, patterns in PATTERN_CATEGORIES.items():
-        for pattern in patterns:
-            match = pattern.search(prompt)
-            if match:
-                matched_categories.append(cat_name)
-                risky_phrases.append(match.group())
-                break
+    scan = scan or scan_prompt(prompt)
+    matched_categories = scan.categories
+    risky_phrases = scan.phrases
 
     # Compute score: base from red-team confidence + pattern matches
     red_score = red_team_output.confidence_score * 100
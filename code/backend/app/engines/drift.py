@@ -1,9 +1,12 @@
 """
 Sentinel-AI — Module 4: Intent Drift Scoring
 Computes cosine distance between current prompt embedding and conversation centroid.
+The centroid is maintained incrementally per conversation (see engines/memory.py),
+so each turn costs O(dim) regardless of conversation length.
 """
 
-from app.engines.embedding import compute_centroid, cosine_distance
+import numpy as np
+from app.engines.embedding import cosine_distance
 from app.models.schemas import DriftInfo
 from app.utils.logger import log
 
@@ -19,12 +22,13 @@ def interpret_drift(score: float) -> str:
 
 
 async def compute_drift(
-    current_embedding: list[float],
-    conversation_embeddings: list[list[float]],
+    current_embedding: list[float] | np.ndarray,
+    centroid: np.ndarray | None,
     turn_number: int,
 ) -> DriftInfo:
     """
     Compute intent drift by comparing current embedding to conversation centroid.
+    `centroid` is the mean of all prior user-turn embeddings, or None on the first turn.
 
     drift_score = cosine_distance(current_embedding, centroid)
 
@@ -33,27 +37,40 @@ async def compute_drift(
         0.2–0.5 → suspicious
         > 0.5  → strong intent shift
     """
-    if not conversation_embeddings:
+    if centroid is None:
         log.debug("No prior embeddings — drift score is 0")
         return DriftInfo(score=0.0, interpretation="stable", turn_number=turn_number)
 
-    centroid = compute_centroid(conversation_embeddings)
-    if centroid is None:
+    if len(centroid) != len(current_embedding):
+        # Embedding backend changed mid-conversation (e.g. TF-IDF fallback); not comparable
+        log.debug("Centroid dimension mismatch — drift score is 0", centroid=len(centroid), current=len(current_embedding))
         return DriftInfo(score=0.0, interpretation="stable", turn_number=turn_number)
 
-    drift_score = cosine_distance(current_embedding, centroid)
-    drift_score = round(min(max(drift_score, 0.0), 1.0), 4)
-    interpretation = interpret_drift(drift_score)
+    drift = measure_drift(current_embedding, centroid, turn_number)
 
     log.debug(
         f"Drift computed",
-        score=f"{drift_score:.4f}",
-        interpretation=interpretation,
+        score=lambda: f"{drift.score:.4f}",
+        interpretation=drift.interpretation,
         turn=turn_number,
     )
 
+    return drift
+
+
+def measure_drift(
+    current_embedding: list[float] | np.ndarray,
+    centroid: np.ndarray | None,
+    turn_number: int,
+) -> DriftInfo:
+    """Synchronous, unlogged core of compute_drift (used by the offline corpus scanner)."""
+    if centroid is None or len(centroid) != len(current_embedding):
+        return DriftInfo(score=0.0, interpretation="stable", turn_number=turn_number)
+
+    drift_score = cosine_distance(current_embedding, centroid)
+    drift_score = round(min(max(drift_score, 0.0), 1.0), 4)
     return DriftInfo(
         score=drift_score,
-        interpretation=interpretation,
+        interpretation=interpret_drift(drift_score),
         turn_number=turn_number,
     )
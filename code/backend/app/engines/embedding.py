@@ -2,15 +2,23 @@
 Sentinel-AI — Module 3: Embedding Engine
 Real OpenAI embeddings with FAISS index and centroid computation.
 Falls back to lightweight TF-IDF in dry-run mode.
+Embeddings are cached by (model, normalized text) in a two-tier cache.
 """
 
+import asyncio
+import hashlib
 import math
 import re
+import time
+import unicodedata
 import numpy as np
-from collections import Counter
-from openai import AsyncOpenAI
+from collections import Counter, OrderedDict
 from app.config import settings
+from app.utils.cache import LRUCache, SQLiteKV
+from app.utils.llm_client import get_providers, record_provider_call
+from app.utils.tracing import current_trace
 from app.utils.logger import log
+from app.utils.metrics import FALLBACKS
 
 
 # ── FAISS Index (in-memory, per-conversation) ────────────────────
@@ -49,41 +57,387 @@ class EmbeddingStore:
         else:
             self.vectors.append(arr.flatten())
 
+    def add_many(self, vectors: list):
+        for vector in vectors:
+            if self.dim is None or len(vector) == self.dim:
+                self.add(vector)
+
     def count(self) -> int:
         if _faiss_available and self.index is not None:
             return self.index.ntotal
         return len(self.vectors)
 
+    @property
+    def nbytes(self) -> int:
+        """Approximate resident size of the stored vectors."""
+        return self.count() * (self.dim or 0) * 4
+
+
+class StoreRegistry:
+    """
+    Bounded per-conversation EmbeddingStore registry.
+
+    Stores idle for longer than the session TTL are dropped, and the
+    least recently used stores are evicted whenever the total vector
+    memory exceeds `max_bytes`. An evicted conversation gets a fresh
+    store that the memory engine rehydrates from the database.
+    """
+
+    def __init__(self, ttl_seconds: float, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._stores: OrderedDict[str, tuple[EmbeddingStore, float]] = OrderedDict()
+        self._sizes: dict[str, int] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.rehydrations = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __contains__(self, conversation_id: str) -> bool:
+        return conversation_id in self._stores
+
+    def get(self, conversation_id: str) -> EmbeddingStore | None:
+        self._expire()
+        entry = self._stores.get(conversation_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._stores[conversation_id] = (entry[0], time.monotonic())
+        self._stores.move_to_end(conversation_id)
+        return entry[0]
+
+    def put(self, conversation_id: str, store: EmbeddingStore, rehydrated: bool = False):
+        self._stores[conversation_id] = (store, time.monotonic())
+        self._stores.move_to_end(conversation_id)
+        if rehydrated:
+            self.rehydrations += 1
+        self.account(conversation_id)
+
+    def discard(self, conversation_id: str):
+        """Forget a deleted conversation's store."""
+        self._drop(conversation_id)
+
+    def account(self, conversation_id: str):
+        """Refresh the byte count for one store and enforce the memory budget."""
+        entry = self._stores.get(conversation_id)
+        if entry is not None:
+            size = entry[0].nbytes
+            self.bytes += size - self._sizes.get(conversation_id, 0)
+            self._sizes[conversation_id] = size
+        while self.bytes > self.max_bytes and len(self._stores) > 1:
+            self._drop(next(iter(self._stores)))
+            self.evicted += 1
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._stores:
+            conversation_id, (_, last_used) = next(iter(self._stores.items()))
+            if last_used > cutoff:
+                break
+            self._drop(conversation_id)
+            self.expired += 1
+
+    def _drop(self, conversation_id: str):
+        self._stores.pop(conversation_id, None)
+        self.bytes -= self._sizes.pop(conversation_id, 0)
+
+    def stats(self) -> dict:
+        return {
+            "stores": len(self._stores),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "rehydrations": self.rehydrations,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
 
 # Per-conversation embedding stores
-_stores: dict[str, EmbeddingStore] = {}
+_stores = StoreRegistry(
+    ttl_seconds=settings.session_ttl_minutes * 60,
+    max_bytes=settings.embedding_store_max_mb * 1024 * 1024,
+)
+
+
+def get_store_registry() -> StoreRegistry:
+    return _stores
 
 
 def get_store(conversation_id: str) -> EmbeddingStore:
-    if conversation_id not in _stores:
-        _stores[conversation_id] = EmbeddingStore()
-    return _stores[conversation_id]
+    store = _stores.get(conversation_id)
+    if store is None:
+        store = EmbeddingStore()
+        _stores.put(conversation_id, store)
+    return store
+
+
+def add_to_store(conversation_id: str, vector) -> EmbeddingStore:
+    """Append a vector to a conversation's store and update memory accounting."""
+    store = get_store(conversation_id)
+    store.add(vector)
+    _stores.account(conversation_id)
+    return store
+
+
+# ── Embedding Cache ─────────────────────────────────────────────
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys: NFC + collapsed whitespace."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache keyed on (model, normalized text).
+
+    Tier 1 is an in-process LRU; tier 2 is an optional SQLite table of
+    float32 vectors that survives restarts. TF-IDF fallback vectors live
+    in their own memory-only LRU: they are cheap to recompute and depend
+    on the per-process hash seed, so they are never persisted or mixed
+    with provider vectors.
+    """
+
+    def __init__(self):
+        self.memory = LRUCache(settings.embedding_cache_size)
+        self.tfidf = LRUCache(settings.embedding_cache_size)
+        self.disk: SQLiteKV | None = None
+        if settings.embedding_cache_path:
+            self.disk = SQLiteKV(
+                settings.embedding_cache_path,
+                table="embeddings",
+                max_entries=settings.embedding_cache_disk_max_entries,
+            )
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> list[float] | None:
+        vector = self.memory.get(key)
+        if vector is not None or self.disk is None:
+            return vector
+
+        blob = await asyncio.to_thread(self.disk.get, key)
+        if blob is None:
+            return None
+        vector = np.frombuffer(blob, dtype=np.float32).tolist()
+        self.memory.set(key, vector)
+        return vector
+
+    async def put(self, key: str, vector: list[float]):
+        self.memory.set(key, vector)
+        if self.disk is not None:
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            await asyncio.to_thread(self.disk.set, key, blob)
+
+    def get_tfidf(self, text: str) -> list[float]:
+        key = normalize_text(text)
+        vector = self.tfidf.get(key)
+        if vector is None:
+            vector = _tfidf_embedding(text)
+            self.tfidf.set(key, vector)
+        return vector
+
+    def stats(self) -> dict:
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+            "tfidf": self.tfidf.stats(),
+        }
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
+
+
+_cache: EmbeddingCache | None = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _cache
+    if _cache is None:
+        _cache = EmbeddingCache()
+    return _cache
+
+
+def close_embedding_cache():
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
 
 
 # ── OpenAI Embedding ────────────────────────────────────────────
 
 async def generate_embedding(text: str) -> list[float]:
     """Generate an embedding using OpenAI's API, or fallback to TF-IDF."""
+    if not settings.embedding_cache_enabled:
+        return await _generate_embedding(text)
+
+    cache = get_embedding_cache()
+    if settings.dry_run:
+        return cache.get_tfidf(text)
+
+    key = cache.key(settings.embedding_model, text)
+    cached = await cache.get(key)
+    if cached is not None:
+        return cached
+
+    embedding = await _request_embedding(text)
+    if embedding is None:
+        return cache.get_tfidf(text)
+    await cache.put(key, embedding)
+    return embedding
+
+
+async def _generate_embedding(text: str) -> list[float]:
+    """Uncached path: provider embedding with TF-IDF fallback."""
     if settings.dry_run:
         return _tfidf_embedding(text)
+    embedding = await _request_embedding(text)
+    return embedding if embedding is not None else _tfidf_embedding(text)
+
+
+async def _request_embedding(text: str) -> list[float] | None:
+    """Call the embeddings API; returns None on failure."""
+    if settings.embedding_batch_enabled:
+        return await get_batcher().embed(text)
 
+    start = time.perf_counter()
     try:
-        client = AsyncOpenAI(api_key=settings.openai_api_key)
+        client = get_providers().openai
         response = await client.embeddings.create(
             model=settings.embedding_model,
             input=text,
         )
         embedding = response.data[0].embedding
+        record_provider_call("openai", "embedding", "ok", start)
         log.debug(f"OpenAI embedding generated", dim=len(embedding))
         return embedding
     except Exception as e:
+        record_provider_call("openai", "embedding", "error", start)
+        FALLBACKS.inc("embedding")
         log.error(f"Embedding API failed, using TF-IDF fallback", error=str(e))
-        return _tfidf_embedding(text)
+        return None
+
+
+# ── Micro-batching ──────────────────────────────────────────────
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent embedding requests into one batched API call.
+
+    Requests are collected until `max_items` are pending or `max_wait_ms`
+    has passed since the first one, then sent as a single `input=[...]`
+    call. Each caller gets its own vector back, or None if that item
+    failed (the caller then falls back to TF-IDF). Identical texts within
+    a batch share one slot.
+    """
+
+    def __init__(self, max_items: int, max_wait_ms: float):
+        self.max_items = max(1, max_items)
+        self.max_wait = max_wait_ms / 1000
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._inflight: set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+        self.failures = 0
+
+    async def embed(self, text: str) -> list[float] | None:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._send(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, batch: list[tuple[str, asyncio.Future]]):
+        # Shared by several requests; don't charge it to the trace of whichever one started the batch
+        current_trace.set(None)
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        self.batches += 1
+        self.items += len(batch)
+
+        by_text: dict[str, list[float] | None] = {}
+        try:
+            vectors = await self._create(texts)
+            if vectors is None and len(texts) > 1:
+                # One bad input can fail the whole batch; retry items on their own
+                results = await asyncio.gather(*(self._create([t]) for t in texts))
+                vectors = [r[0] if r else None for r in results]
+            if vectors is not None:
+                by_text = dict(zip(texts, vectors))
+        finally:
+            # Callers await these futures from detached tasks: resolve every one, even if this raised or was cancelled
+            for text, future in batch:
+                if future.done():
+                    continue
+                vector = by_text.get(text)
+                if vector is None:
+                    self.failures += 1
+                future.set_result(vector)
+
+    async def _create(self, texts: list[str]) -> list[list[float] | None] | None:
+        start = time.perf_counter()
+        try:
+            client = get_providers().openai
+            response = await client.embeddings.create(
+                model=settings.embedding_model,
+                input=texts,
+            )
+            vectors: list[list[float] | None] = [None] * len(texts)
+            for item in response.data:
+                if 0 <= item.index < len(texts) and item.embedding:
+                    vectors[item.index] = item.embedding
+        except Exception as e:
+            record_provider_call("openai", "embedding_batch", "error", start)
+            FALLBACKS.inc("embedding", amount=len(texts))
+            log.error(f"Embedding API failed, using TF-IDF fallback", error=str(e), batch=len(texts))
+            return None
+        record_provider_call("openai", "embedding_batch", "ok", start)
+        log.debug(f"OpenAI embeddings generated", batch=len(texts))
+        return vectors
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "failures": self.failures,
+            "pending": len(self._pending),
+        }
+
+
+_batcher: EmbeddingBatcher | None = None
+
+
+def get_batcher() -> EmbeddingBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = EmbeddingBatcher(settings.embedding_batch_max_items, settings.embedding_batch_max_wait_ms)
+    return _batcher
 
 
 def compute_centroid(embeddings: list[list[float]]) -> list[float] | None:
@@ -95,10 +449,29 @@ def compute_centroid(embeddings: list[list[float]]) -> list[float] | None:
     return centroid.tolist()
 
 
-def cosine_distance(vec_a: list[float], vec_b: list[float]) -> float:
-    """Compute cosine distance (1 - cosine_similarity) between two vectors."""
-    a = np.array(vec_a, dtype=np.float32)
-    b = np.array(vec_b, dtype=np.float32)
+def accumulate_embedding(
+    vec_sum: np.ndarray | None,
+    count: int,
+    vector,
+) -> tuple[np.ndarray, int]:
+    """Add one embedding to a running (sum, count); a dimension change restarts the sum."""
+    vec = np.asarray(vector, dtype=np.float64)
+    if vec_sum is None or count <= 0 or vec_sum.shape != vec.shape:
+        return vec.copy(), 1
+    return vec_sum + vec, count + 1
+
+
+def running_centroid(vec_sum: np.ndarray | None, count: int | None) -> np.ndarray | None:
+    """Centroid from a running (sum, count)."""
+    if vec_sum is None or not count:
+        return None
+    return vec_sum / count
+
+
+def cosine_distance(vec_a, vec_b) -> float:
+    """Compute cosine distance (1 - cosine_similarity) between two vectors (lists or arrays)."""
+    a = np.asarray(vec_a, dtype=np.float32)
+    b = np.asarray(vec_b, dtype=np.float32)
     norm_a = np.linalg.norm(a)
     norm_b = np.linalg.norm(b)
     if norm_a == 0 or norm_b == 0:
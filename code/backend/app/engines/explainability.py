@@ -7,6 +7,8 @@ from app.config import settings
 from app.utils.llm_client import chat_completion
 from app.models.schemas import RiskAnalysis
 from app.utils.logger import log
+from app.utils.metrics import FALLBACKS, record_outcome
+from app.utils.patterns import ScanResult
 
 
 EXPLAIN_PROMPT_TEMPLATE = """Explain in simple terms why this prompt was classified as {risk_level}.
@@ -24,17 +26,22 @@ Blue-Team Explanation: {blue_team_explanation}
 Provide a clear 2-3 sentence explanation suitable for a security dashboard."""
 
 
-async def generate_explanation(prompt: str, risk_analysis: RiskAnalysis) -> str:
+async def generate_explanation(
+    prompt: str,
+    risk_analysis: RiskAnalysis,
+    scan: ScanResult | None = None,
+    use_llm: bool | None = None,
+) -> str:
     """
     Generate a human-readable explanation of why a prompt was flagged.
     Uses LLM when available, falls back to template-based explanation.
     """
-    if settings.use_llm:
-        return await _llm_explain(prompt, risk_analysis)
-    return _heuristic_explain(prompt, risk_analysis)
+    if settings.use_llm if use_llm is None else use_llm:
+        return await _llm_explain(prompt, risk_analysis, scan)
+    return _heuristic_explain(prompt, risk_analysis, scan)
 
 
-async def _llm_explain(prompt: str, risk_analysis: RiskAnalysis) -> str:
+async def _llm_explain(prompt: str, risk_analysis: RiskAnalysis, scan: ScanResult | None = None) -> str:
     """Use LLM to generate an explanation."""
     explain_prompt = EXPLAIN_PROMPT_TEMPLATE.format(
         risk_level=risk_analysis.blue_team.risk_level,
@@ -55,20 +62,24 @@ async def _llm_explain(prompt: str, risk_analysis: RiskAnalysis) -> str:
             max_tokens=200,
         )
         log.debug("Explanation generated by LLM")
+        record_outcome("explain", True)
         return explanation
 
     except Exception as e:
+        FALLBACKS.inc("explain")
+        record_outcome("explain", False)
         log.error(f"Explanation LLM failed", error=str(e))
-        return _heuristic_explain(prompt, risk_analysis)
+        return _heuristic_explain(prompt, risk_analysis, scan)
 
 
-def _heuristic_explain(prompt: str, risk_analysis: RiskAnalysis) -> str:
+def _heuristic_explain(prompt: str, risk_analysis: RiskAnalysis, scan: ScanResult | None = None) -> str:
     """Template-based explanation fallback."""
     score = risk_analysis.final_score
     action = risk_analysis.action
     category = risk_analysis.blue_team.attack_category
     drift_info = risk_analysis.drift
-    risky_phrases = risk_analysis.blue_team.risky_phrases
+    # Fall back to the pattern scan when the blue-team reported no phrases (e.g. LLM mode)
+    risky_phrases = risk_analysis.blue_team.risky_phrases or (scan.phrases if scan else [])
 
     if action == "allow":
         return f"This prompt appears safe with a risk score of {score:.0f}/100. No malicious intent patterns were detected."
@@ -1,18 +1,44 @@
 """
 Sentinel-AI — Module 2: Conversation Memory Loader
 Fetches conversation history from the database and loads embeddings.
+Maintains the running embedding sum/count used for drift on each conversation.
+Embeddings are stored as binary vectors and decoded with np.frombuffer.
 """
 
-from sqlalchemy import select
+import json
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any
+import numpy as np
+from sqlalchemy import LargeBinary, Integer, String, DateTime, Text, bindparam, cast, func, literal, null, select, or_, union_all, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.engines.embedding import EmbeddingStore, accumulate_embedding, get_store_registry, running_centroid
 from app.models.db_models import Conversation, Message
 from app.utils.logger import log
+from app.utils.vectors import decode_vector, encode_vector
+
+
+def decode_embedding(embedding_vec: bytes | None, embedding_json: list | None) -> np.ndarray | None:
+    """Decode a stored message embedding from its binary column, or the legacy JSON column."""
+    if embedding_vec is not None:
+        return decode_vector(embedding_vec)
+    if embedding_json is not None:
+        return np.asarray(embedding_json, dtype=np.float32)
+    return None
+
+
+async def get_conversation(db: AsyncSession, conversation_id: str) -> Conversation | None:
+    result = await db.execute(select(Conversation).where(Conversation.id == conversation_id))
+    return result.scalar_one_or_none()
 
 
 async def get_or_create_conversation(db: AsyncSession, conversation_id: str, user_id: str) -> Conversation:
     """Get an existing conversation or create a new one."""
-    result = await db.execute(select(Conversation).where(Conversation.id == conversation_id))
-    conv = result.scalar_one_or_none()
+    conv = await get_conversation(db, conversation_id)
 
     if not conv:
         conv = Conversation(id=conversation_id, user_id=user_id)
@@ -24,6 +50,92 @@ async def get_or_create_conversation(db: AsyncSession, conversation_id: str, use
     return conv
 
 
+@dataclass
+class ConversationState:
+    """Compact per-request view of a conversation: drift inputs and the last turns (oldest first)."""
+    id: str
+    embedding_sum: bytes | None
+    embedding_count: int | None
+    history: list[dict]  # {"id", "role", "content"}
+    created: bool = False  # row inserted by this load
+
+    def centroid(self) -> np.ndarray | None:
+        vec_sum = decode_vector(self.embedding_sum) if self.embedding_sum is not None else None
+        return running_centroid(vec_sum, self.embedding_count)
+
+
+async def load_conversation_state(
+    db: AsyncSession,
+    conversation_id: str,
+    user_id: str,
+    limit: int = 20,
+    create: bool = True,
+) -> ConversationState | None:
+    """
+    Load a conversation in one round trip: a UNION ALL of its drift state
+    and (id, role, content) of its last `limit` messages. A missing row is
+    inserted with ON CONFLICT DO NOTHING (or None is returned if not `create`).
+    """
+    recent = (
+        select(Message.id, Message.role, Message.content, Message.created_at)
+        .where(Message.conversation_id == conversation_id)
+        .order_by(Message.created_at.desc())
+        .limit(limit)
+        .subquery()
+    )
+    query = union_all(
+        select(
+            literal(0).label("kind"), Conversation.embedding_sum, Conversation.embedding_count,
+            cast(null(), String).label("id"), cast(null(), String).label("role"),
+            cast(null(), Text).label("content"), cast(null(), DateTime).label("created_at"),
+        ).where(Conversation.id == conversation_id),
+        select(
+            literal(1), cast(null(), LargeBinary), cast(null(), Integer),
+            recent.c.id, recent.c.role, recent.c.content, recent.c.created_at,
+        ),
+    )
+    rows = (await db.execute(query)).all()
+
+    conv_row = next((row for row in rows if row.kind == 0), None)
+    if conv_row is None:
+        if not create:
+            return None
+        created = await _insert_conversation(db, conversation_id, user_id)
+        return ConversationState(conversation_id, None, 0, [], created=created)
+
+    messages = sorted((row for row in rows if row.kind == 1), key=lambda row: row.created_at)
+    state = ConversationState(
+        conversation_id,
+        conv_row.embedding_sum,
+        conv_row.embedding_count,
+        [{"id": m.id, "role": m.role, "content": m.content} for m in messages],
+    )
+    if state.embedding_count is None or (state.embedding_count and state.embedding_sum is None):
+        # Predates running drift state: rebuild it once from stored messages
+        conv = await db.get(Conversation, conversation_id)
+        await rebuild_drift_state(db, conv)
+        state.embedding_sum, state.embedding_count = conv.embedding_sum, conv.embedding_count
+    return state
+
+
+async def _insert_conversation(db: AsyncSession, conversation_id: str, user_id: str) -> bool:
+    """INSERT ... ON CONFLICT DO NOTHING; returns whether this call created the row."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    result = await db.execute(
+        insert(Conversation)
+        .values(id=conversation_id, user_id=user_id, created_at=datetime.now(timezone.utc), embedding_count=0, message_count=0)
+        .on_conflict_do_nothing(index_elements=["id"])
+    )
+    await db.commit()
+    created = result.rowcount == 1
+    if created:
+        log.info(f"New conversation created", conversation_id=conversation_id, user_id=user_id)
+    return created
+
+
 async def load_conversation_history(db: AsyncSession, conversation_id: str, limit: int = 20) -> list[dict]:
     """Fetch the last N messages from the database."""
     result = await db.execute(
@@ -37,9 +149,10 @@ async def load_conversation_history(db: AsyncSession, conversation_id: str, limi
 
     history = [
         {
+            "id": msg.id,
             "role": msg.role,
             "content": msg.content,
-            "embedding": msg.embedding,
+            "embedding": decode_embedding(msg.embedding_vec, msg.embedding),
             "drift_score": msg.drift_score,
             "risk_score": msg.risk_score,
         }
@@ -50,46 +163,422 @@ async def load_conversation_history(db: AsyncSession, conversation_id: str, limi
     return history
 
 
-async def load_embedding_history(db: AsyncSession, conversation_id: str) -> list[list[float]]:
+async def load_embedding_history(db: AsyncSession, conversation_id: str) -> list[np.ndarray]:
     """Fetch all non-null embeddings for a conversation."""
     result = await db.execute(
-        select(Message.embedding)
+        select(Message.embedding_vec, Message.embedding)
         .where(
             Message.conversation_id == conversation_id,
-            Message.embedding.isnot(None),
+            or_(Message.embedding_vec.isnot(None), Message.embedding.isnot(None)),
             Message.role == "user",
         )
         .order_by(Message.created_at)
     )
-    embeddings = [row[0] for row in result.all() if row[0] is not None]
+    embeddings = [e for e in (decode_embedding(vec, js) for vec, js in result.all()) if e is not None]
     log.debug(f"Loaded embedding history", conversation_id=conversation_id, count=len(embeddings))
     return embeddings
 
 
+async def load_store(db: AsyncSession, conv: Conversation | ConversationState) -> EmbeddingStore:
+    """Return the conversation's resident EmbeddingStore, rehydrating it from the DB if it was evicted."""
+    registry = get_store_registry()
+    store = registry.get(conv.id)
+    if store is not None:
+        return store
+
+    store = EmbeddingStore()
+    rehydrate = bool(conv.embedding_count)
+    if rehydrate:
+        store.add_many(await load_embedding_history(db, conv.id))
+        log.debug(f"Embedding store rehydrated", conversation_id=conv.id, vectors=store.count())
+    registry.put(conv.id, store, rehydrated=rehydrate)
+    return store
+
+
+async def load_centroid(db: AsyncSession, conv: Conversation) -> np.ndarray | None:
+    """Return the conversation's drift centroid, rebuilding its running state if never backfilled."""
+    if conv.embedding_count is None or (conv.embedding_count and conv.embedding_sum is None):
+        await rebuild_drift_state(db, conv)
+    vec_sum = decode_vector(conv.embedding_sum) if conv.embedding_sum is not None else None
+    return running_centroid(vec_sum, conv.embedding_count)
+
+
+async def rebuild_drift_state(db: AsyncSession, conv: Conversation, commit: bool = True):
+    """Recompute a conversation's running embedding sum/count from its stored messages."""
+    vec_sum, count = None, 0
+    for embedding in await load_embedding_history(db, conv.id):
+        vec_sum, count = accumulate_embedding(vec_sum, count, embedding)
+
+    conv.embedding_sum = encode_vector(vec_sum, "float64") if vec_sum is not None else None
+    conv.embedding_count = count
+    if commit:
+        await db.commit()
+    log.debug(f"Drift state rebuilt", conversation_id=conv.id, count=count)
+
+
+async def backfill_drift_state(db: AsyncSession, batch_size: int = 200) -> int:
+    """Rebuild drift state for every conversation that predates it. Returns conversations updated."""
+    total = 0
+    while True:
+        result = await db.execute(
+            select(Conversation)
+            .where(or_(
+                Conversation.embedding_count.is_(None),
+                (Conversation.embedding_count > 0) & Conversation.embedding_sum.is_(None),
+            ))
+            .limit(batch_size)
+        )
+        batch = result.scalars().all()
+        if not batch:
+            break
+        for conv in batch:
+            await rebuild_drift_state(db, conv, commit=False)
+        await db.commit()
+        total += len(batch)
+        log.info(f"Drift state backfill progress", conversations=total)
+    return total
+
+
+def message_count_query():
+    """Correlated COUNT of a conversation's messages, for rows whose summary predates the column."""
+    return (
+        select(func.count(Message.id))
+        .where(Message.conversation_id == Conversation.id)
+        .correlate(Conversation)
+        .scalar_subquery()
+    )
+
+
+def last_message_at_query():
+    """Correlated creation time of a conversation's latest message."""
+    return (
+        select(func.max(Message.created_at))
+        .where(Message.conversation_id == Conversation.id)
+        .correlate(Conversation)
+        .scalar_subquery()
+    )
+
+
+def last_risk_score_query():
+    """Correlated risk score of a conversation's latest scored message."""
+    return (
+        select(Message.risk_score)
+        .where(Message.conversation_id == Conversation.id, Message.risk_score.isnot(None))
+        .order_by(Message.created_at.desc())
+        .limit(1)
+        .correlate(Conversation)
+        .scalar_subquery()
+    )
+
+
+async def backfill_session_stats(db: AsyncSession, batch_size: int = 500) -> int:
+    """Fill message_count / last_risk_score / last_active_at for conversations that predate them. Returns conversations updated."""
+    total = 0
+    while True:
+        ids = (await db.execute(
+            select(Conversation.id)
+            .where(or_(Conversation.message_count.is_(None), Conversation.last_active_at.is_(None)))
+            .limit(batch_size)
+        )).scalars().all()
+        if not ids:
+            break
+        await db.execute(
+            update(Conversation)
+            .where(Conversation.id.in_(ids))
+            .values(
+                message_count=message_count_query(),
+                last_risk_score=last_risk_score_query(),
+                last_active_at=func.coalesce(last_message_at_query(), Conversation.created_at),
+            )
+        )
+        await db.commit()
+        total += len(ids)
+        log.info(f"Session stats backfill progress", conversations=total)
+    return total
+
+
+async def convert_embeddings_batch(db: AsyncSession, dtype: str, batch_size: int = 500) -> dict:
+    """
+    Move one batch of legacy JSON embeddings into the binary column.
+    Returns counts, byte sizes, and decode timings for the converted rows.
+    """
+    result = await db.execute(
+        select(Message.id, Message.embedding)
+        .where(Message.embedding.isnot(None), Message.embedding_vec.is_(None))
+        .limit(batch_size)
+    )
+    rows = result.all()
+    stats = {"rows": len(rows), "json_bytes": 0, "binary_bytes": 0, "json_decode_s": 0.0, "binary_decode_s": 0.0}
+    if not rows:
+        return stats
+
+    updates = []
+    json_texts, blobs = [], []
+    for msg_id, embedding in rows:
+        blob = encode_vector(embedding, dtype)
+        json_texts.append(json.dumps(embedding))
+        blobs.append(blob)
+        updates.append({"_id": msg_id, "_vec": blob})
+
+    stats["json_bytes"] = sum(len(t) for t in json_texts)
+    stats["binary_bytes"] = sum(len(b) for b in blobs)
+
+    start = time.perf_counter()
+    for t in json_texts:
+        np.asarray(json.loads(t), dtype=np.float32)
+    stats["json_decode_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for b in blobs:
+        decode_vector(b)
+    stats["binary_decode_s"] = time.perf_counter() - start
+
+    await db.execute(
+        update(Message.__table__)
+        .where(Message.__table__.c.id == bindparam("_id"))
+        .values(embedding_vec=bindparam("_vec"), embedding=None),
+        updates,
+    )
+    await db.commit()
+    return stats
+
+
 async def save_message(
     db: AsyncSession,
     conversation_id: str,
     role: str,
     content: str,
-    embedding: list[float] | None = None,
+    embedding: list[float] | np.ndarray | None = None,
     drift_score: float | None = None,
     risk_score: float | None = None,
     action: str | None = None,
     red_team_result: dict | None = None,
     blue_team_result: dict | None = None,
+    created_at: datetime | None = None,
+    message_id: str | None = None,
+    commit: bool = True,
 ):
     """Save a message and its analysis to the database."""
-    msg = Message(
+    db.add(_build_message(
+        conversation_id, role, content, embedding, drift_score, risk_score, action,
+        red_team_result, blue_team_result, created_at, message_id,
+    ))
+
+    await _update_conversation(
+        db, conversation_id, [embedding] if role == "user" and embedding is not None else [],
+        message_count=Conversation.message_count + 1,  # stays NULL until backfilled
+        last_active_at=created_at or datetime.now(timezone.utc),
+        **({"last_risk_score": risk_score} if risk_score is not None else {}),
+    )
+
+    if commit:
+        await db.commit()
+    log.debug(f"Message saved", conversation_id=conversation_id, role=role)
+
+
+async def _update_conversation(db: AsyncSession, conversation_id: str, embeddings: list, **values):
+    """
+    Apply listing-summary `values` and fold `embeddings` into the drift
+    state. The summary UPDATE takes the row's write lock and returns the
+    sum/count as of that moment, so the new sum is computed from current
+    values rather than from an earlier read that a concurrent turn may
+    have moved on. A NULL count is left for rebuild_drift_state.
+    """
+    query = update(Conversation).where(Conversation.id == conversation_id).values(**values)
+    if not embeddings:
+        await db.execute(query)
+        return
+
+    row = (await db.execute(query.returning(Conversation.embedding_sum, Conversation.embedding_count))).first()
+    if row is None or row.embedding_count is None:
+        return
+    vec_sum = decode_vector(row.embedding_sum) if row.embedding_sum is not None else None
+    count = row.embedding_count
+    for embedding in embeddings:
+        vec_sum, count = accumulate_embedding(vec_sum, count, embedding)
+    await db.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(embedding_sum=encode_vector(vec_sum, "float64"), embedding_count=count)
+    )
+
+
+def _build_message(
+    conversation_id: str,
+    role: str,
+    content: str,
+    embedding: list[float] | np.ndarray | None = None,
+    drift_score: float | None = None,
+    risk_score: float | None = None,
+    action: str | None = None,
+    red_team_result: dict | None = None,
+    blue_team_result: dict | None = None,
+    created_at: datetime | None = None,
+    message_id: str | None = None,
+) -> Message:
+    binary = settings.embedding_storage != "json"
+    return Message(
+        **({"created_at": created_at} if created_at is not None else {}),
+        **({"id": message_id} if message_id is not None else {}),
         conversation_id=conversation_id,
         role=role,
         content=content,
-        embedding=embedding,
+        embedding=np.asarray(embedding).tolist() if embedding is not None and not binary else None,
+        embedding_vec=encode_vector(embedding, settings.embedding_storage) if embedding is not None and binary else None,
         drift_score=drift_score,
         risk_score=risk_score,
         action=action,
         red_team_result=red_team_result,
         blue_team_result=blue_team_result,
     )
-    db.add(msg)
+
+
+# ── Buffered turns ───────────────────────────────────────────────
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class BufferedTurn:
+    """One analysed user turn and the assistant reply, not yet written."""
+    conversation_id: str
+    prompt: str
+    response: str
+    embedding: np.ndarray
+    drift_score: float
+    risk_score: float
+    action: str
+    red_team_result: dict
+    blue_team_result: dict
+    ref: Any = None  # caller's handle, returned if the write fails
+    created_at: datetime = field(default_factory=_now)
+    message_ids: tuple[str, str] = field(default_factory=lambda: (str(uuid.uuid4()), str(uuid.uuid4())))
+
+
+def merge_turns(history: list[dict], turns: list[BufferedTurn], limit: int = 20) -> list[dict]:
+    """Append buffered turns to history loaded from the database (skipping any already there), keeping the last `limit`."""
+    if not turns:
+        return history
+    stored = {m.get("id") for m in history}
+    merged = list(history)
+    for t in turns:
+        if t.message_ids[0] in stored:
+            continue
+        merged.append({"id": t.message_ids[0], "role": "user", "content": t.prompt})
+        merged.append({"id": t.message_ids[1], "role": "assistant", "content": t.response})
+    return merged[-limit:]
+
+
+async def save_turn(db: AsyncSession, state: ConversationState, turn: BufferedTurn):
+    """
+    Write one analysed turn in a single commit: both messages plus the
+    drift state and the listing summary. `state` is what the request
+    loaded; the drift state is advanced from the row as it is at write
+    time, so concurrent turns of one conversation all count.
+    """
+    db.add_all([
+        _build_message(
+            turn.conversation_id, "user", turn.prompt, turn.embedding, turn.drift_score, turn.risk_score,
+            turn.action, turn.red_team_result, turn.blue_team_result, turn.created_at, turn.message_ids[0],
+        ),
+        _build_message(
+            turn.conversation_id, "assistant", turn.response,
+            created_at=turn.created_at + timedelta(microseconds=1), message_id=turn.message_ids[1],
+        ),
+    ])
+    await _update_conversation(
+        db, state.id, [turn.embedding],
+        message_count=Conversation.message_count + 2,  # stays NULL until backfilled
+        last_risk_score=turn.risk_score,
+        last_active_at=turn.created_at,
+    )
     await db.commit()
-    log.debug(f"Message saved", conversation_id=conversation_id, role=role)
+    log.debug(f"Turn saved", conversation_id=turn.conversation_id)
+
+
+async def write_turns(db: AsyncSession, turns: list[BufferedTurn]):
+    """
+    Add buffered turns (user + assistant rows) to the session without
+    committing, then advance each conversation's summary and drift state
+    once for all of its turns.
+    """
+    by_conversation: dict[str, list[BufferedTurn]] = defaultdict(list)
+    for t in turns:
+        db.add_all([
+            _build_message(
+                t.conversation_id, "user", t.prompt, t.embedding, t.drift_score, t.risk_score,
+                t.action, t.red_team_result, t.blue_team_result, t.created_at, t.message_ids[0],
+            ),
+            # One microsecond later keeps the reply ordered after its prompt
+            _build_message(
+                t.conversation_id, "assistant", t.response,
+                created_at=t.created_at + timedelta(microseconds=1), message_id=t.message_ids[1],
+            ),
+        ])
+        by_conversation[t.conversation_id].append(t)
+
+    for conversation_id, conv_turns in by_conversation.items():
+        await _update_conversation(
+            db, conversation_id, [t.embedding for t in conv_turns],
+            message_count=Conversation.message_count + 2 * len(conv_turns),  # stays NULL until backfilled
+            last_risk_score=conv_turns[-1].risk_score,
+            last_active_at=conv_turns[-1].created_at + timedelta(microseconds=1),
+        )
+    log.debug(f"Turns written", turns=len(turns), conversations=len(by_conversation))
+
+
+class TurnBuffer:
+    """
+    Turns analysed but not yet persisted, written later in a few grouped
+    transactions. Later turns of the same conversation read buffered ones
+    as history and drift state, so ordering holds before the write.
+    """
+
+    def __init__(self):
+        self._turns: list[BufferedTurn] = []
+        self._by_conversation: dict[str, list[BufferedTurn]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def add(self, turn: BufferedTurn):
+        self._turns.append(turn)
+        self._by_conversation[turn.conversation_id].append(turn)
+
+    def merge_history(self, history: list[dict], conversation_id: str, limit: int = 20) -> list[dict]:
+        """Append buffered turns to history loaded from the database, keeping the last `limit`."""
+        return merge_turns(history, self._by_conversation.get(conversation_id), limit)
+
+    def centroid(self, conv: Conversation | ConversationState, centroid: np.ndarray | None) -> np.ndarray | None:
+        """Fold buffered embeddings into the stored drift state (call after load_centroid)."""
+        turns = self._by_conversation.get(conv.id)
+        if not turns:
+            return centroid
+        vec_sum = decode_vector(conv.embedding_sum) if conv.embedding_sum is not None else None
+        count = conv.embedding_count or 0
+        for t in turns:
+            vec_sum, count = accumulate_embedding(vec_sum, count, t.embedding)
+        return running_centroid(vec_sum, count)
+
+    async def flush(self, db: AsyncSession, commit_every: int = 200) -> tuple[int, list]:
+        """
+        Write buffered turns in order, committing every `commit_every` turns.
+        Returns (transactions committed, refs of turns whose transaction failed).
+        """
+        transactions, failed = 0, []
+        for start in range(0, len(self._turns), commit_every):
+            chunk = self._turns[start:start + commit_every]
+            try:
+                await write_turns(db, chunk)
+                await db.commit()
+                transactions += 1
+            except Exception as e:
+                await db.rollback()
+                log.error(f"Buffered turn write failed", turns=len(chunk), error=str(e))
+                failed.extend(t.ref for t in chunk)
+
+        log.debug(f"Buffered turns flushed", turns=len(self._turns), transactions=transactions)
+        self._turns.clear()
+        self._by_conversation.clear()
+        return transactions, failed
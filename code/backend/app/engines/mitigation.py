@@ -9,10 +9,11 @@ Decision Table:
     85–100 → Block
 """
 
-import re
 from app.config import settings
 from app.utils.llm_client import chat_completion
 from app.utils.logger import log
+from app.utils.metrics import FALLBACKS
+from app.utils.patterns import REWRITE_STRIP_PATTERNS, ScanResult, scan_prompt
 
 
 REWRITE_SYSTEM_PROMPT = """You are a secure prompt sanitization engine.
@@ -28,17 +29,17 @@ Rules:
 Return only the sanitized prompt."""
 
 
-async def rewrite_prompt(prompt: str) -> str:
+async def rewrite_prompt(prompt: str, scan: ScanResult | None = None, use_llm: bool | None = None) -> str:
     """
     Rewrite a prompt to remove malicious intent.
     Uses LLM when available, falls back to regex stripping.
     """
-    if settings.use_llm:
-        return await _llm_rewrite(prompt)
-    return _heuristic_rewrite(prompt)
+    if settings.use_llm if use_llm is None else use_llm:
+        return await _llm_rewrite(prompt, scan)
+    return _heuristic_rewrite(prompt, scan)
 
 
-async def _llm_rewrite(prompt: str) -> str:
+async def _llm_rewrite(prompt: str, scan: ScanResult | None = None) -> str:
     """Use LLM to sanitize the prompt."""
     try:
         rewritten = await chat_completion(
@@ -53,33 +54,20 @@ async def _llm_rewrite(prompt: str) -> str:
         return rewritten
 
     except Exception as e:
+        FALLBACKS.inc("rewrite")
         log.error(f"Rewrite LLM failed, using heuristic", error=str(e))
-        return _heuristic_rewrite(prompt)
+        return _heuristic_rewrite(prompt, scan)
 
 
 # ── Heuristic rewrite (dry-run fallback) ─────────────────────────
 
-_STRIP_PATTERNS = [
-    re.compile(r"ignore\s+(all\s+)?previous\s+instructions?\.?\s*", re.IGNORECASE),
-    re.compile(r"disregard\s+(all\s+)?(prior|previous|above)\s+(instructions?|context)\.?\s*", re.IGNORECASE),
-    re.compile(r"forget\s+everything.*?\.?\s*", re.IGNORECASE),
-    re.compile(r"you\s+are\s+now\s+.*?\.\s*", re.IGNORECASE),
-    re.compile(r"from\s+now\s+on.*?\.\s*", re.IGNORECASE),
-    re.compile(r"system\s*:\s*.*?\n", re.IGNORECASE),
-    re.compile(r"\[system\].*?\n", re.IGNORECASE),
-    re.compile(r"bypass\s+(all\s+)?(safety|content|ethical).*?\.\s*", re.IGNORECASE),
-    re.compile(r"do\s+anything\s+now\.?\s*", re.IGNORECASE),
-    re.compile(r"DAN\s+mode.*?\.\s*", re.IGNORECASE),
-    re.compile(r"(reveal|show|tell)\s+(me\s+)?(your|the)\s+(system\s+)?prompt.*?\.\s*", re.IGNORECASE),
-    re.compile(r"(api|secret)\s*key.*?\.\s*", re.IGNORECASE),
-]
-
-
-def _heuristic_rewrite(prompt: str) -> str:
+def _heuristic_rewrite(prompt: str, scan: ScanResult | None = None) -> str:
     """Strip known malicious patterns from the prompt."""
     sanitized = prompt
-    for pattern in _STRIP_PATTERNS:
-        sanitized = pattern.sub("", sanitized)
+    # Patterns are applied in sequence; skip the pass entirely when none matched the original
+    if (scan or scan_prompt(prompt)).strip_hits:
+        for pattern in REWRITE_STRIP_PATTERNS:
+            sanitized = pattern.sub("", sanitized)
 
     sanitized = sanitized.strip()
 
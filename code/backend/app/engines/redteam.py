@@ -8,8 +8,9 @@ import json
 from app.config import settings
 from app.utils.llm_client import chat_completion
 from app.models.schemas import RedTeamOutput
-from app.utils.patterns import PATTERN_CATEGORIES
+from app.utils.patterns import ScanResult, scan_prompt
 from app.utils.logger import log
+from app.utils.metrics import FALLBACKS, record_outcome
 
 
 REDTEAM_SYSTEM_PROMPT = """You are a security adversary simulator.
@@ -29,17 +30,24 @@ Return structured JSON:
 }"""
 
 
-async def run_redteam(prompt: str, conversation_history: str = "") -> RedTeamOutput:
+async def run_redteam(
+    prompt: str,
+    conversation_history: str = "",
+    scan: ScanResult | None = None,
+    use_llm: bool | None = None,
+) -> RedTeamOutput:
     """
     Run Red-Team adversarial simulation.
     Uses LLM when available, falls back to heuristic.
+    `scan` is the request's shared pattern scan; computed here if not given.
+    `use_llm` overrides settings.use_llm (cascade mode picks the tier per request).
     """
-    if settings.use_llm:
-        return await _llm_redteam(prompt, conversation_history)
-    return _heuristic_redteam(prompt)
+    if settings.use_llm if use_llm is None else use_llm:
+        return await _llm_redteam(prompt, conversation_history, scan)
+    return _heuristic_redteam(prompt, scan)
 
 
-async def _llm_redteam(prompt: str, conversation_history: str) -> RedTeamOutput:
+async def _llm_redteam(prompt: str, conversation_history: str, scan: ScanResult | None = None) -> RedTeamOutput:
     """Call the LLM with the red-team prompt."""
     user_content = f"Conversation Context:\n{conversation_history}\n\nUser Prompt:\n{prompt}"
 
@@ -57,29 +65,32 @@ async def _llm_redteam(prompt: str, conversation_history: str) -> RedTeamOutput:
             raw = raw.split("\n", 1)[1].rsplit("```", 1)[0].strip()
 
         data = json.loads(raw)
-        result = RedTeamOutput(
-            hidden_intent=data.get("hidden_intent", ""),
-            attack_type=data.get("attack_type", ""),
-            sensitive_target=data.get("sensitive_target", ""),
-            exploitation_strategy=data.get("exploitation_strategy", ""),
-            confidence_score=round(float(data.get("confidence_score", 0.0)), 4),
-        )
+        result = parse_redteam_output(data)
         log.debug(f"Red-team LLM complete", confidence=result.confidence_score, attack=result.attack_type)
+        record_outcome("redteam", True)
         return result
 
     except Exception as e:
+        FALLBACKS.inc("redteam")
+        record_outcome("redteam", False)
         log.error(f"Red-team LLM failed, using heuristic", error=str(e))
-        return _heuristic_redteam(prompt)
+        return _heuristic_redteam(prompt, scan)
+
+
+def parse_redteam_output(data: dict) -> RedTeamOutput:
+    """Validate the LLM's red-team JSON (raises on malformed fields)."""
+    return RedTeamOutput(
+        hidden_intent=data.get("hidden_intent", ""),
+        attack_type=data.get("attack_type", ""),
+        sensitive_target=data.get("sensitive_target", ""),
+        exploitation_strategy=data.get("exploitation_strategy", ""),
+        confidence_score=round(float(data.get("confidence_score", 0.0)), 4),
+    )
 
 
-def _heuristic_redteam(prompt: str) -> RedTeamOutput:
+def _heuristic_redteam(prompt: str, scan: ScanResult | None = None) -> RedTeamOutput:
     """Pattern-based red-team fallback for dry-run mode."""
-    matched_categories = []
-    for cat_name, patterns in PATTERN_CATEGORIES.items():
-        for pattern in patterns:
-            if pattern.search(prompt):
-                matched_categories.append(cat_name)
-                break
+    matched_categories = (scan or scan_prompt(prompt)).categories
 
     if not matched_categories:
         return RedTeamOutput(
@@ -0,0 +1,272 @@
+"""
+Sentinel-AI — Conversation Retention
+Set-based conversation deletes, and an optional background worker
+(RETENTION_ENABLED) that purges conversations idle for longer than the
+retention TTL (RETENTION_TTL_MINUTES, default SESSION_TTL_MINUTES).
+
+Each sweep works in chunks of RETENTION_BATCH_SIZE conversations, one
+short transaction per chunk, so the worker never holds a write lock for
+long. With RETENTION_ARCHIVE_PATH set, every purged conversation and its
+messages are appended there as one JSONL line before the delete (at
+least once: a chunk that fails to delete is archived again next sweep).
+Conversations with turns still in the write-behind queue are skipped.
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session
+from app.engines.embedding import get_store_registry
+from app.engines.memory import last_message_at_query
+from app.engines.write_behind import get_write_behind
+from app.models.db_models import Conversation, Message
+from app.utils.logger import log
+
+
+async def delete_conversations(db: AsyncSession, conversation_ids: list[str], where=None) -> tuple[int, int]:
+    """
+    Delete conversations and their messages with two set-based statements
+    and commit. `where` further restricts which conversations go (it is
+    re-checked inside the delete). Returns (conversations, messages) deleted.
+    """
+    if not conversation_ids:
+        return 0, 0
+    writes = get_write_behind()
+    if writes is not None:
+        for cid in conversation_ids:
+            await writes.discard(cid)
+
+    doomed = Conversation.id.in_(conversation_ids)
+    if where is not None:
+        doomed = and_(doomed, where)
+    # Messages first: tables created before ON DELETE CASCADE still enforce the plain foreign key
+    messages = await db.execute(
+        delete(Message)
+        .where(Message.conversation_id.in_(select(Conversation.id).where(doomed)))
+        .execution_options(synchronize_session=False)
+    )
+    conversations = await db.execute(delete(Conversation).where(doomed).execution_options(synchronize_session=False))
+    await db.commit()
+
+    registry = get_store_registry()
+    for cid in conversation_ids:
+        registry.discard(cid)
+    return conversations.rowcount, messages.rowcount
+
+
+def expired_clause(cutoff: datetime):
+    """Conversations whose last activity is before `cutoff` (rows that predate last_active_at use their newest message)."""
+    return or_(
+        Conversation.last_active_at < cutoff,
+        and_(
+            Conversation.last_active_at.is_(None),
+            func.coalesce(last_message_at_query(), Conversation.created_at) < cutoff,
+        ),
+    )
+
+
+class RetentionWorker:
+    """Periodically purges expired conversations in bounded transactions and keeps counters."""
+
+    def __init__(self, ttl_seconds: float, interval_seconds: float, batch_size: int, archive_path: str = ""):
+        self.ttl_seconds = ttl_seconds
+        self.interval = interval_seconds
+        self.batch_size = max(1, batch_size)
+        self.archive_path = archive_path
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self.sweeps = 0
+        self.chunks = 0
+        self.conversations_purged = 0
+        self.messages_purged = 0
+        self.archived = 0
+        self.skipped_pending = 0
+        self.failures = 0
+        self.last_sweep_at: float | None = None
+        self.last_sweep_ms = 0.0
+        self.current: dict | None = None  # progress of the sweep in flight
+
+    async def sweep(self) -> dict:
+        """Purge everything expired now. Returns this sweep's counts."""
+        async with self._lock:
+            cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+            start = time.perf_counter()
+            self.current = progress = {"chunks": 0, "conversations": 0, "messages": 0, "archived": 0}
+            try:
+                while True:
+                    selected, purged = await self._purge_chunk(cutoff, progress)
+                    # A short chunk means the backlog is done; an all-skipped one would just repeat
+                    if selected < self.batch_size or not purged or self._stopping:
+                        break
+                    await asyncio.sleep(0)
+            except Exception as e:
+                self.failures += 1
+                log.error(f"Retention sweep failed", error=str(e), **progress)
+            finally:
+                self.current = None
+
+            self.sweeps += 1
+            self.last_sweep_at = time.time()
+            self.last_sweep_ms = (time.perf_counter() - start) * 1000
+            if progress["conversations"]:
+                log.info(f"Retention sweep", ms=f"{self.last_sweep_ms:.0f}", **progress)
+            return progress
+
+    async def _purge_chunk(self, cutoff: datetime, progress: dict) -> tuple[int, int]:
+        """Purge up to `batch_size` expired conversations. Returns (selected, purged)."""
+        expired = expired_clause(cutoff)
+        async with async_session() as db:
+            ids = (await db.execute(
+                select(Conversation.id).where(expired).order_by(Conversation.last_active_at).limit(self.batch_size)
+            )).scalars().all()
+            # End the read before writing: upgrading a read transaction can fail on SQLite
+            await db.rollback()
+            selected = len(ids)
+
+            writes = get_write_behind()
+            if writes is not None:
+                busy = [cid for cid in ids if cid in writes]
+                self.skipped_pending += len(busy)
+                ids = [cid for cid in ids if cid not in writes]
+            if not ids:
+                return selected, 0
+
+            if self.archive_path:
+                archived = await self._archive(db, ids)
+                await db.rollback()
+                progress["archived"] += archived
+                self.archived += archived
+
+            conversations, messages = await delete_conversations(db, ids, where=expired)
+
+        self.chunks += 1
+        self.conversations_purged += conversations
+        self.messages_purged += messages
+        progress["chunks"] += 1
+        progress["conversations"] += conversations
+        progress["messages"] += messages
+        log.debug(f"Retention chunk purged", conversations=conversations, messages=messages)
+        return selected, conversations
+
+    async def _archive(self, db: AsyncSession, conversation_ids: list[str]) -> int:
+        """Append the conversations and their messages to the archive file, one JSONL line each."""
+        conversations = (await db.execute(
+            select(Conversation.id, Conversation.user_id, Conversation.created_at, Conversation.last_active_at)
+            .where(Conversation.id.in_(conversation_ids))
+        )).all()
+        messages = (await db.execute(
+            select(
+                Message.conversation_id, Message.id, Message.role, Message.content, Message.drift_score,
+                Message.risk_score, Message.action, Message.red_team_result, Message.blue_team_result,
+                Message.created_at,
+            )
+            .where(Message.conversation_id.in_(conversation_ids))
+            .order_by(Message.conversation_id, Message.created_at)
+        )).all()
+
+        by_conversation: dict[str, list[dict]] = {}
+        for m in messages:
+            by_conversation.setdefault(m.conversation_id, []).append({
+                "id": m.id,
+                "role": m.role,
+                "content": m.content,
+                "drift_score": m.drift_score,
+                "risk_score": m.risk_score,
+                "action": m.action,
+                "red_team_result": m.red_team_result,
+                "blue_team_result": m.blue_team_result,
+                "created_at": m.created_at.isoformat() if m.created_at else None,
+            })
+        lines = "".join(
+            json.dumps({
+                "id": c.id,
+                "user_id": c.user_id,
+                "created_at": c.created_at.isoformat() if c.created_at else None,
+                "last_active_at": c.last_active_at.isoformat() if c.last_active_at else None,
+                "messages": by_conversation.get(c.id, []),
+            }) + "\n"
+            for c in conversations
+        )
+        await asyncio.to_thread(self._append, lines)
+        return len(conversations)
+
+    def _append(self, lines: str):
+        with open(self.archive_path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    # ── Lifecycle ──
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while not self._stopping:
+            await self.sweep()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self):
+        """Stop after the chunk in flight; cancelling mid-transaction could leave its lock behind."""
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "interval_seconds": self.interval,
+            "sweeps": self.sweeps,
+            "chunks": self.chunks,
+            "conversations_purged": self.conversations_purged,
+            "messages_purged": self.messages_purged,
+            "archived": self.archived,
+            "skipped_pending": self.skipped_pending,
+            "failures": self.failures,
+            "last_sweep_at": self.last_sweep_at,
+            "last_sweep_ms": round(self.last_sweep_ms, 2),
+            "in_progress": self.current,
+        }
+
+
+_worker: RetentionWorker | None = None
+
+
+def get_retention() -> RetentionWorker | None:
+    """The process-wide retention worker, or None when retention is off."""
+    global _worker
+    if not settings.retention_enabled:
+        return None
+    if _worker is None:
+        _worker = RetentionWorker(
+            (settings.retention_ttl_minutes or settings.session_ttl_minutes) * 60,
+            settings.retention_interval_seconds,
+            settings.retention_batch_size,
+            settings.retention_archive_path,
+        )
+    return _worker
+
+
+def start_retention():
+    worker = get_retention()
+    if worker is not None:
+        worker.start()
+
+
+async def close_retention():
+    global _worker
+    if _worker is not None:
+        await _worker.stop()
+        _worker = None
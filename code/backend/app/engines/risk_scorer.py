@@ -21,6 +21,25 @@ def compute_risk(
         final = 0.4 * blue_team_risk_score + 0.3 * drift_score_scaled + 0.3 * red_team_confidence_scaled
         Scale: 0–100
     """
+    risk = score_risk(red_team, blue_team, drift)
+
+    log.threat(
+        f"Risk assessment: {risk.action.upper()}",
+        score=f"{risk.final_score:.1f}/100",
+        red=f"{red_team.confidence_score * 100:.1f}",
+        blue=f"{blue_team.risk_score:.1f}",
+        drift=f"{drift.score * 100:.1f}",
+    )
+
+    return risk
+
+
+def score_risk(
+    red_team: RedTeamOutput,
+    blue_team: BlueTeamOutput,
+    drift: DriftInfo,
+) -> RiskAnalysis:
+    """compute_risk without the per-call log line (used by the offline corpus scanner)."""
     # Scale red-team confidence (0-1) to 0-100
     red_scaled = red_team.confidence_score * 100
 
@@ -57,14 +76,6 @@ def compute_risk(
         if red_team.attack_type not in categories:
             categories.append(red_team.attack_type)
 
-    log.threat(
-        f"Risk assessment: {action.upper()}",
-        score=f"{final_score:.1f}/100",
-        red=f"{red_scaled:.1f}",
-        blue=f"{blue_score:.1f}",
-        drift=f"{drift_scaled:.1f}",
-    )
-
     return RiskAnalysis(
         final_score=final_score,
         action=action,
@@ -73,3 +84,17 @@ def compute_risk(
         drift=drift,
         categories=categories,
     )
+
+
+def should_escalate(risk: RiskAnalysis) -> bool:
+    """
+    Cascade mode: decide whether a heuristic verdict needs the LLM tier.
+
+    Escalates when the score falls in the uncertainty band
+    [cascade_escalate_min, cascade_escalate_max), or when drift is
+    suspicious or worse. Scores below the band are confidently benign;
+    scores above it are confidently malicious.
+    """
+    in_band = settings.cascade_escalate_min <= risk.final_score < settings.cascade_escalate_max
+    drifting = settings.cascade_escalate_on_drift and risk.drift.interpretation != "stable"
+    return in_band or drifting
@@ -0,0 +1,233 @@
+"""
+Sentinel-AI — Known-Attack Signature Index
+Global ANN index over embeddings of prompts we have already blocked.
+A near-duplicate of a known attack reuses its cached red/blue-team verdict
+instead of paying for the LLM red-team and blue-team calls.
+
+Starts as an exact FAISS IndexFlatIP and switches to HNSW once it grows
+past `signature_index_hnsw_threshold`. Persisted as <path>.npy (vectors)
+plus <path>.json (verdicts + embedding model).
+"""
+
+import json
+import os
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.engines.embedding import _faiss_available
+from app.engines.memory import decode_embedding
+from app.models.db_models import Message
+from app.models.schemas import BlueTeamOutput, RedTeamOutput
+from app.utils.logger import log
+
+if _faiss_available:
+    import faiss
+
+# Near-identical signatures are not stored twice
+_DEDUP_SIMILARITY = 0.99
+
+
+@dataclass
+class SignatureMatch:
+    similarity: float
+    red_team: RedTeamOutput
+    blue_team: BlueTeamOutput
+
+
+class SignatureIndex:
+    """Cosine-similarity index of blocked-prompt embeddings and their verdicts."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.dim: int | None = None
+        self.index = None
+        self.hnsw = False
+        self._vectors: list[np.ndarray] = []
+        self._verdicts: list[dict] = []
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._verdicts)
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        arr = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        norm = np.linalg.norm(arr)
+        return arr / norm if norm > 0 else arr
+
+    def _build(self):
+        """(Re)build the ANN structure from the stored vectors."""
+        if not _faiss_available or self.dim is None:
+            return
+        self.hnsw = len(self._vectors) >= settings.signature_index_hnsw_threshold
+        if self.hnsw:
+            index = faiss.IndexHNSWFlat(self.dim, 32, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efSearch = 64
+        else:
+            index = faiss.IndexFlatIP(self.dim)
+        if self._vectors:
+            index.add(np.vstack(self._vectors))
+        self.index = index
+
+    def _search(self, query: np.ndarray) -> tuple[float, int]:
+        if _faiss_available and self.index is not None:
+            scores, ids = self.index.search(query, 1)
+            return float(scores[0][0]), int(ids[0][0])
+        sims = np.vstack(self._vectors) @ query[0]
+        best = int(np.argmax(sims))
+        return float(sims[best]), best
+
+    def lookup(self, vector) -> SignatureMatch | None:
+        """Return the cached verdict of the closest known attack, if similar enough."""
+        if not self._verdicts or self.dim is None or len(vector) != self.dim:
+            return None
+        similarity, idx = self._search(self._normalize(vector))
+        if idx < 0 or similarity < settings.signature_match_threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        verdict = self._verdicts[idx]
+        return SignatureMatch(
+            similarity=round(similarity, 4),
+            red_team=RedTeamOutput(**verdict["red_team"]),
+            blue_team=BlueTeamOutput(**verdict["blue_team"]),
+        )
+
+    def add(self, vector, red_team: dict, blue_team: dict) -> bool:
+        """Add a confirmed-malicious prompt. Returns False if skipped (dim mismatch or duplicate)."""
+        arr = self._normalize(vector)
+        if self.dim is None:
+            self.dim = arr.shape[1]
+            self._build()
+        elif arr.shape[1] != self.dim:
+            return False
+
+        if self._verdicts and self._search(arr)[0] >= _DEDUP_SIMILARITY:
+            return False
+
+        self._vectors.append(arr[0])
+        self._verdicts.append({"red_team": red_team, "blue_team": blue_team})
+        if _faiss_available and self.index is not None:
+            if not self.hnsw and len(self._vectors) >= settings.signature_index_hnsw_threshold:
+                self._build()
+            else:
+                self.index.add(arr)
+        return True
+
+    def save(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        vectors = np.vstack(self._vectors) if self._vectors else np.zeros((0, self.dim or 0), dtype=np.float32)
+        np.save(f"{path}.npy", vectors)
+        with open(f"{path}.json", "w", encoding="utf-8") as f:
+            json.dump({"model": self.model, "verdicts": self._verdicts}, f)
+        log.info(f"Signature index saved", path=path, signatures=len(self))
+
+    @classmethod
+    def load(cls, path: str, model: str) -> "SignatureIndex | None":
+        """Load a persisted index; returns None if missing or built for another embedding model."""
+        if not (os.path.exists(f"{path}.npy") and os.path.exists(f"{path}.json")):
+            return None
+        with open(f"{path}.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("model") != model:
+            log.warn(f"Signature index built for a different embedding model — ignoring", path=path)
+            return None
+
+        vectors = np.load(f"{path}.npy")
+        index = cls(model)
+        if len(vectors):
+            index.dim = vectors.shape[1]
+            index._vectors = list(vectors.astype(np.float32))
+            index._verdicts = meta["verdicts"]
+            index._build()
+        return index
+
+    def stats(self) -> dict:
+        return {
+            "signatures": len(self),
+            "dim": self.dim,
+            "type": "hnsw" if self.hnsw else "flat",
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+async def seed_from_db(db: AsyncSession, model: str, batch_size: int = 1000) -> SignatureIndex:
+    """Build an index from every stored user turn whose action was `block`."""
+    index = SignatureIndex(model)
+    offset = 0
+    while True:
+        result = await db.execute(
+            select(Message.embedding_vec, Message.embedding, Message.red_team_result, Message.blue_team_result)
+            .where(Message.role == "user", Message.action == "block")
+            .order_by(Message.created_at, Message.id)
+            .offset(offset)
+            .limit(batch_size)
+        )
+        rows = result.all()
+        if not rows:
+            break
+        for vec, js, red, blue in rows:
+            embedding = decode_embedding(vec, js)
+            if embedding is not None and red and blue:
+                index.add(embedding, red, blue)
+        offset += len(rows)
+
+    log.info(f"Signature index seeded from database", blocked_messages=offset, signatures=len(index))
+    return index
+
+
+# ── Process-wide index ───────────────────────────────────────────
+
+_index: SignatureIndex | None = None
+
+
+def signatures_enabled() -> bool:
+    # TF-IDF vectors are hash-seeded per process, so only provider embeddings are indexed
+    return settings.signature_index_enabled and not settings.dry_run
+
+
+def get_signature_index() -> SignatureIndex | None:
+    return _index
+
+
+async def init_signature_index(db: AsyncSession):
+    """Load the persisted index, or seed it from blocked messages if none exists."""
+    global _index
+    if not signatures_enabled():
+        return
+    _index = SignatureIndex.load(settings.signature_index_path, settings.embedding_model)
+    if _index is None:
+        _index = await seed_from_db(db, settings.embedding_model)
+    log.info(f"Signature index ready", **_index.stats())
+
+
+def close_signature_index():
+    """Persist the index on shutdown (an empty one is re-seeded from the database next start)."""
+    global _index
+    if _index is not None:
+        if len(_index):
+            _index.save(settings.signature_index_path)
+        _index = None
+
+
+def match_signature(vector) -> SignatureMatch | None:
+    if _index is None:
+        return None
+    match = _index.lookup(vector)
+    if match is not None:
+        log.threat(f"Known attack signature matched", similarity=f"{match.similarity:.3f}", category=match.blue_team.attack_category)
+    return match
+
+
+def record_signature(vector, red_team: dict, blue_team: dict):
+    """Add a newly blocked prompt to the index (online update)."""
+    if _index is not None and _index.add(vector, red_team, blue_team):
+        log.debug(f"Attack signature added", signatures=len(_index))
@@ -0,0 +1,182 @@
+"""
+Sentinel-AI — Verdict Cache
+TTL- and size-bounded cache of LLM-tier risk verdicts for repeated prompts.
+
+The key covers the normalized prompt, a fingerprint of the recent
+conversation context, and everything that shapes a verdict: analysis
+mode, provider and model names, and the scoring thresholds. A config
+change therefore produces new keys instead of serving stale verdicts.
+
+Cached entries keep the red/blue-team outputs and the explanation; the
+route re-scores them against the current drift so the drift component
+is always fresh.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+
+from app.config import settings
+from app.engines.embedding import normalize_text
+from app.models.schemas import RiskAnalysis
+from app.utils.cache import LRUCache, SQLiteKV
+from app.utils.logger import log
+
+
+@dataclass
+class VerdictEntry:
+    risk: RiskAnalysis
+    explanation: str
+    tier: str
+    created_at: float = field(default_factory=time.time)
+    hits: int = 0
+
+    def to_json(self) -> bytes:
+        return json.dumps({
+            "risk": self.risk.model_dump(),
+            "explanation": self.explanation,
+            "tier": self.tier,
+            "created_at": self.created_at,
+            "hits": self.hits,
+        }).encode("utf-8")
+
+    @classmethod
+    def from_json(cls, raw: bytes) -> "VerdictEntry":
+        data = json.loads(raw)
+        return cls(
+            risk=RiskAnalysis(**data["risk"]),
+            explanation=data["explanation"],
+            tier=data["tier"],
+            created_at=data["created_at"],
+            hits=data.get("hits", 0),
+        )
+
+
+def _config_fingerprint() -> str:
+    """Everything in the config that can change a verdict."""
+    model = {"openai": settings.openai_model, "gemini": settings.gemini_model, "groq": settings.groq_model}.get(settings.llm_provider)
+    return json.dumps([
+        settings.analysis_mode,
+        settings.fused_analysis,
+        settings.llm_provider,
+        model,
+        settings.embedding_model,
+        settings.threshold_allow,
+        settings.threshold_warn,
+        settings.threshold_rewrite,
+        settings.cascade_escalate_min,
+        settings.cascade_escalate_max,
+        settings.cascade_escalate_on_drift,
+    ])
+
+
+class VerdictCache:
+    """In-memory LRU with TTL, plus an optional SQLite tier (VERDICT_CACHE_PATH)."""
+
+    def __init__(self):
+        self.ttl_seconds = settings.verdict_cache_ttl_seconds
+        self.memory = LRUCache(settings.verdict_cache_size, ttl_seconds=self.ttl_seconds)
+        self.disk: SQLiteKV | None = None
+        if settings.verdict_cache_path:
+            self.disk = SQLiteKV(settings.verdict_cache_path, table="verdicts", max_entries=settings.verdict_cache_size * 10)
+
+    @staticmethod
+    def key(prompt: str, context: str) -> str:
+        context_fp = hashlib.sha256(context.encode("utf-8")).hexdigest()
+        material = "\0".join([_config_fingerprint(), context_fp, normalize_text(prompt)])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> VerdictEntry | None:
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            raw = await asyncio.to_thread(self.disk.get, key)
+            if raw is not None:
+                entry = VerdictEntry.from_json(raw)
+                if entry.created_at + self.ttl_seconds < time.time():
+                    await asyncio.to_thread(self.disk.delete, key)
+                    entry = None
+                else:
+                    await self._persist_hits(self.memory.set(key, entry))
+
+        if entry is not None:
+            entry.hits += 1
+        return entry
+
+    async def put(self, key: str, entry: VerdictEntry):
+        evicted = self.memory.set(key, entry)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, entry.to_json())
+            await self._persist_hits(evicted)
+
+    async def _persist_hits(self, entries: list[tuple[str, VerdictEntry]]):
+        """Write hit counts of entries leaving memory back to the disk tier."""
+        if self.disk is None:
+            return
+        for key, entry in entries:
+            if entry.hits:
+                await asyncio.to_thread(self.disk.set, key, entry.to_json())
+
+    async def flush(self) -> dict:
+        """Drop every cached verdict from both tiers."""
+        flushed = {"memory": len(self.memory), "disk": 0}
+        self.memory.clear()
+        if self.disk is not None:
+            flushed["disk"] = await asyncio.to_thread(self.disk.count)
+            await asyncio.to_thread(self.disk.clear)
+        log.info(f"Verdict cache flushed", **flushed)
+        return flushed
+
+    def top(self, limit: int = 20) -> list[dict]:
+        """Most-hit resident entries."""
+        now = time.time()
+        entries = self.memory.items()
+        entries.sort(key=lambda kv: kv[1].hits, reverse=True)
+        return [
+            {
+                "key": key[:16],
+                "hits": entry.hits,
+                "action": entry.risk.action,
+                "score": entry.risk.final_score,
+                "tier": entry.tier,
+                "age_seconds": round(now - entry.created_at, 1),
+            }
+            for key, entry in entries[:limit]
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+    def close(self):
+        if self.disk is not None:
+            # Resident hit counts would otherwise be lost with the process
+            for key, entry in self.memory.items():
+                if entry.hits:
+                    self.disk.set(key, entry.to_json())
+            self.disk.close()
+            self.disk = None
+
+
+_cache: VerdictCache | None = None
+
+
+def get_verdict_cache() -> VerdictCache | None:
+    """The process-wide verdict cache, or None when disabled."""
+    global _cache
+    if not settings.verdict_cache_enabled:
+        return None
+    if _cache is None:
+        _cache = VerdictCache()
+    return _cache
+
+
+def close_verdict_cache():
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
@@ -0,0 +1,319 @@
+"""
+Sentinel-AI — Write-Behind Persistence
+Optional mode (WRITE_BEHIND_ENABLED) where /analyze enqueues its two
+messages in memory and returns without touching the disk. A background
+task writes queued turns in multi-row transactions, either when
+WRITE_BEHIND_BATCH_SIZE turns are waiting or every
+WRITE_BEHIND_FLUSH_MS milliseconds, and drains the queue on shutdown.
+
+Reads stay consistent through a per-conversation overlay: the pending
+conversation row and the queued turns. Readers snapshot the overlay
+before querying the database and fold in only the queued turns the query
+did not already return, so a flush that commits mid-read neither loses
+nor double-counts a turn. The overlay keeps no drift totals of its own:
+the centroid is always the row's committed sum plus the queued deltas.
+
+A batch whose transaction fails is retried with growing pauses; after
+WRITE_BEHIND_MAX_ATTEMPTS failures its rows are written one transaction
+each, and rows that still fail are logged and dropped (dead-lettered) so
+a single bad turn cannot stall persistence and, through backpressure,
+every /analyze request.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.config import settings
+from app.database import async_session
+from app.engines.embedding import accumulate_embedding, running_centroid
+from app.engines.memory import BufferedTurn, ConversationState, merge_turns, write_turns
+from app.models.db_models import Conversation
+from app.utils.logger import log
+from app.utils.vectors import decode_vector
+
+
+@dataclass
+class ConversationOverlay:
+    """Not-yet-committed state of one conversation."""
+    conversation: Conversation | None  # the queued row while `inserting`
+    turns: list[BufferedTurn] = field(default_factory=list)
+    inserting: bool = False  # conversation row itself is still queued
+
+    def snapshot(self) -> "ConversationOverlay":
+        return ConversationOverlay(self.conversation, list(self.turns), self.inserting)
+
+    def uncommitted(self, history: list[dict]) -> list[BufferedTurn]:
+        """Queued turns missing from `history`, a DB read taken after this snapshot."""
+        # Turns are written in queue order, so whatever a flush committed since the
+        # snapshot is a prefix ending at the newest queued turn the read returned
+        stored = {m.get("id") for m in history}
+        for i in range(len(self.turns) - 1, -1, -1):
+            if self.turns[i].message_ids[0] in stored:
+                return self.turns[i + 1:]
+        return self.turns
+
+    def merge_history(self, history: list[dict], limit: int = 20) -> list[dict]:
+        return merge_turns(history, self.uncommitted(history), limit)
+
+    def centroid(self, state: ConversationState) -> np.ndarray | None:
+        """Drift centroid of the row as read into `state`, plus the queued turns it does not include."""
+        vec_sum = decode_vector(state.embedding_sum) if state.embedding_sum is not None else None
+        count = state.embedding_count or 0
+        for turn in self.uncommitted(state.history):
+            vec_sum, count = accumulate_embedding(vec_sum, count, turn.embedding)
+        return running_centroid(vec_sum, count)
+
+
+class WriteBehindQueue:
+    """In-memory turn queue with a read overlay, flushed in batched transactions by a background task."""
+
+    def __init__(self, batch_size: int, flush_ms: float, max_pending: int, max_attempts: int = 5):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_ms / 1000
+        self.max_pending = max(self.batch_size, max_pending)
+        self.max_attempts = max(1, max_attempts)
+        self._pending: list[BufferedTurn] = []
+        self._new_conversations: dict[str, Conversation] = {}
+        self._overlays: dict[str, ConversationOverlay] = {}
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self._attempts = 0  # consecutive failures of the batch at the head of the queue
+        self._retry_at = 0.0
+        self.enqueued = 0
+        self.written = 0
+        self.transactions = 0
+        self.failures = 0
+        self.dead_letters = 0
+        self.max_depth = 0
+        self.last_flush_ms = 0.0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __contains__(self, conversation_id: str) -> bool:
+        """Whether anything of the conversation is still queued."""
+        return conversation_id in self._overlays
+
+    # ── Reads ──
+
+    def snapshot(self, conversation_id: str) -> ConversationOverlay | None:
+        """Take before any DB read of the conversation; None when nothing is pending for it."""
+        overlay = self._overlays.get(conversation_id)
+        return overlay.snapshot() if overlay is not None else None
+
+    def create_conversation(self, conversation_id: str, user_id: str) -> ConversationOverlay:
+        """Queue a new conversation row and return its overlay (or the existing one)."""
+        overlay = self._overlays.get(conversation_id)
+        if overlay is None:
+            conv = Conversation(id=conversation_id, user_id=user_id, embedding_count=0, message_count=0, created_at=datetime.now(timezone.utc))
+            self._new_conversations[conversation_id] = conv
+            overlay = self._overlays[conversation_id] = ConversationOverlay(conv, inserting=True)
+            self._wake_if_full()
+            log.info(f"New conversation created", conversation_id=conversation_id, user_id=user_id, queued=True)
+        return overlay.snapshot()
+
+    # ── Writes ──
+
+    async def enqueue(self, turn: BufferedTurn):
+        """Queue a turn; readers see it through the conversation's overlay until it is written."""
+        while len(self._pending) >= self.max_pending:
+            # Backpressure: the database is behind, wait for the flusher instead of growing without bound
+            self._wake.set()
+            await asyncio.sleep(self.flush_interval)
+
+        overlay = self._overlays.get(turn.conversation_id)
+        if overlay is None:
+            overlay = self._overlays[turn.conversation_id] = ConversationOverlay(None)
+        overlay.turns.append(turn)
+
+        self._pending.append(turn)
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, len(self._pending))
+        self._wake_if_full()
+
+    async def discard(self, conversation_id: str) -> int:
+        """Drop everything queued for a conversation being deleted. Returns turns dropped."""
+        async with self._flush_lock:
+            self._new_conversations.pop(conversation_id, None)
+            overlay = self._overlays.pop(conversation_id, None)
+            if overlay is None:
+                return 0
+            self._pending = [t for t in self._pending if t.conversation_id != conversation_id]
+            return len(overlay.turns)
+
+    def _wake_if_full(self):
+        if len(self._pending) + len(self._new_conversations) >= self.batch_size:
+            self._wake.set()
+
+    async def flush(self) -> int:
+        """Write everything queued, `batch_size` turns per transaction. Returns turns written."""
+        async with self._flush_lock:
+            written = 0
+            while self._pending or self._new_conversations:
+                if self._attempts and not self._stopping and time.monotonic() < self._retry_at:
+                    return written
+                batch = self._pending[:self.batch_size]
+                conversations = list(self._new_conversations.values())
+                start = time.perf_counter()
+                try:
+                    await self._write(conversations, batch)
+                except Exception as e:
+                    self.failures += 1
+                    self._attempts += 1
+                    if self._attempts < self.max_attempts:
+                        self._retry_at = time.monotonic() + self.flush_interval * 2 ** self._attempts
+                        log.error(f"Write-behind flush failed, will retry", turns=len(batch), attempt=self._attempts, error=str(e))
+                        return written
+                    log.error(f"Write-behind flush failed, writing rows one by one", turns=len(batch), attempts=self._attempts, error=str(e))
+                    self._attempts = 0
+                    written += await self._write_each(conversations, batch)
+                    continue
+
+                self._attempts = 0
+                self._remove(conversations, batch)
+                self.written += len(batch)
+                written += len(batch)
+                self.transactions += 1
+                self.last_flush_ms = (time.perf_counter() - start) * 1000
+                log.debug(f"Write-behind flush", turns=len(batch), conversations=len(conversations), ms=lambda: f"{self.last_flush_ms:.1f}")
+            return written
+
+    async def _write(self, conversations: list[Conversation], batch: list[BufferedTurn]):
+        async with async_session() as db:
+            for conv in conversations:
+                db.add(Conversation(id=conv.id, user_id=conv.user_id, created_at=conv.created_at, embedding_count=0, message_count=0))
+            await write_turns(db, batch)
+            await db.commit()
+
+    async def _write_each(self, conversations: list[Conversation], batch: list[BufferedTurn]) -> int:
+        """One transaction per row for a batch that keeps failing; rows that still fail are dropped."""
+        for conv in conversations:
+            try:
+                await self._write([conv], [])
+                self.transactions += 1
+            except Exception as e:
+                self.dead_letters += 1
+                log.error(f"Write-behind dropped conversation row", conversation_id=conv.id, user_id=conv.user_id, error=str(e))
+
+        written = 0
+        for turn in batch:
+            try:
+                await self._write([], [turn])
+                self.transactions += 1
+                written += 1
+            except Exception as e:
+                self.dead_letters += 1
+                log.error(
+                    f"Write-behind dropped turn",
+                    conversation_id=turn.conversation_id,
+                    message_ids=",".join(turn.message_ids),
+                    action=turn.action,
+                    error=str(e),
+                )
+        self._remove(conversations, batch)
+        self.written += written
+        return written
+
+    def _remove(self, conversations: list[Conversation], batch: list[BufferedTurn]):
+        """Drop written (or dead-lettered) rows from the queue and the overlay."""
+        for conv in conversations:
+            self._new_conversations.pop(conv.id, None)
+            self._overlays[conv.id].inserting = False
+        del self._pending[:len(batch)]
+
+        touched = {conv.id for conv in conversations}
+        for turn in batch:
+            self._overlays[turn.conversation_id].turns.remove(turn)
+            touched.add(turn.conversation_id)
+        for cid in touched:
+            overlay = self._overlays[cid]
+            if not overlay.turns and not overlay.inserting:
+                del self._overlays[cid]
+
+    # ── Lifecycle ──
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error(f"Write-behind flusher error", error=str(e))
+
+    async def drain(self):
+        """Stop the flusher and write whatever is still queued."""
+        if self._task is not None:
+            # Let an in-progress flush finish; cancelling it mid-transaction would leave its lock behind
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        # Each failed pass counts as an attempt, so a bad row ends up dead-lettered rather than blocking shutdown
+        for _ in range(self.max_attempts):
+            await self.flush()
+            if not self._pending and not self._new_conversations:
+                break
+        if self._pending or self._new_conversations:
+            log.error(f"Write-behind queue not fully drained", turns=len(self._pending), conversations=len(self._new_conversations))
+        else:
+            log.info(f"Write-behind queue drained", written=self.written, transactions=self.transactions)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "pending_conversations": len(self._new_conversations),
+            "overlays": len(self._overlays),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "transactions": self.transactions,
+            "failures": self.failures,
+            "dead_letters": self.dead_letters,
+            "max_depth": self.max_depth,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+        }
+
+
+_queue: WriteBehindQueue | None = None
+
+
+def get_write_behind() -> WriteBehindQueue | None:
+    """The process-wide write-behind queue, or None when the mode is off."""
+    global _queue
+    if not settings.write_behind_enabled:
+        return None
+    if _queue is None:
+        _queue = WriteBehindQueue(
+            settings.write_behind_batch_size,
+            settings.write_behind_flush_ms,
+            settings.write_behind_max_pending,
+            settings.write_behind_max_attempts,
+        )
+    return _queue
+
+
+def start_write_behind():
+    queue = get_write_behind()
+    if queue is not None:
+        queue.start()
+
+
+async def close_write_behind():
+    """Drain on shutdown so no acknowledged turn is lost."""
+    global _queue
+    if _queue is not None:
+        await _queue.drain()
+        _queue = None
@@ -12,9 +12,16 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 
 from app.config import settings
-from app.database import init_db
-from app.routes import analyze, sessions, health
+from app.database import async_session, close_db, init_db
+from app.routes import admin, analyze, sessions, health, metrics
+from app.engines.embedding import close_embedding_cache
+from app.engines.retention import close_retention, start_retention
+from app.engines.signatures import close_signature_index, init_signature_index
+from app.engines.verdict_cache import close_verdict_cache
+from app.engines.write_behind import close_write_behind, start_write_behind
+from app.utils.llm_client import get_providers, close_providers
 from app.utils.logger import log
+from app.utils.tracing import close_exporter
 
 
 @asynccontextmanager
@@ -25,12 +32,13 @@ async def lifespan(app: FastAPI):
     log.info("  🛡️  Sentinel-AI Security Gateway v2")
     log.info("=" * 60)
     log.info(f"  Mode:      {settings.analysis_mode}")
-    log.info(f"  Provider:  {settings.llm_provider}")
+    base_url = {"openai": settings.openai_base_url, "groq": settings.groq_base_url}.get(settings.llm_provider)
+    log.info(f"  Provider:  {settings.llm_provider}{f' ({base_url})' if base_url else ''}")
     model_name = {"openai": settings.openai_model, "gemini": settings.gemini_model, "groq": settings.groq_model}.get(settings.llm_provider, settings.openai_model)
     log.info(f"  Model:     {model_name}")
     log.info(f"  Embedding: {settings.embedding_model}")
     log.info(f"  Dry-run:   {settings.dry_run}")
-    log.info(f"  Database:  {settings.database_url.split('://')[0]}")
+    log.info(f"  Database:  {settings.database_url.split('://')[0]} ({settings.db_profile} profile{', read replica' if settings.database_read_url else ''})")
     log.info(f"  Thresholds: allow<{settings.threshold_allow} warn<{settings.threshold_warn} rewrite<{settings.threshold_rewrite} block≥{settings.threshold_rewrite}")
     log.info(f"  Port:      {settings.port}")
     log.info("=" * 60)
@@ -42,10 +50,32 @@ async def lifespan(app: FastAPI):
     await init_db()
     log.info("Database initialized")
 
+    # Known-attack signatures: load from disk or seed from blocked messages
+    async with async_session() as db:
+        await init_signature_index(db)
+
+    # Provider clients share one keep-alive pool for the app's lifetime
+    get_providers()
+
+    # Background flusher for write-behind persistence (no-op unless enabled)
+    start_write_behind()
+
+    # Purge conversations idle past the retention TTL (no-op unless enabled)
+    start_retention()
+
     yield
 
     # ── Shutdown ──
     log.info("Sentinel-AI shutting down")
+    await close_retention()
+    await close_write_behind()
+    await close_providers()
+    close_embedding_cache()
+    close_signature_index()
+    close_verdict_cache()
+    close_exporter()
+    await close_db()
+    log.flush()
 
 
 app = FastAPI(
@@ -68,6 +98,8 @@ app.add_middleware(
 app.include_router(analyze.router, prefix="/api", tags=["Analyze"])
 app.include_router(sessions.router, prefix="/api", tags=["Sessions"])
 app.include_router(health.router, prefix="/api", tags=["Health"])
+app.include_router(admin.router, prefix="/api", tags=["Admin"])
+app.include_router(metrics.router, prefix="/api", tags=["Metrics"])
 
 # ── Serve Frontend Static Files ──
 _frontend_dist = os.path.join(os.path.dirname(__file__), "..", "..", "..", "frontend", "dist")
@@ -0,0 +1,114 @@
+"""
+Sentinel-AI — Data Migrations
+One-off maintenance commands for existing databases.
+
+Usage:
+    python -m app.migrations backfill-drift [--batch-size N]
+    python -m app.migrations backfill-session-stats [--batch-size N]
+    python -m app.migrations convert-embeddings [--dtype float32|float16] [--batch-size N]
+    python -m app.migrations rebuild-signatures
+"""
+
+import argparse
+import asyncio
+
+from app.config import settings
+from app.database import async_session, engine, init_db
+from app.engines.memory import backfill_drift_state, backfill_session_stats, convert_embeddings_batch
+from app.engines.signatures import seed_from_db
+from app.utils.logger import log
+
+
+async def backfill_drift(batch_size: int):
+    """Populate running drift state for conversations created before it existed."""
+    await init_db()
+    async with async_session() as db:
+        updated = await backfill_drift_state(db, batch_size=batch_size)
+    log.info(f"Drift state backfill complete", conversations=updated)
+
+
+async def backfill_sessions(batch_size: int):
+    """Populate message counts, latest risk scores and last activity for conversations created before they existed."""
+    await init_db()
+    async with async_session() as db:
+        updated = await backfill_session_stats(db, batch_size=batch_size)
+    log.info(f"Session stats backfill complete", conversations=updated)
+
+
+async def convert_embeddings(dtype: str, batch_size: int):
+    """Convert legacy JSON message embeddings to binary vectors in batches and report savings."""
+    await init_db()
+    totals = {"rows": 0, "json_bytes": 0, "binary_bytes": 0, "json_decode_s": 0.0, "binary_decode_s": 0.0}
+    async with async_session() as db:
+        while True:
+            stats = await convert_embeddings_batch(db, dtype, batch_size=batch_size)
+            if not stats["rows"]:
+                break
+            for key in totals:
+                totals[key] += stats[key]
+            log.info(f"Embedding conversion progress", rows=totals["rows"])
+
+    if not totals["rows"]:
+        log.info("No JSON embeddings left to convert")
+        return
+
+    saved = 1 - totals["binary_bytes"] / totals["json_bytes"]
+    speedup = totals["json_decode_s"] / totals["binary_decode_s"] if totals["binary_decode_s"] else float("inf")
+    log.info(
+        f"Embedding conversion complete",
+        rows=totals["rows"],
+        dtype=dtype,
+        json_mb=f"{totals['json_bytes'] / 1e6:.2f}",
+        binary_mb=f"{totals['binary_bytes'] / 1e6:.2f}",
+        size_saved=f"{saved:.1%}",
+        json_decode_ms=f"{totals['json_decode_s'] * 1000:.1f}",
+        binary_decode_ms=f"{totals['binary_decode_s'] * 1000:.1f}",
+        decode_speedup=f"{speedup:.0f}x",
+    )
+
+
+async def rebuild_signatures():
+    """Rebuild the known-attack signature index from blocked messages and persist it."""
+    await init_db()
+    async with async_session() as db:
+        index = await seed_from_db(db, settings.embedding_model)
+    index.save(settings.signature_index_path)
+    log.info(f"Signature index rebuilt", **index.stats())
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.migrations", description="Sentinel-AI data migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    drift = commands.add_parser("backfill-drift", help="Rebuild per-conversation drift centroids")
+    drift.add_argument("--batch-size", type=int, default=200)
+
+    sessions = commands.add_parser("backfill-session-stats", help="Precompute per-conversation message counts, latest risk and last activity")
+    sessions.add_argument("--batch-size", type=int, default=500)
+
+    convert = commands.add_parser("convert-embeddings", help="Move JSON message embeddings to binary storage")
+    convert.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    convert.add_argument("--batch-size", type=int, default=500)
+
+    commands.add_parser("rebuild-signatures", help="Rebuild the known-attack signature index")
+
+    args = parser.parse_args()
+
+    async def run():
+        try:
+            if args.command == "backfill-drift":
+                await backfill_drift(args.batch_size)
+            elif args.command == "backfill-session-stats":
+                await backfill_sessions(args.batch_size)
+            elif args.command == "convert-embeddings":
+                await convert_embeddings(args.dtype, args.batch_size)
+            elif args.command == "rebuild-signatures":
+                await rebuild_signatures()
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
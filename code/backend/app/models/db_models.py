@@ -5,7 +5,7 @@ Database tables: conversations and messages.
 
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import Column, String, Float, Text, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, String, Float, Integer, Text, DateTime, ForeignKey, Index, JSON, LargeBinary
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -16,22 +16,44 @@ def _uuid():
 
 class Conversation(Base):
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Keyset pagination of /sessions, newest first
+        Index("ix_conversations_created_id", "created_at", "id"),
+        Index("ix_conversations_user_created_id", "user_id", "created_at", "id"),
+        Index("ix_conversations_last_active", "last_active_at"),
+    )
 
     id = Column(String, primary_key=True, default=_uuid)
     user_id = Column(String, nullable=False, index=True)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
-    messages = relationship("Message", back_populates="conversation", order_by="Message.created_at")
+    # Running drift state: sum and count of user-turn embeddings (NULL count = not backfilled)
+    embedding_sum = Column(LargeBinary, nullable=True)  # float64 vector (app.utils.vectors)
+    embedding_count = Column(Integer, nullable=True, default=0)
+
+    # Listing summary, kept current on every write (NULL message_count = not backfilled)
+    message_count = Column(Integer, nullable=True, default=0)
+    last_risk_score = Column(Float, nullable=True)
+    last_active_at = Column(DateTime, nullable=True, default=lambda: datetime.now(timezone.utc))  # retention clock
+
+    messages = relationship(
+        "Message", back_populates="conversation", order_by="Message.created_at",
+        cascade="all, delete-orphan", passive_deletes=True,
+    )
 
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_conversation_created", "conversation_id", "created_at"),
+    )
 
     id = Column(String, primary_key=True, default=_uuid)
-    conversation_id = Column(String, ForeignKey("conversations.id"), nullable=False, index=True)
+    conversation_id = Column(String, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False, index=True)
     role = Column(String, nullable=False)  # user | assistant | system
     content = Column(Text, nullable=False)
-    embedding = Column(JSON, nullable=True)  # stored as list[float]
+    embedding = Column(JSON, nullable=True)  # legacy list[float]; see embedding_vec
+    embedding_vec = Column(LargeBinary, nullable=True)  # float32/float16 vector (app.utils.vectors)
     drift_score = Column(Float, nullable=True)
     risk_score = Column(Float, nullable=True)
     action = Column(String, nullable=True)  # allow | warn | rewrite | block
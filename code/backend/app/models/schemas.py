@@ -50,6 +50,38 @@ class RiskAnalysis(BaseModel):
 
 # ──────────────────────────── Response ────────────────────────────
 
+class StageTimingInfo(BaseModel):
+    start_ms: float  # offset from the start of the request
+    duration_ms: float
+    db_queries: int = 0
+    db_ms: float = 0.0
+
+
+class ProviderCallTiming(BaseModel):
+    provider: str
+    operation: str  # chat | chat_stream | embedding
+    outcome: str  # ok | error | cancelled
+    stage: Optional[str] = None
+    start_ms: float
+    duration_ms: float
+
+
+class DbTiming(BaseModel):
+    queries: int = 0
+    ms: float = 0.0
+
+
+class TraceTimings(BaseModel):
+    """Per-request breakdown, returned when the request carries X-Sentinel-Trace: 1."""
+    trace_id: str
+    total_ms: float
+    stages: dict[str, StageTimingInfo]  # in start order
+    providers: list[ProviderCallTiming] = []
+    provider_ms: float = 0.0
+    retries: int = 0
+    db: DbTiming = DbTiming()
+
+
 class AnalyzeResponse(BaseModel):
     response: str
     risk_analysis: RiskAnalysis
@@ -60,6 +92,35 @@ class AnalyzeResponse(BaseModel):
     rewritten_prompt: Optional[str] = None
     conversation_id: str = ""
     dry_run: bool = False
+    verdict_tier: str = "heuristic"  # heuristic | llm | signature | cache
+    timings: Optional[TraceTimings] = None
+
+
+# ──────────────────────────── Batch ────────────────────────────
+
+class BatchAnalyzeRequest(BaseModel):
+    items: list[AnalyzeRequest] = Field(..., min_length=1)
+    concurrency: Optional[int] = Field(None, ge=1, le=64)  # default: BATCH_CONCURRENCY
+
+
+class BulkDeleteRequest(BaseModel):
+    conversation_ids: list[str] = Field(..., min_length=1)
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    conversation_id: str
+    ok: bool
+    result: Optional[AnalyzeResponse] = None
+    error: Optional[str] = None
+
+
+class BatchAnalyzeResponse(BaseModel):
+    results: list[BatchItemResult]
+    succeeded: int = 0
+    failed: int = 0
+    transactions: int = 0
+    total_ms: float = 0.0
 
 
 # ──────────────────────────── Health ────────────────────────────
@@ -0,0 +1,51 @@
+"""
+Sentinel-AI — Admin Routes
+Cache inspection and maintenance.
+"""
+
+from fastapi import APIRouter, HTTPException
+from app.engines.retention import get_retention
+from app.engines.verdict_cache import get_verdict_cache
+
+router = APIRouter()
+
+
+def _verdict_cache():
+    cache = get_verdict_cache()
+    if cache is None:
+        raise HTTPException(status_code=404, detail="Verdict cache is disabled")
+    return cache
+
+
+@router.get("/admin/verdict-cache")
+async def verdict_cache_stats(limit: int = 20):
+    """Verdict cache counters and the most-hit resident entries."""
+    cache = _verdict_cache()
+    return {**cache.stats(), "top_entries": cache.top(limit)}
+
+
+@router.delete("/admin/verdict-cache")
+async def flush_verdict_cache():
+    """Drop every cached verdict (memory and persistent tiers)."""
+    flushed = await _verdict_cache().flush()
+    return {"status": "flushed", "entries": flushed}
+
+
+def _retention():
+    worker = get_retention()
+    if worker is None:
+        raise HTTPException(status_code=404, detail="Retention is disabled")
+    return worker
+
+
+@router.get("/admin/retention")
+async def retention_stats():
+    """Retention worker counters and the progress of a sweep in flight."""
+    return _retention().stats()
+
+
+@router.post("/admin/retention/sweep")
+async def run_retention_sweep():
+    """Purge expired conversations now instead of waiting for the next interval."""
+    purged = await _retention().sweep()
+    return {"status": "swept", **purged}
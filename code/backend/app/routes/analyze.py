@@ -1,32 +1,60 @@
 """
 Sentinel-AI — Module 1: POST /analyze Route
 Full pipeline: intake → memory → embed → drift → red-team → blue-team → score → mitigate → LLM → explain → log
+POST /analyze/stream runs the same pipeline and streams it as Server-Sent Events.
+POST /analyze/batch runs many requests through it with grouped database writes.
+Requests sent with `X-Sentinel-Trace: 1` get a per-stage timing breakdown back.
 """
 
+import asyncio
 import json
-from fastapi import APIRouter, Depends
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+import numpy as np
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
-from app.database import get_db
-from app.models.schemas import AnalyzeRequest, AnalyzeResponse, RiskAnalysis
-from app.engines.memory import get_or_create_conversation, load_conversation_history, load_embedding_history, save_message
-from app.engines.embedding import generate_embedding, get_store
+from app.database import async_session, get_db
+from app.models.schemas import AnalyzeRequest, AnalyzeResponse, BatchAnalyzeRequest, BatchAnalyzeResponse, BatchItemResult, RiskAnalysis
+from app.engines.memory import BufferedTurn, ConversationState, TurnBuffer, load_conversation_state, load_store, save_turn
+from app.engines.embedding import add_to_store, generate_embedding
 from app.engines.drift import compute_drift
+from app.engines.signatures import get_signature_index, match_signature, record_signature
+from app.engines.verdict_cache import VerdictEntry, get_verdict_cache
+from app.engines.write_behind import get_write_behind
 from app.engines.redteam import run_redteam
 from app.engines.blueteam import run_blueteam
-from app.engines.risk_scorer import compute_risk
+from app.engines.risk_scorer import compute_risk, should_escalate
 from app.engines.mitigation import rewrite_prompt
 from app.engines.explainability import generate_explanation
-from app.utils.llm_client import chat_completion
+from app.engines.fused import run_fused_analysis
+from app.utils.llm_client import chat_completion, stream_chat_completion
 from app.utils.logger import log
+from app.utils.metrics import ACTIONS, ANALYZE_ERRORS, REQUEST_SECONDS, STAGE_SECONDS, VERDICTS, request_outcomes
+from app.utils.patterns import scan_prompt
+from app.utils.stages import Stage, StageGraph
+from app.utils.tracing import RequestTrace, current_trace, end_trace, start_trace, trace_requested
 
 
 router = APIRouter()
 
+# An SSE event sink: emit(event_name, payload)
+Emit = Callable[[str, dict], Awaitable[None]]
+
+# Streaming pipelines outlive a disconnected client so the turn is still logged
+_stream_tasks: set[asyncio.Task] = set()
+
 
 @router.post("/analyze", response_model=AnalyzeResponse)
-async def analyze(request: AnalyzeRequest, db: AsyncSession = Depends(get_db)):
+async def analyze(
+    request: AnalyzeRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    x_sentinel_trace: str | None = Header(None),
+):
     """
     Full Sentinel-AI analysis pipeline.
 
@@ -44,116 +72,508 @@ async def analyze(request: AnalyzeRequest, db: AsyncSession = Depends(get_db)):
         11. Generate explanation
         12. Log everything
         13. Return response
+
+    Stages are scheduled as a dependency graph (see app.utils.stages):
+    memory loading runs alongside embedding, red-team only waits for
+    memory, and the explanation runs alongside rewrite + main LLM.
+
+    With `X-Sentinel-Trace: 1` the response carries a `timings` block:
+    wall time of each stage above (memory, embed, drift, redteam,
+    blueteam, score, rewrite, main_llm, explain, persist, ...), every
+    provider call with its latency, provider retries, and SQL time per
+    stage. The trace id is returned in `X-Sentinel-Trace-Id`.
+    """
+    trace = start_trace("POST /analyze", trace_requested(x_sentinel_trace))
+    if trace is not None:
+        response.headers["X-Sentinel-Trace-Id"] = trace.trace_id
+    return await _analyze(request, db, trace=trace)
+
+
+@router.post("/analyze/stream")
+async def analyze_stream(request: AnalyzeRequest, x_sentinel_trace: str | None = Header(None)):
+    """
+    Streaming variant of /analyze (text/event-stream).
+
+    Events, in order:
+        verdict      risk analysis, as soon as the score is computed
+        rewrite      rewritten prompt (only when the action is rewrite)
+        token        main-LLM text deltas as the provider produces them
+        explanation  dashboard explanation
+        persisted    both turns are written to the database
+        done         end of stream (with `timings` when X-Sentinel-Trace: 1 is sent)
+    An `error` event replaces the remainder if the pipeline fails.
+    """
+    trace = start_trace("POST /analyze/stream", trace_requested(x_sentinel_trace))
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def emit(event: str, data: dict):
+        await events.put((event, data))
+
+    async def produce():
+        try:
+            # The pipeline owns its session so it can finish after the response closes
+            async with async_session() as db:
+                await _analyze(request, db, emit=emit, trace=trace)
+        except Exception as e:
+            log.error(f"Streaming analysis failed", conversation_id=request.conversation_id, error=str(e))
+            await emit("error", {"detail": str(e)})
+        finally:
+            await events.put(None)
+
+    task = asyncio.create_task(produce())
+    _stream_tasks.add(task)
+    task.add_done_callback(_stream_tasks.discard)
+
+    async def stream():
+        while (item := await events.get()) is not None:
+            yield _sse(*item)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if trace is not None:
+        headers["X-Sentinel-Trace-Id"] = trace.trace_id
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=headers)
+
+
+@router.post("/analyze/batch", response_model=BatchAnalyzeResponse)
+async def analyze_batch(batch: BatchAnalyzeRequest):
+    """
+    Analyze many prompts in one request (offline moderation, backfills).
+
+    Items of the same conversation run in submission order; different
+    conversations run in parallel, up to `concurrency` at a time. Turns are
+    buffered and written afterwards in transactions of BATCH_COMMIT_EVERY
+    turns. Each item reports its own result or error.
+    """
+    if len(batch.items) > settings.batch_max_items:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {settings.batch_max_items} items")
+
+    start = time.perf_counter()
+    groups: dict[str, list[tuple[int, AnalyzeRequest]]] = {}
+    for i, item in enumerate(batch.items):
+        groups.setdefault(item.conversation_id, []).append((i, item))
+
+    queue = deque(groups.values())
+    results: list[BatchItemResult | None] = [None] * len(batch.items)
+    pending = TurnBuffer()
+
+    async def lane():
+        while queue:
+            group = queue.popleft()
+            async with async_session() as db:
+                for i, item in group:
+                    try:
+                        response = await _analyze(item, db, pending=pending, ref=i)
+                        results[i] = BatchItemResult(index=i, conversation_id=item.conversation_id, ok=True, result=response)
+                    except Exception as e:
+                        await db.rollback()
+                        log.error(f"Batch item failed", index=i, conversation_id=item.conversation_id, error=str(e))
+                        results[i] = BatchItemResult(index=i, conversation_id=item.conversation_id, ok=False, error=str(e))
+
+    lanes = min(batch.concurrency or settings.batch_concurrency, len(groups))
+    await asyncio.gather(*(lane() for _ in range(lanes)))
+
+    async with async_session() as db:
+        transactions, failed = await pending.flush(db, settings.batch_commit_every)
+    for i in failed:
+        results[i] = BatchItemResult(index=i, conversation_id=results[i].conversation_id, ok=False, error="Failed to persist analysis")
+
+    succeeded = sum(1 for r in results if r.ok)
+    total_ms = (time.perf_counter() - start) * 1000
+    log.info(
+        f"Batch analysis complete",
+        items=len(results),
+        conversations=len(groups),
+        failed=len(results) - succeeded,
+        transactions=transactions,
+        total_ms=f"{total_ms:.0f}",
+    )
+    return BatchAnalyzeResponse(
+        results=results,
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        transactions=transactions,
+        total_ms=round(total_ms, 1),
+    )
+
+
+async def _analyze(
+    request: AnalyzeRequest,
+    db: AsyncSession,
+    emit: Emit | None = None,
+    pending: TurnBuffer | None = None,
+    ref=None,
+    trace: RequestTrace | None = None,
+) -> AnalyzeResponse:
+    """
+    Run the analysis pipeline. With `emit`, publish partial results as they
+    become available; with `pending`, buffer the turn there (tagged `ref`)
+    instead of writing it, and read earlier buffered turns as memory. With
+    `trace`, record where the time went (see app.utils.tracing).
     """
+    if trace is None:
+        return await _run_pipeline(request, db, emit, pending, ref, None)
+    token = current_trace.set(trace)
+    try:
+        return await _run_pipeline(request, db, emit, pending, ref, trace)
+    except Exception as e:
+        end_trace(trace, error=str(e))
+        raise
+    finally:
+        current_trace.reset(token)
+
+
+async def _run_pipeline(
+    request: AnalyzeRequest,
+    db: AsyncSession,
+    emit: Emit | None,
+    pending: TurnBuffer | None,
+    ref,
+    trace: RequestTrace | None,
+) -> AnalyzeResponse:
     prompt = request.prompt
     log.info(f"Analyzing prompt", conversation_id=request.conversation_id, user_id=request.user_id, length=len(prompt))
 
+    # Write-behind mode (batch requests buffer their own turns)
+    writes = get_write_behind() if pending is None else None
+
+    # Whether each verdict step got an LLM answer (filled in by the engines via record_outcome)
+    outcomes: dict[str, bool] = {}
+
     # ── 2. Load Memory ──
-    await get_or_create_conversation(db, request.conversation_id, request.user_id)
-    history = await load_conversation_history(db, request.conversation_id)
-    prior_embeddings = await load_embedding_history(db, request.conversation_id)
-    turn_number = len(history) + 1
+    async def load_memory():
+        if writes is not None:
+            return await load_memory_write_behind()
+        # One round trip: drift state + last turns (the row is upserted on first contact)
+        state = await load_conversation_state(db, request.conversation_id, request.user_id)
+        history, centroid = state.history, state.centroid()
+        if pending is not None:
+            history = pending.merge_history(history, request.conversation_id)
+            centroid = pending.centroid(state, centroid)
+        return await with_store(state, history, centroid)
+
+    async def load_memory_write_behind():
+        # Snapshot queued state before reading, so a concurrent flush can't hide a turn
+        overlay = writes.snapshot(request.conversation_id)
+        if overlay is not None and overlay.inserting:
+            state = ConversationState(request.conversation_id, None, 0, [])
+        else:
+            state = await load_conversation_state(db, request.conversation_id, request.user_id, create=False)
+            if state is None:
+                overlay = writes.create_conversation(request.conversation_id, request.user_id)
+                state = ConversationState(request.conversation_id, None, 0, [])
+        if overlay is None:
+            return await with_store(state, state.history, state.centroid())
+        return await with_store(state, overlay.merge_history(state.history), overlay.centroid(state))
 
-    # Build conversation context string for LLM prompts
-    context_str = "\n".join(f"{m['role']}: {m['content']}" for m in history[-5:])
+    async def with_store(state, history, centroid):
+        # Make sure the conversation's FAISS store is resident before we append to it
+        await load_store(db, state)
+        # Build conversation context string for LLM prompts
+        context_str = "\n".join(f"{m['role']}: {m['content']}" for m in history[-5:])
+        return {"state": state, "history": history, "centroid": centroid, "context": context_str}
 
     # ── 3. Generate Embedding ──
-    current_embedding = await generate_embedding(prompt)
+    async def embed():
+        return await generate_embedding(prompt)
 
     # Store in FAISS index
-    store = get_store(request.conversation_id)
-    store.add(current_embedding)
+    def index(memory, embed):
+        add_to_store(request.conversation_id, embed)
 
     # ── 4. Compute Drift ──
-    drift_info = await compute_drift(current_embedding, prior_embeddings, turn_number)
+    async def drift(memory, embed):
+        return await compute_drift(embed, memory["centroid"], len(memory["history"]) + 1)
+
+    # ── 4a. Single-pass pattern scan shared by the heuristic engines ──
+    def scan():
+        return scan_prompt(prompt)
+
+    # ── 4b. Verdict cache lookup (same prompt, same recent context, same config) ──
+    verdicts = get_verdict_cache()
+
+    async def cached(memory):
+        if verdicts is None:
+            return None
+        key = verdicts.key(prompt, memory["context"])
+        return {"key": key, "entry": await verdicts.get(key)}
 
-    # ── 5. Red-Team LLM ──
-    red_team_result = await run_redteam(prompt, context_str)
+    # ── 5a. Known-attack signature lookup ──
+    def signature(embed):
+        return match_signature(embed)
 
-    # ── 6. Blue-Team LLM ──
-    blue_team_result = await run_blueteam(prompt, red_team_result)
+    # ── 5b. Cascade triage: heuristic verdict first, LLM only when uncertain ──
+    async def triage(scan, drift, cached, signature=None):
+        if signature is not None or _hit(cached):
+            return None
+        red = await run_redteam(prompt, scan=scan, use_llm=False)
+        blue = await run_blueteam(prompt, red, scan, use_llm=False)
+        escalate = should_escalate(compute_risk(red, blue, drift))
+        if escalate:
+            log.info(f"Cascade escalating to LLM tier", drift=drift.interpretation)
+        return {"red_team": red, "blue_team": blue, "escalate": escalate}
+
+    # ── 5+6+11. Fused LLM analysis (opt-in): one call for red-team, blue-team and explanation ──
+    async def fused(memory, scan, drift, cached, signature=None, triage=None):
+        if signature is not None or _hit(cached) or (triage is not None and not triage["escalate"]):
+            return None
+        return await run_fused_analysis(prompt, memory["context"], drift, scan)
+
+    # ── 5. Red-Team LLM (skipped on a signature/cache hit or a confident triage) ──
+    async def redteam(memory, scan, cached, signature=None, triage=None, fused=None):
+        if signature is not None:
+            return signature.red_team
+        if _hit(cached):
+            return cached["entry"].risk.red_team
+        if triage is not None and not triage["escalate"]:
+            return triage["red_team"]
+        if fused is not None:
+            return fused.red_team
+        return await run_redteam(prompt, memory["context"], scan)
+
+    # ── 6. Blue-Team LLM (skipped on a signature/cache hit or a confident triage) ──
+    async def blueteam(redteam, scan, cached, signature=None, triage=None, fused=None):
+        if signature is not None:
+            return signature.blue_team
+        if _hit(cached):
+            return cached["entry"].risk.blue_team
+        if triage is not None and not triage["escalate"]:
+            return triage["blue_team"]
+        if fused is not None:
+            return fused.blue_team
+        return await run_blueteam(prompt, redteam, scan)
 
     # ── 7. Compute Risk Score ──
-    risk_analysis = compute_risk(red_team_result, blue_team_result, drift_info)
+    async def score(redteam, blueteam, drift, cached, signature=None):
+        risk = compute_risk(redteam, blueteam, drift)
+        if emit is not None:
+            await emit("verdict", {
+                "risk_analysis": risk.model_dump(),
+                "drift_score": drift.score,
+                "action_taken": risk.action,
+                "verdict_tier": _verdict_tier(signature, cached, outcomes),
+                "conversation_id": request.conversation_id,
+                "dry_run": settings.dry_run,
+            })
+        return risk
 
     # ── 8+9. Mitigation ──
-    rewritten = None
-    final_prompt = prompt
-
-    if risk_analysis.action == "rewrite":
-        rewritten = await rewrite_prompt(prompt)
-        final_prompt = rewritten
+    async def rewrite(score, scan, triage=None):
+        if score.action != "rewrite":
+            return None
+        rewritten = await rewrite_prompt(prompt, scan, use_llm=_tier_llm(triage))
         log.info(f"Prompt rewritten", original_len=len(prompt), rewritten_len=len(rewritten))
+        if emit is not None:
+            await emit("rewrite", {"rewritten_prompt": rewritten})
+        return rewritten
 
     # ── 10. Forward to Main LLM ──
-    response_text = ""
-    if risk_analysis.action == "block":
-        response_text = "⛔ This request has been blocked by Sentinel-AI security gateway. The prompt was identified as potentially malicious."
-        log.threat(f"BLOCKED", score=f"{risk_analysis.final_score:.0f}", categories=risk_analysis.categories)
-    elif settings.dry_run:
-        response_text = "[Sentinel dry-run] Placeholder response. Set OPENAI_API_KEY for real LLM responses."
-        log.info(f"Dry-run response", action=risk_analysis.action)
-    else:
-        response_text = await _call_main_llm(final_prompt, history)
-
-    # ── 11. Generate Explanation ──
-    explanation = await generate_explanation(prompt, risk_analysis)
+    async def main_llm(memory, score, rewrite):
+        if score.action == "block":
+            log.threat(f"BLOCKED", score=f"{score.final_score:.0f}", categories=score.categories)
+            response = "⛔ This request has been blocked by Sentinel-AI security gateway. The prompt was identified as potentially malicious."
+        elif settings.dry_run:
+            log.info(f"Dry-run response", action=score.action)
+            response = "[Sentinel dry-run] Placeholder response. Set OPENAI_API_KEY for real LLM responses."
+        elif emit is not None:
+            return await _stream_main_llm(rewrite or prompt, memory["history"], emit)
+        else:
+            return await _call_main_llm(rewrite or prompt, memory["history"])
+
+        if emit is not None:
+            await emit("token", {"text": response})
+        return response
+
+    # ── 11. Generate Explanation (runs alongside rewrite + main LLM) ──
+    async def explain(score, scan, cached, triage=None, fused=None):
+        if _hit(cached) and cached["entry"].risk.action == score.action:
+            return cached["entry"].explanation
+        if fused is not None:
+            # The fused call already spent its LLM round trip; fall back to the template
+            return fused.explanation or await generate_explanation(prompt, score, scan, use_llm=False)
+        return await generate_explanation(prompt, score, scan, use_llm=_tier_llm(triage))
 
     # ── 12. Log to Database ──
-    await save_message(
-        db,
-        conversation_id=request.conversation_id,
-        role="user",
-        content=prompt,
-        embedding=current_embedding,
-        drift_score=drift_info.score,
-        risk_score=risk_analysis.final_score,
-        action=risk_analysis.action,
-        red_team_result=red_team_result.model_dump(),
-        blue_team_result=blue_team_result.model_dump(),
-    )
+    async def persist(memory, embed, drift, redteam, blueteam, score, main_llm):
+        if score.action == "block":
+            record_signature(embed, redteam.model_dump(), blueteam.model_dump())
 
-    await save_message(
-        db,
-        conversation_id=request.conversation_id,
-        role="assistant",
-        content=response_text,
-    )
+        turn = BufferedTurn(
+            conversation_id=request.conversation_id,
+            prompt=prompt,
+            response=main_llm,
+            embedding=np.asarray(embed),
+            drift_score=drift.score,
+            risk_score=score.final_score,
+            action=score.action,
+            red_team_result=redteam.model_dump(),
+            blue_team_result=blueteam.model_dump(),
+            ref=ref,
+        )
+        if writes is not None:
+            # Queued in memory; the response does not wait for the disk
+            await writes.enqueue(turn)
+        elif pending is not None:
+            pending.add(turn)
+        else:
+            await save_turn(db, memory["state"], turn)
+
+    # Only wait on the signature lookup when there are signatures to match
+    signature_index = get_signature_index()
+    gate = ("signature",) if signature_index is not None and len(signature_index) else ()
+    cascade = settings.analysis_mode == "cascade" and settings.use_llm
+    tiered = ("triage",) if cascade else ()
+    fusing = ("fused",) if settings.fused_analysis and settings.use_llm else ()
+
+    pipeline = StageGraph([
+        Stage("memory", load_memory),
+        Stage("embed", embed),
+        Stage("index", index, deps=("memory", "embed")),
+        Stage("drift", drift, deps=("memory", "embed")),
+        Stage("scan", scan),
+        Stage("cached", cached, deps=("memory",)),
+        Stage("signature", signature, deps=("embed",)),
+        *([Stage("triage", triage, deps=("scan", "drift", "cached") + gate)] if cascade else []),
+        *([Stage("fused", fused, deps=("memory", "scan", "drift", "cached") + gate + tiered)] if fusing else []),
+        Stage("redteam", redteam, deps=("memory", "scan", "cached") + gate + tiered + fusing),
+        Stage("blueteam", blueteam, deps=("redteam", "scan", "cached") + gate + tiered + fusing),
+        Stage("score", score, deps=("redteam", "blueteam", "drift", "cached") + gate),
+        Stage("rewrite", rewrite, deps=("score", "scan") + tiered),
+        Stage("main_llm", main_llm, deps=("memory", "score", "rewrite")),
+        Stage("explain", explain, deps=("score", "scan", "cached") + tiered + fusing),
+        Stage("persist", persist, deps=("memory", "embed", "drift", "redteam", "blueteam", "score", "main_llm")),
+    ])
+    mode = "stream" if emit is not None else "batch" if pending is not None else "analyze"
+    if trace is not None:
+        trace.pipeline_ms = trace.elapsed_ms()
+    token = request_outcomes.set(outcomes)
+    try:
+        run = await pipeline.run()
+    except Exception:
+        ANALYZE_ERRORS.inc(mode)
+        raise
+    finally:
+        request_outcomes.reset(token)
+
+    risk_analysis = run["score"]
+    drift_info = run["drift"]
+    tier = _verdict_tier(run.results.get("signature"), run["cached"], outcomes)
+
+    for stage, timing in run.timings.items():
+        STAGE_SECONDS.observe(timing.duration_ms / 1000, stage)
+    REQUEST_SECONDS.observe(run.total_ms / 1000, mode)
+    ACTIONS.inc(risk_analysis.action)
+    VERDICTS.inc(tier)
+
+    # Remember verdicts the LLM fully produced; heuristic ones (including fallbacks
+    # after a failed call) are cheaper to recompute than to serve for a whole TTL
+    if tier == "llm" and outcomes.get("explain") and run["cached"] is not None:
+        await verdicts.put(run["cached"]["key"], VerdictEntry(risk_analysis, run["explain"], tier))
 
     log.info(
         f"Analysis complete",
         action=risk_analysis.action,
         score=f"{risk_analysis.final_score:.0f}/100",
         drift=f"{drift_info.score:.3f}",
+        tier=tier,
+        total_ms=f"{run.total_ms:.0f}",
     )
 
+    timings = None
+    if trace is not None:
+        trace.record_stages(run)
+        trace.attributes.update({
+            "sentinel.mode": mode,
+            "sentinel.action": risk_analysis.action,
+            "sentinel.verdict_tier": tier,
+            "sentinel.final_score": risk_analysis.final_score,
+            "sentinel.conversation_id": request.conversation_id,
+        })
+        end_trace(trace)
+        timings = trace.timings() if trace.requested else None
+
+    if emit is not None:
+        await emit("explanation", {"explanation": run["explain"]})
+        await emit("persisted", {"conversation_id": request.conversation_id, "messages": 2, "queued": writes is not None})
+        await emit("done", {"total_ms": round(run.total_ms, 1), **({"timings": timings} if timings else {})})
+
     # ── 13. Return ──
     return AnalyzeResponse(
-        response=response_text,
+        response=run["main_llm"],
         risk_analysis=risk_analysis,
-        explanation=explanation,
+        explanation=run["explain"],
         drift_score=drift_info.score,
         action_taken=risk_analysis.action,
         original_prompt=prompt,
-        rewritten_prompt=rewritten,
+        rewritten_prompt=run["rewrite"],
         conversation_id=request.conversation_id,
         dry_run=settings.dry_run,
+        verdict_tier=tier,
+        timings=timings,
     )
 
 
-async def _call_main_llm(prompt: str, history: list[dict]) -> str:
-    """Forward the (possibly rewritten) prompt to the main LLM."""
+def _tier_llm(triage: dict | None) -> bool | None:
+    """Per-request LLM switch for cascade mode; None defers to settings.use_llm."""
+    return None if triage is None else triage["escalate"]
+
+
+def _hit(cached: dict | None) -> bool:
+    return cached is not None and cached["entry"] is not None
+
+
+def _verdict_tier(signature, cached: dict | None, outcomes: dict[str, bool]) -> str:
+    """
+    Which tier produced the verdict: signature index, verdict cache,
+    heuristics, or the LLM. "llm" means both the red-team and blue-team
+    steps got a model answer; a skipped or failed call leaves the
+    heuristic verdict in place.
+    """
+    if signature is not None:
+        return "signature"
+    if _hit(cached):
+        return "cache"
+    return "llm" if outcomes.get("redteam") and outcomes.get("blueteam") else "heuristic"
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _main_llm_messages(prompt: str, history: list[dict]) -> list[dict]:
     messages = [{"role": "system", "content": "You are a helpful AI assistant."}]
     for msg in history[-10:]:
         messages.append({"role": msg["role"], "content": msg["content"]})
     messages.append({"role": "user", "content": prompt})
+    return messages
+
 
+async def _call_main_llm(prompt: str, history: list[dict]) -> str:
+    """Forward the (possibly rewritten) prompt to the main LLM."""
     try:
         return await chat_completion(
-            messages=messages,
+            messages=_main_llm_messages(prompt, history),
             temperature=0.7,
             max_tokens=1000,
         )
     except Exception as e:
         log.error(f"Main LLM call failed", error=str(e))
         return f"[Error] Unable to generate response: {str(e)}"
+
+
+async def _stream_main_llm(prompt: str, history: list[dict], emit: Emit) -> str:
+    """Forward to the main LLM, emitting each text delta; returns the full response for logging."""
+    chunks = []
+    try:
+        async for delta in stream_chat_completion(
+            messages=_main_llm_messages(prompt, history),
+            temperature=0.7,
+            max_tokens=1000,
+        ):
+            chunks.append(delta)
+            await emit("token", {"text": delta})
+    except Exception as e:
+        log.error(f"Main LLM stream failed", error=str(e))
+        error = f"[Error] Unable to generate response: {str(e)}"
+        chunks.append(error)
+        await emit("token", {"text": error})
+    return "".join(chunks).strip()
@@ -5,6 +5,14 @@ Sentinel-AI — Health Check Route
 import time
 from fastapi import APIRouter
 from app.config import settings
+from app.database import db_stats
+from app.engines.embedding import get_batcher, get_embedding_cache, get_store_registry
+from app.engines.retention import get_retention
+from app.engines.signatures import get_signature_index
+from app.engines.write_behind import get_write_behind
+from app.utils.llm_client import get_providers
+from app.utils.logger import log
+from app.utils.tracing import get_exporter
 
 router = APIRouter()
 
@@ -25,4 +33,14 @@ async def health():
             "threshold_warn": settings.threshold_warn,
             "threshold_rewrite": settings.threshold_rewrite,
         },
+        "database": db_stats(),
+        "providers": get_providers().stats(),
+        "embedding_cache": get_embedding_cache().stats() if settings.embedding_cache_enabled else None,
+        "embedding_stores": get_store_registry().stats(),
+        "signatures": index.stats() if (index := get_signature_index()) is not None else None,
+        "embedding_batcher": get_batcher().stats() if settings.embedding_batch_enabled else None,
+        "logger": log.stats(),
+        "write_behind": queue.stats() if (queue := get_write_behind()) is not None else None,
+        "retention": worker.stats() if (worker := get_retention()) is not None else None,
+        "trace_export": exporter.stats() if (exporter := get_exporter()) is not None else None,
     }
@@ -0,0 +1,67 @@
+"""
+Sentinel-AI — Metrics Route
+GET /metrics serves every collector in the Prometheus text format.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.engines.embedding import get_embedding_cache, get_store_registry
+from app.engines.verdict_cache import get_verdict_cache
+from app.engines.write_behind import get_write_behind
+from app.utils.logger import log
+from app.utils.metrics import registry, render
+
+router = APIRouter()
+
+
+def _cache_tiers():
+    """(cache name, object with hits/misses) for every enabled cache tier."""
+    tiers = []
+    verdicts = get_verdict_cache()
+    if verdicts is not None:
+        tiers.append(("verdict_memory", verdicts.memory))
+        if verdicts.disk is not None:
+            tiers.append(("verdict_disk", verdicts.disk))
+    if settings.embedding_cache_enabled:
+        embeddings = get_embedding_cache()
+        tiers.extend([("embedding_memory", embeddings.memory), ("embedding_tfidf", embeddings.tfidf)])
+        if embeddings.disk is not None:
+            tiers.append(("embedding_disk", embeddings.disk))
+    return tiers
+
+
+registry.callback(
+    "sentinel_cache_hits_total", "counter", "Cache lookups served from the cache",
+    lambda: [({"cache": name}, tier.hits) for name, tier in _cache_tiers()],
+)
+registry.callback(
+    "sentinel_cache_misses_total", "counter", "Cache lookups that missed",
+    lambda: [({"cache": name}, tier.misses) for name, tier in _cache_tiers()],
+)
+registry.callback(
+    "sentinel_embedding_stores", "gauge", "Resident per-conversation embedding stores",
+    lambda: [({}, get_store_registry().stats()["stores"])],
+)
+registry.callback(
+    "sentinel_embedding_store_bytes", "gauge", "Memory held by resident embedding stores",
+    lambda: [({}, get_store_registry().bytes)],
+)
+registry.callback(
+    "sentinel_write_behind_pending", "gauge", "Turns waiting in the write-behind queue",
+    lambda: [({}, len(queue))] if (queue := get_write_behind()) is not None else [],
+)
+registry.callback(
+    "sentinel_write_behind_dead_letters_total", "counter", "Queued rows dropped after repeated write failures",
+    lambda: [({}, queue.dead_letters)] if (queue := get_write_behind()) is not None else [],
+)
+registry.callback(
+    "sentinel_log_records_dropped_total", "counter", "Log records dropped because the writer queue was full",
+    lambda: [({}, log.dropped)],
+)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
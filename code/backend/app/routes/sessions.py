@@ -1,81 +1,203 @@
 """
 Sentinel-AI — Session Management Routes
+Conversations are listed newest first with keyset pagination on
+(created_at, id): each page returns an opaque `next_cursor` to pass back
+as `cursor`. Session transcripts are streamed as JSON in batches and
+never load the stored embeddings; with write-behind on, turns still
+queued are appended so a client reads its own writes. Reads go to
+DATABASE_READ_URL when set.
 """
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import select, func
+import base64
+import json
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, case, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, get_read_db, read_session
+from app.engines.memory import BufferedTurn, last_risk_score_query, message_count_query
+from app.engines.retention import delete_conversations
+from app.engines.write_behind import get_write_behind
 from app.models.db_models import Conversation, Message
+from app.models.schemas import BulkDeleteRequest
 
 router = APIRouter()
 
+# Rows fetched per round trip while streaming a transcript
+_STREAM_BATCH = 500
 
-@router.get("/sessions")
-async def list_sessions(user_id: str = None, db: AsyncSession = Depends(get_db)):
-    """List all conversations, optionally filtered by user_id."""
-    query = select(Conversation).order_by(Conversation.created_at.desc())
-    if user_id:
-        query = query.where(Conversation.user_id == user_id)
 
-    result = await db.execute(query)
-    conversations = result.scalars().all()
+def _encode_cursor(created_at: datetime, conversation_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), conversation_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _message(m) -> dict:
+    return {
+        "id": m.id,
+        "role": m.role,
+        "content": m.content,
+        "drift_score": m.drift_score,
+        "risk_score": m.risk_score,
+        "action": m.action,
+        "red_team_result": m.red_team_result,
+        "blue_team_result": m.blue_team_result,
+        "created_at": m.created_at.isoformat() if m.created_at else None,
+    }
+
 
+def _queued_messages(turn: BufferedTurn) -> list[dict]:
+    """The two rows a queued write-behind turn will be stored as (naive UTC, like the column)."""
+    created_at = turn.created_at.replace(tzinfo=None)
     return [
         {
-            "id": c.id,
-            "user_id": c.user_id,
-            "created_at": c.created_at.isoformat() if c.created_at else None,
-        }
-        for c in conversations
+            "id": turn.message_ids[0],
+            "role": "user",
+            "content": turn.prompt,
+            "drift_score": turn.drift_score,
+            "risk_score": turn.risk_score,
+            "action": turn.action,
+            "red_team_result": turn.red_team_result,
+            "blue_team_result": turn.blue_team_result,
+            "created_at": created_at.isoformat(),
+        },
+        {
+            "id": turn.message_ids[1],
+            "role": "assistant",
+            "content": turn.response,
+            "drift_score": None,
+            "risk_score": None,
+            "action": None,
+            "red_team_result": None,
+            "blue_team_result": None,
+            "created_at": (created_at + timedelta(microseconds=1)).isoformat(),
+        },
     ]
 
 
-@router.get("/sessions/{conversation_id}")
-async def get_session(conversation_id: str, db: AsyncSession = Depends(get_db)):
-    """Get all messages for a conversation with analysis data."""
-    result = await db.execute(
-        select(Message)
-        .where(Message.conversation_id == conversation_id)
-        .order_by(Message.created_at)
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created_at, conversation_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_at), str(conversation_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/sessions")
+async def list_sessions(
+    user_id: str = None,
+    cursor: str = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """List conversations newest first, one keyset page at a time, optionally filtered by user_id."""
+    legacy = Conversation.message_count.is_(None)
+    query = (
+        select(
+            Conversation.id,
+            Conversation.user_id,
+            Conversation.created_at,
+            case((legacy, message_count_query()), else_=Conversation.message_count).label("message_count"),
+            case((legacy, last_risk_score_query()), else_=Conversation.last_risk_score).label("last_risk_score"),
+        )
+        .order_by(Conversation.created_at.desc(), Conversation.id.desc())
+        .limit(limit + 1)
     )
-    messages = result.scalars().all()
+    if user_id:
+        query = query.where(Conversation.user_id == user_id)
+    if cursor:
+        created_at, conversation_id = _decode_cursor(cursor)
+        query = query.where(or_(
+            Conversation.created_at < created_at,
+            and_(Conversation.created_at == created_at, Conversation.id < conversation_id),
+        ))
+
+    rows = (await db.execute(query)).all()
+    page = rows[:limit]
+    next_cursor = _encode_cursor(page[-1].created_at, page[-1].id) if len(rows) > limit else None
 
     return {
-        "conversation_id": conversation_id,
-        "messages": [
+        "sessions": [
             {
-                "id": m.id,
-                "role": m.role,
-                "content": m.content,
-                "drift_score": m.drift_score,
-                "risk_score": m.risk_score,
-                "action": m.action,
-                "red_team_result": m.red_team_result,
-                "blue_team_result": m.blue_team_result,
-                "created_at": m.created_at.isoformat() if m.created_at else None,
+                "id": c.id,
+                "user_id": c.user_id,
+                "created_at": c.created_at.isoformat() if c.created_at else None,
+                "message_count": c.message_count,
+                "last_risk_score": c.last_risk_score,
             }
-            for m in messages
+            for c in page
         ],
+        "next_cursor": next_cursor,
     }
 
 
+@router.get("/sessions/{conversation_id}")
+async def get_session(conversation_id: str):
+    """Get all messages for a conversation with analysis data, streamed as JSON (queued write-behind turns last)."""
+    query = (
+        select(
+            Message.id,
+            Message.role,
+            Message.content,
+            Message.drift_score,
+            Message.risk_score,
+            Message.action,
+            Message.red_team_result,
+            Message.blue_team_result,
+            Message.created_at,
+        )
+        .where(Message.conversation_id == conversation_id)
+        .order_by(Message.created_at)
+        .execution_options(yield_per=_STREAM_BATCH)
+    )
+
+    async def body():
+        # Snapshot queued turns before the read; ones the query returns were flushed meanwhile
+        writes = get_write_behind()
+        overlay = writes.snapshot(conversation_id) if writes is not None else None
+        queued = [msg for turn in overlay.turns for msg in _queued_messages(turn)] if overlay is not None else []
+        queued_ids = {msg["id"] for msg in queued}
+
+        # Own session: a dependency's session is closed before the response body is sent
+        async with read_session() as db:
+            yield f'{{"conversation_id": {json.dumps(conversation_id)}, "messages": ['
+            first = True
+            result = await db.stream(query)
+            async for rows in result.partitions():
+                if queued_ids:
+                    queued_ids.difference_update(m.id for m in rows)
+                chunk = ", ".join(json.dumps(_message(m)) for m in rows)
+                yield chunk if first else ", " + chunk
+                first = False
+            rest = [msg for msg in queued if msg["id"] in queued_ids]
+            if rest:
+                chunk = ", ".join(json.dumps(msg) for msg in rest)
+                yield chunk if first else ", " + chunk
+            yield "]}"
+
+    return StreamingResponse(body(), media_type="application/json")
+
+
 @router.delete("/sessions/{conversation_id}")
 async def delete_session(conversation_id: str, db: AsyncSession = Depends(get_db)):
     """Delete a conversation and all its messages."""
-    result = await db.execute(
-        select(Message).where(Message.conversation_id == conversation_id)
-    )
-    messages = result.scalars().all()
-    for m in messages:
-        await db.delete(m)
+    await delete_conversations(db, [conversation_id])
+    return {"status": "deleted", "conversation_id": conversation_id}
 
-    result = await db.execute(
-        select(Conversation).where(Conversation.id == conversation_id)
-    )
-    conv = result.scalar_one_or_none()
-    if conv:
-        await db.delete(conv)
 
-    await db.commit()
-    return {"status": "deleted", "conversation_id": conversation_id}
+@router.post("/sessions/bulk-delete")
+async def bulk_delete_sessions(request: BulkDeleteRequest, db: AsyncSession = Depends(get_db)):
+    """Delete many conversations with set-based statements, RETENTION_BATCH_SIZE per transaction."""
+    if len(request.conversation_ids) > settings.batch_max_items:
+        raise HTTPException(status_code=413, detail=f"Bulk delete exceeds {settings.batch_max_items} conversations")
+
+    ids = list(dict.fromkeys(request.conversation_ids))
+    conversations = messages = 0
+    for start in range(0, len(ids), settings.retention_batch_size):
+        deleted = await delete_conversations(db, ids[start:start + settings.retention_batch_size])
+        conversations += deleted[0]
+        messages += deleted[1]
+    return {"status": "deleted", "conversations": conversations, "messages": messages}
@@ -0,0 +1,319 @@
+"""
+Sentinel-AI — Offline Corpus Scanner
+Scores prompt corpora (JSONL or CSV) with the heuristic engines — pattern
+scan, red-team, blue-team, TF-IDF drift and the unified risk score —
+without the web app, the database or any LLM call.
+
+Rows are streamed from the input and scored in chunks on a process pool.
+At most `--max-inflight` chunks are pending at once and per-conversation
+drift state is LRU-bounded, so memory stays flat however large the
+corpus is. Verdicts are written as JSONL or Parquet (requires pyarrow),
+in completion order; `row` is the 0-based input row number.
+
+With `--conversation-field`, rows of the same conversation are routed to
+the same chunk stream and scored in input order, so drift is measured
+against that conversation's earlier prompts. Without it every row is an
+independent single-turn prompt (drift 0).
+
+Usage:
+    python -m app.scan corpus.jsonl -o verdicts.jsonl
+    python -m app.scan corpus.csv -o verdicts.parquet --text-field text --workers 8
+    cat corpus.jsonl | python -m app.scan - -o - --conversation-field session
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+import zlib
+from collections import Counter, OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+import numpy as np
+
+# Chunk streams per worker when conversations must stay ordered
+_BUCKETS_PER_WORKER = 2
+
+# ── Worker side ──────────────────────────────────────────────────
+
+def _score_chunk(rows: list[tuple], states: dict, output_format: str) -> tuple:
+    """
+    Score one chunk in a worker process.
+
+    `rows` are (row, id, conversation_id, text) tuples in input order;
+    `states` maps conversation_id → (embedding_sum, count) on entry and is
+    returned updated. Returns (payload, states, action counts), where the
+    payload is JSONL text or a list of records for Parquet.
+    """
+    from app.engines.blueteam import _heuristic_blueteam
+    from app.engines.drift import measure_drift
+    from app.engines.embedding import _tfidf_embedding, accumulate_embedding, running_centroid
+    from app.engines.redteam import _heuristic_redteam
+    from app.engines.risk_scorer import score_risk
+    from app.utils.patterns import scan_prompt
+
+    records = []
+    actions = Counter()
+    for row, row_id, conversation_id, text in rows:
+        scan = scan_prompt(text)
+        red = _heuristic_redteam(text, scan)
+        blue = _heuristic_blueteam(text, red, scan)
+
+        if conversation_id is None:
+            drift = measure_drift((), None, 1)
+        else:
+            vec_sum, count = states.get(conversation_id, (None, 0))
+            embedding = np.asarray(_tfidf_embedding(text))
+            drift = measure_drift(embedding, running_centroid(vec_sum, count), count + 1)
+            states[conversation_id] = accumulate_embedding(vec_sum, count, embedding)
+
+        risk = score_risk(red, blue, drift)
+        actions[risk.action] += 1
+        records.append({
+            "row": row,
+            "id": row_id,
+            "conversation_id": conversation_id,
+            "final_score": risk.final_score,
+            "action": risk.action,
+            "categories": risk.categories,
+            "drift_score": drift.score,
+            "drift": drift.interpretation,
+            "red_confidence": red.confidence_score,
+            "attack_type": red.attack_type,
+            "blue_risk_score": blue.risk_score,
+            "risk_level": blue.risk_level,
+            "attack_category": blue.attack_category,
+            "risky_phrases": blue.risky_phrases,
+        })
+
+    if output_format == "jsonl":
+        payload = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+    else:
+        payload = records
+    return payload, states, actions
+
+
+# ── Input ────────────────────────────────────────────────────────
+
+def _open_text(path: str, mode: str):
+    if path == "-":
+        return sys.stdin if "r" in mode else sys.stdout
+    return open(path, mode, encoding="utf-8", newline="" if "r" in mode else None)
+
+
+def read_rows(path: str, input_format: str, text_field: str, id_field: str | None, conversation_field: str | None):
+    """Yield (row, id, conversation_id, text) for every input record; text is None when missing."""
+    f = _open_text(path, "r")
+    try:
+        if input_format == "csv":
+            csv.field_size_limit(16 * 1024 * 1024)
+            records = csv.DictReader(f)
+        else:
+            records = (json.loads(line) for line in f if line.strip())
+
+        for row, record in enumerate(records):
+            text = record.get(text_field)
+            if not isinstance(text, str) or not text:
+                yield row, None, None, None
+                continue
+            row_id = record.get(id_field) if id_field else None
+            conversation_id = record.get(conversation_field) if conversation_field else None
+            yield row, row_id, None if conversation_id in (None, "") else str(conversation_id), text
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+# ── Output ───────────────────────────────────────────────────────
+
+class _JSONLWriter:
+    def __init__(self, path: str):
+        self.f = _open_text(path, "w")
+
+    def write(self, payload: str):
+        self.f.write(payload)
+
+    def close(self):
+        self.f.flush()
+        if self.f is not sys.stdout:
+            self.f.close()
+
+
+class _ParquetWriter:
+    """One Parquet row group per chunk."""
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output requires pyarrow (pip install pyarrow)")
+        if path == "-":
+            raise SystemExit("Parquet output needs a file path")
+        self.pa = pa
+        self.schema = pa.schema([
+            ("row", pa.int64()), ("id", pa.string()), ("conversation_id", pa.string()),
+            ("final_score", pa.float64()), ("action", pa.string()), ("categories", pa.list_(pa.string())),
+            ("drift_score", pa.float64()), ("drift", pa.string()), ("red_confidence", pa.float64()),
+            ("attack_type", pa.string()), ("blue_risk_score", pa.float64()), ("risk_level", pa.string()),
+            ("attack_category", pa.string()), ("risky_phrases", pa.list_(pa.string())),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, payload: list[dict]):
+        for record in payload:
+            if record["id"] is not None:
+                record["id"] = str(record["id"])
+        self.writer.write_table(self.pa.Table.from_pylist(payload, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+# ── Driver ───────────────────────────────────────────────────────
+
+class _ConversationStates:
+    """LRU-bounded per-conversation drift state (embedding sum, count) held by the parent."""
+
+    def __init__(self, max_conversations: int):
+        self.max_conversations = max(1, max_conversations)
+        self._states: OrderedDict[str, tuple] = OrderedDict()
+        self.evictions = 0
+
+    def take(self, conversation_ids: set[str]) -> dict:
+        return {cid: self._states[cid] for cid in conversation_ids if cid in self._states}
+
+    def update(self, states: dict):
+        for cid, state in states.items():
+            self._states[cid] = state
+            self._states.move_to_end(cid)
+        while len(self._states) > self.max_conversations:
+            self._states.popitem(last=False)
+            self.evictions += 1
+
+
+def scan_corpus(args) -> dict:
+    """Stream the input through the process pool and write verdicts. Returns throughput stats."""
+    from app.utils.logger import log
+
+    input_format = args.input_format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    output_format = args.output_format or ("parquet" if args.output.lower().endswith(".parquet") else "jsonl")
+    writer = _ParquetWriter(args.output) if output_format == "parquet" else _JSONLWriter(args.output)
+
+    workers = args.workers or os.cpu_count() or 1
+    max_inflight = args.max_inflight or workers * 2
+    ordered = args.conversation_field is not None
+    buckets: list[list[tuple]] = [[] for _ in range(workers * _BUCKETS_PER_WORKER if ordered else 1)]
+    busy: set[int] = set()  # buckets with a chunk in flight (ordered mode only)
+    inflight: dict[Future, int] = {}
+    states = _ConversationStates(args.max_conversations)
+
+    # TF-IDF hashes tokens with hash(); pin the seed so every worker (and every run) agrees
+    os.environ["PYTHONHASHSEED"] = str(args.hash_seed)
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+    stats = {"rows": 0, "skipped": 0, "chunks": 0, "input_bytes": 0}
+    actions = Counter()
+    start = time.perf_counter()
+    last_report = start
+
+    def collect(done):
+        nonlocal last_report
+        for future in done:
+            bucket = inflight.pop(future)
+            busy.discard(bucket)
+            payload, updated, chunk_actions = future.result()
+            writer.write(payload)
+            states.update(updated)
+            actions.update(chunk_actions)
+        now = time.perf_counter()
+        if now - last_report >= args.progress_seconds:
+            last_report = now
+            scored = sum(actions.values())
+            log.info(f"Scan progress", rows=scored, rows_per_s=f"{scored / (now - start):,.0f}")
+
+    def submit(bucket: int):
+        chunk = buckets[bucket]
+        buckets[bucket] = []
+        shipped = states.take({r[2] for r in chunk if r[2] is not None}) if ordered else {}
+        future = pool.submit(_score_chunk, chunk, shipped, output_format)
+        inflight[future] = bucket
+        stats["chunks"] += 1
+        if ordered:
+            busy.add(bucket)
+
+    def wait_for(condition):
+        while inflight and condition():
+            done, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+            collect(done)
+
+    try:
+        for row, row_id, conversation_id, text in read_rows(
+            args.input, input_format, args.text_field, args.id_field, args.conversation_field,
+        ):
+            if text is None:
+                stats["skipped"] += 1
+                continue
+            stats["rows"] += 1
+            stats["input_bytes"] += len(text)
+
+            bucket = zlib.crc32(conversation_id.encode("utf-8")) % len(buckets) if conversation_id is not None else 0
+            buckets[bucket].append((row, row_id, conversation_id, text))
+
+            if len(buckets[bucket]) >= args.chunk_size:
+                # A conversation's chunks run one at a time so its drift state stays ordered
+                wait_for(lambda: bucket in busy)
+                submit(bucket)
+                wait_for(lambda: len(inflight) >= max_inflight)
+
+        for bucket in range(len(buckets)):
+            if buckets[bucket]:
+                wait_for(lambda: bucket in busy)
+                submit(bucket)
+        wait_for(lambda: True)
+    finally:
+        pool.shutdown(cancel_futures=True)
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    stats.update({
+        "elapsed_s": round(elapsed, 2),
+        "rows_per_s": round(stats["rows"] / elapsed, 1) if elapsed else 0.0,
+        "mb_per_s": round(stats["input_bytes"] / 1e6 / elapsed, 2) if elapsed else 0.0,
+        "workers": workers,
+        "conversation_evictions": states.evictions,
+        "actions": dict(actions),
+    })
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.scan", description="Score a prompt corpus with the Sentinel-AI heuristic engines")
+    parser.add_argument("input", help="JSONL or CSV file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="Output .jsonl or .parquet file, or - for stdout (JSONL)")
+    parser.add_argument("--input-format", choices=["jsonl", "csv"], help="Default: from the file extension")
+    parser.add_argument("--output-format", choices=["jsonl", "parquet"], help="Default: from the file extension")
+    parser.add_argument("--text-field", default="prompt")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--conversation-field", help="Group rows into conversations for drift scoring")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="Rows per chunk sent to a worker")
+    parser.add_argument("--max-inflight", type=int, help="Chunks pending at once (default: 2 × workers)")
+    parser.add_argument("--max-conversations", type=int, default=100_000, help="Conversation drift states kept in memory")
+    parser.add_argument("--hash-seed", type=int, default=0, help="PYTHONHASHSEED for the TF-IDF workers")
+    parser.add_argument("--progress-seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    from app.utils.logger import log
+
+    stats = scan_corpus(args)
+    actions = stats.pop("actions")
+    log.info(f"Scan complete", **stats)
+    log.info(f"Verdicts", **actions)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Sentinel-AI — Cache Primitives
+Bounded in-process LRU (with optional TTL) and a size-capped SQLite
+key/blob table used as a persistent tier that survives restarts.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+class LRUCache:
+    """Size-bounded LRU with optional per-entry TTL and hit/miss/eviction counters."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float | None = None):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict[str, tuple[Any, float | None]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Any | None:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> list[tuple[str, Any]]:
+        """Store a value; returns the (key, value) pairs evicted to make room."""
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        evicted = []
+        while len(self._data) > self.max_entries:
+            old_key, (old_value, _) = self._data.popitem(last=False)
+            evicted.append((old_key, old_value))
+            self.evictions += 1
+        return evicted
+
+    def items(self) -> list[tuple[str, Any]]:
+        """Resident (key, value) pairs, least recently used first (expired entries included)."""
+        return [(key, entry[0]) for key, entry in self._data.items()]
+
+    def pop(self, key: str) -> Any | None:
+        entry = self._data.pop(key, None)
+        return entry[0] if entry else None
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SQLiteKV:
+    """
+    Persistent key → blob table with a row cap.
+
+    Methods are synchronous and guarded by a lock; async callers should
+    run them through `asyncio.to_thread`. The row count is read once at
+    open and then tracked in memory, so `stats()` never scans the table.
+    When the table grows past `max_entries`, the least recently accessed
+    rows are trimmed in one batch down to 90% of the cap.
+    """
+
+    def __init__(self, path: str, table: str, max_entries: int):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+
+        self.path = path
+        self.table = table
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # A missing file is only created by the first write, so reads,
+        # health checks and dry runs never leave an empty database behind
+        if os.path.exists(path):
+            self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.table}_accessed ON {self.table} (accessed_at)")
+            self._rows = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            if self._conn is None:
+                self.misses += 1
+                return None
+            row = self._conn.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: bytes):
+        with self._lock:
+            self._connect()
+            now = time.time()
+            updated = self._conn.execute(
+                f"UPDATE {self.table} SET value = ?, accessed_at = ? WHERE key = ?", (value, now, key),
+            ).rowcount
+            if not updated:
+                self._conn.execute(
+                    f"INSERT INTO {self.table} (key, value, accessed_at) VALUES (?, ?, ?)", (key, value, now),
+                )
+                self._rows += 1
+                if self._rows > self.max_entries:
+                    self._trim()
+
+    def delete(self, key: str):
+        with self._lock:
+            if self._conn is None:
+                return
+            self._rows -= self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,)).rowcount
+
+    def _trim(self):
+        excess = self._rows - int(self.max_entries * 0.9)
+        deleted = self._conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN "
+            f"(SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)",
+            (excess,),
+        ).rowcount
+        self._rows -= deleted
+        self.evictions += deleted
+
+    def count(self) -> int:
+        return self._rows
+
+    def clear(self):
+        with self._lock:
+            if self._conn is None:
+                return
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._rows = 0
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "entries": self.count(),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
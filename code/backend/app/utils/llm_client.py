@@ -2,12 +2,157 @@
 Sentinel-AI — Unified LLM Client
 Supports both OpenAI and Google Gemini as LLM providers.
 Includes retry logic for rate-limited APIs.
+Provider clients are pooled in a registry owned by the app lifespan.
 """
 
 import asyncio
 import json
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+import httpx
 from app.config import settings
 from app.utils.logger import log
+from app.utils.metrics import PROVIDER_CALLS, PROVIDER_SECONDS
+from app.utils import tracing
+
+
+# ── Provider Client Registry ─────────────────────────────────────
+
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+
+
+class ProviderRegistry:
+    """
+    Long-lived provider clients sharing one keep-alive HTTP pool.
+
+    OpenAI and Groq clients are built lazily on first use over a single
+    httpx.AsyncClient, so TLS sessions and connections are reused across
+    requests. OPENAI_BASE_URL / GROQ_BASE_URL point them at any
+    OpenAI-compatible endpoint instead (a gateway, or the local stub in
+    benchmarks/stub_provider.py). Gemini is configured once and its GenerativeModel objects
+    are cached by (model, system_instruction, generation_config).
+    """
+
+    def __init__(self):
+        self._http: httpx.AsyncClient | None = None
+        self._openai = None
+        self._groq = None
+        self._gemini_configured = False
+        self._gemini_models: OrderedDict[tuple, object] = OrderedDict()
+        self.gemini_cache_hits = 0
+        self.gemini_cache_misses = 0
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.llm_pool_max_connections,
+                    max_keepalive_connections=settings.llm_pool_max_keepalive,
+                    keepalive_expiry=settings.llm_pool_keepalive_seconds,
+                ),
+                timeout=httpx.Timeout(settings.llm_timeout_seconds, connect=10.0),
+                event_hooks={"request": [tracing.count_http_attempt]},
+            )
+        return self._http
+
+    @property
+    def openai(self):
+        if self._openai is None:
+            from openai import AsyncOpenAI
+
+            self._openai = AsyncOpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url or None, http_client=self.http)
+        return self._openai
+
+    @property
+    def groq(self):
+        if self._groq is None:
+            from openai import AsyncOpenAI
+
+            self._groq = AsyncOpenAI(api_key=settings.groq_api_key, base_url=settings.groq_base_url or GROQ_BASE_URL, http_client=self.http)
+        return self._groq
+
+    def gemini_model(self, model_name: str, system_instruction: str, generation_config: dict):
+        """Return a cached GenerativeModel for this (model, instruction, config) triple."""
+        import google.generativeai as genai
+
+        if not self._gemini_configured:
+            genai.configure(api_key=settings.gemini_api_key)
+            self._gemini_configured = True
+
+        key = (model_name, system_instruction, tuple(sorted(generation_config.items())))
+        model = self._gemini_models.get(key)
+        if model is not None:
+            self._gemini_models.move_to_end(key)
+            self.gemini_cache_hits += 1
+            return model
+
+        self.gemini_cache_misses += 1
+        model_kwargs = {"model_name": model_name, "generation_config": generation_config}
+        if system_instruction:
+            model_kwargs["system_instruction"] = system_instruction
+        model = genai.GenerativeModel(**model_kwargs)
+
+        self._gemini_models[key] = model
+        if len(self._gemini_models) > settings.gemini_model_cache_size:
+            self._gemini_models.popitem(last=False)
+        return model
+
+    def stats(self) -> dict:
+        """Connection-pool and model-cache statistics."""
+        pool = getattr(getattr(self._http, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        return {
+            "http_pool": {
+                "open": self._http is not None and not self._http.is_closed,
+                "connections": len(connections),
+                "idle": sum(1 for c in connections if c.is_idle()),
+                "max_connections": settings.llm_pool_max_connections,
+                "max_keepalive": settings.llm_pool_max_keepalive,
+            },
+            "clients": {
+                "openai": self._openai is not None,
+                "groq": self._groq is not None,
+                "gemini": self._gemini_configured,
+            },
+            "gemini_models": {
+                "cached": len(self._gemini_models),
+                "hits": self.gemini_cache_hits,
+                "misses": self.gemini_cache_misses,
+            },
+        }
+
+    async def aclose(self):
+        """Close the shared HTTP pool and drop all cached clients."""
+        if self._http is not None:
+            await self._http.aclose()
+        self._http = None
+        self._openai = None
+        self._groq = None
+        self._gemini_models.clear()
+
+
+_registry: ProviderRegistry | None = None
+
+
+def get_providers() -> ProviderRegistry:
+    """Return the process-wide provider registry, creating it on first use."""
+    global _registry
+    if _registry is None:
+        _registry = ProviderRegistry()
+    return _registry
+
+
+async def close_providers():
+    """Shut down the provider registry (called from the app lifespan)."""
+    global _registry
+    if _registry is not None:
+        await _registry.aclose()
+        _registry = None
+
+
+# ── Chat Completion ──────────────────────────────────────────────
 
 
 async def chat_completion(
@@ -20,13 +165,57 @@ async def chat_completion(
     based on the LLM_PROVIDER setting.
     """
     provider = settings.llm_provider.lower()
+    start = time.perf_counter()
+    try:
+        if provider == "gemini":
+            content = await _gemini_chat_with_retry(messages, temperature, max_tokens)
+        elif provider == "groq":
+            content = await _groq_chat(messages, temperature, max_tokens)
+        else:
+            content = await _openai_chat(messages, temperature, max_tokens)
+    except Exception:
+        record_provider_call(provider, "chat", "error", start)
+        raise
+    record_provider_call(provider, "chat", "ok", start)
+    return content
+
+
+async def stream_chat_completion(
+    messages: list[dict],
+    temperature: float = 0.7,
+    max_tokens: int = 1000,
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of chat_completion: yields text deltas as the
+    provider produces them.
+    """
+    provider = settings.llm_provider.lower()
 
     if provider == "gemini":
-        return await _gemini_chat_with_retry(messages, temperature, max_tokens)
+        stream = _gemini_stream_with_retry(messages, temperature, max_tokens)
     elif provider == "groq":
-        return await _groq_chat(messages, temperature, max_tokens)
+        stream = _openai_compatible_stream(get_providers().groq, settings.groq_model, messages, temperature, max_tokens)
     else:
-        return await _openai_chat(messages, temperature, max_tokens)
+        stream = _openai_compatible_stream(get_providers().openai, settings.openai_model, messages, temperature, max_tokens)
+
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        async for delta in stream:
+            yield delta
+        outcome = "ok"
+    except (GeneratorExit, asyncio.CancelledError):
+        outcome = "cancelled"  # client went away mid-stream
+        raise
+    finally:
+        record_provider_call(provider, "chat_stream", outcome, start)
+
+
+def record_provider_call(provider: str, operation: str, outcome: str, start: float):
+    """Count one provider call and its latency since `start` (a perf_counter value)."""
+    PROVIDER_CALLS.inc(provider, operation, outcome)
+    PROVIDER_SECONDS.observe(time.perf_counter() - start, provider, operation)
+    tracing.record_provider_call(provider, operation, outcome, start)
 
 
 async def _openai_chat(
@@ -35,9 +224,7 @@ async def _openai_chat(
     max_tokens: int,
 ) -> str:
     """Call OpenAI chat completion."""
-    from openai import AsyncOpenAI
-
-    client = AsyncOpenAI(api_key=settings.openai_api_key)
+    client = get_providers().openai
     response = await client.chat.completions.create(
         model=settings.openai_model,
         messages=messages,
@@ -53,12 +240,7 @@ async def _groq_chat(
     max_tokens: int,
 ) -> str:
     """Call Groq chat completion (OpenAI-compatible API)."""
-    from openai import AsyncOpenAI
-
-    client = AsyncOpenAI(
-        api_key=settings.groq_api_key,
-        base_url="https://api.groq.com/openai/v1",
-    )
+    client = get_providers().groq
     response = await client.chat.completions.create(
         model=settings.groq_model,
         messages=messages,
@@ -68,6 +250,26 @@ async def _groq_chat(
     return response.choices[0].message.content.strip()
 
 
+async def _openai_compatible_stream(
+    client,
+    model: str,
+    messages: list[dict],
+    temperature: float,
+    max_tokens: int,
+) -> AsyncIterator[str]:
+    """Stream an OpenAI or Groq chat completion."""
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=True,
+    )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
 async def _gemini_chat_with_retry(
     messages: list[dict],
     temperature: float,
@@ -85,6 +287,7 @@ async def _gemini_chat_with_retry(
             if is_rate_limit and attempt < max_retries - 1:
                 wait_time = (attempt + 1) * 3  # 3s, 6s, 9s
                 log.warn(f"Gemini rate limit hit, retrying in {wait_time}s (attempt {attempt + 1}/{max_retries})")
+                tracing.record_retry()
                 await asyncio.sleep(wait_time)
             else:
                 raise
@@ -96,10 +299,48 @@ async def _gemini_chat(
     max_tokens: int,
 ) -> str:
     """Call Google Gemini chat completion."""
-    import google.generativeai as genai
+    chat, last_user_msg = _gemini_chat_session(messages, temperature, max_tokens)
+    response = await chat.send_message_async(last_user_msg or "Hello")
+
+    return response.text.strip()
+
+
+async def _gemini_stream_with_retry(
+    messages: list[dict],
+    temperature: float,
+    max_tokens: int,
+    max_retries: int = 4,
+) -> AsyncIterator[str]:
+    """Stream from Gemini; rate limits are retried only before the first chunk."""
+    for attempt in range(max_retries):
+        started = False
+        try:
+            chat, last_user_msg = _gemini_chat_session(messages, temperature, max_tokens)
+            response = await chat.send_message_async(last_user_msg or "Hello", stream=True)
+            async for chunk in response:
+                if chunk.text:
+                    started = True
+                    yield chunk.text
+            return
+        except Exception as e:
+            error_str = str(e)
+            is_rate_limit = "429" in error_str or "quota" in error_str.lower() or "rate" in error_str.lower()
+
+            if is_rate_limit and not started and attempt < max_retries - 1:
+                wait_time = (attempt + 1) * 3  # 3s, 6s, 9s
+                log.warn(f"Gemini rate limit hit, retrying in {wait_time}s (attempt {attempt + 1}/{max_retries})")
+                tracing.record_retry()
+                await asyncio.sleep(wait_time)
+            else:
+                raise
 
-    genai.configure(api_key=settings.gemini_api_key)
 
+def _gemini_chat_session(
+    messages: list[dict],
+    temperature: float,
+    max_tokens: int,
+):
+    """Convert OpenAI-format messages into a Gemini chat session and the message to send."""
     # Convert OpenAI message format to Gemini format
     system_instruction = ""
     gemini_history = []
@@ -117,27 +358,21 @@ async def _gemini_chat(
             last_user_msg = content
             gemini_history.append({"role": "user", "parts": [content]})
 
-    # Build model with optional system instruction
-    model_kwargs = {
-        "model_name": settings.gemini_model,
-        "generation_config": {
+    # Reuse a cached model with optional system instruction
+    model = get_providers().gemini_model(
+        settings.gemini_model,
+        system_instruction.strip(),
+        {
             "temperature": temperature,
             "max_output_tokens": max_tokens,
         },
-    }
-    if system_instruction.strip():
-        model_kwargs["system_instruction"] = system_instruction.strip()
-
-    model = genai.GenerativeModel(**model_kwargs)
+    )
 
     # Start chat with history (excluding the last user message)
     chat_history = gemini_history[:-1] if gemini_history else []
     cleaned_history = _clean_gemini_history(chat_history)
 
-    chat = model.start_chat(history=cleaned_history)
-    response = await chat.send_message_async(last_user_msg or "Hello")
-
-    return response.text.strip()
+    return model.start_chat(history=cleaned_history), last_user_msg
 
 
 def _clean_gemini_history(history: list[dict]) -> list[dict]:
@@ -1,9 +1,24 @@
 """
 Sentinel-AI — Structured Logger
-Colored console output with log levels.
+Leveled console logging that never blocks the event loop on stderr.
+
+Calls below LOG_LEVEL return before anything is formatted, and keyword
+values that are callables are only evaluated for records that are kept
+(`log.debug("Stats", rows=lambda: expensive())`). Kept records go onto a
+bounded queue; a daemon thread formats them (colored text, or JSON lines
+with LOG_FORMAT=json) and writes them to stderr in batches. When the
+queue is full records are dropped and counted rather than waiting.
+LOG_ASYNC=false writes inline instead. Pending records are flushed at
+interpreter exit.
 """
 
+import atexit
+import json
+import os
+import queue
 import sys
+import threading
+import time
 from datetime import datetime, timezone
 
 
@@ -19,32 +34,183 @@ class Colors:
     BOLD = "\033[1m"
 
 
+# Numeric levels; THREAT (risk verdicts) sits between INFO and WARN
+LEVELS = {"debug": 10, "info": 20, "threat": 25, "warn": 30, "error": 40}
+
+_LEVEL_COLORS = {
+    "DEBUG": Colors.BLUE,
+    "INFO": Colors.GREEN,
+    "THREAT": Colors.MAGENTA,
+    "WARN": Colors.YELLOW,
+    "ERROR": Colors.RED,
+}
+
+_PLAIN = (str, int, float, bool, type(None))
+
+# Records written per stderr write
+_BATCH = 256
+
+
 class Logger:
-    def __init__(self, name: str = "sentinel"):
+    def __init__(self, name: str = "sentinel", level: str = "info", fmt: str = "text",
+                 async_: bool = True, queue_size: int = 10_000):
         self.name = name
+        self.level = LEVELS[level]
+        self.fmt = fmt
+        self.async_ = async_
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: threading.Thread | None = None
+        self._pid = os.getpid()
+        self._start_lock = threading.Lock()
+        self.emitted = 0
+        self.dropped = 0
 
-    def _log(self, level: str, color: str, message: str, **kwargs):
-        ts = datetime.now(timezone.utc).strftime("%H:%M:%S")
-        prefix = f"{Colors.GRAY}{ts}{Colors.RESET} {color}{Colors.BOLD}[{level}]{Colors.RESET} {Colors.CYAN}{self.name}{Colors.RESET}"
-        extra = ""
+    def set_level(self, level: str):
+        self.level = LEVELS[level]
+
+    def enabled(self, level: str) -> bool:
+        """Whether records at `level` are kept (for guarding expensive log preparation)."""
+        return LEVELS[level] >= self.level
+
+    def _log(self, level: str, levelno: int, message: str, kwargs: dict):
+        if levelno < self.level:
+            return
         if kwargs:
-            extra = " " + " ".join(f"{Colors.GRAY}{k}={Colors.RESET}{v}" for k, v in kwargs.items())
-        print(f"{prefix} {message}{extra}", file=sys.stderr)
+            # Lazy values are resolved here; anything mutable is rendered now so the writer sees this moment's value
+            for key, value in kwargs.items():
+                if callable(value):
+                    value = value()
+                if not isinstance(value, _PLAIN):
+                    value = str(value)
+                kwargs[key] = value
+        record = (time.time(), level, message, kwargs)
+
+        if not self.async_ or not self._ensure_writer():
+            self._write([record])
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
 
     def info(self, message: str, **kwargs):
-        self._log("INFO", Colors.GREEN, message, **kwargs)
+        self._log("INFO", 20, message, kwargs)
 
     def warn(self, message: str, **kwargs):
-        self._log("WARN", Colors.YELLOW, message, **kwargs)
+        self._log("WARN", 30, message, kwargs)
 
     def error(self, message: str, **kwargs):
-        self._log("ERROR", Colors.RED, message, **kwargs)
+        self._log("ERROR", 40, message, kwargs)
 
     def debug(self, message: str, **kwargs):
-        self._log("DEBUG", Colors.BLUE, message, **kwargs)
+        self._log("DEBUG", 10, message, kwargs)
 
     def threat(self, message: str, **kwargs):
-        self._log("THREAT", Colors.MAGENTA, message, **kwargs)
+        self._log("THREAT", 25, message, kwargs)
+
+    # ── Formatting ──
+
+    def _format(self, record: tuple) -> str:
+        ts, level, message, kwargs = record
+        if self.fmt == "json":
+            return json.dumps({
+                "ts": datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="milliseconds"),
+                "level": level.lower(),
+                "logger": self.name,
+                "msg": message,
+                **kwargs,
+            }, ensure_ascii=False, default=str)
+
+        clock = datetime.fromtimestamp(ts, timezone.utc).strftime("%H:%M:%S")
+        prefix = f"{Colors.GRAY}{clock}{Colors.RESET} {_LEVEL_COLORS[level]}{Colors.BOLD}[{level}]{Colors.RESET} {Colors.CYAN}{self.name}{Colors.RESET}"
+        extra = ""
+        if kwargs:
+            extra = " " + " ".join(f"{Colors.GRAY}{k}={Colors.RESET}{v}" for k, v in kwargs.items())
+        return f"{prefix} {message}{extra}"
+
+    def _write(self, records: list[tuple]):
+        try:
+            sys.stderr.write("".join(self._format(r) + "\n" for r in records))
+            sys.stderr.flush()
+        except (OSError, ValueError):
+            pass  # stderr closed or gone; logging must never take the caller down
+        self.emitted += len(records)
+
+    # ── Writer thread ──
+
+    def _ensure_writer(self) -> bool:
+        """Start the writer thread on first use (and again in a forked child). False if it cannot run."""
+        if self._thread is not None and self._pid == os.getpid():
+            return True
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                try:
+                    self._thread = threading.Thread(target=self._drain, name=f"{self.name}-log-writer", daemon=True)
+                    self._thread.start()
+                except RuntimeError:  # interpreter shutting down
+                    self._thread = None
+                    return False
+        return True
+
+    def _drain(self):
+        q = self._queue
+        while True:
+            record = q.get()
+            batch = [record]
+            while len(batch) < _BATCH:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            stop = [r for r in batch if r is None]
+            self._write([r for r in batch if r is not None])
+            for _ in batch:
+                q.task_done()
+            if stop:
+                return
+
+    def flush(self, timeout: float = 2.0):
+        """Wait (up to `timeout`) until queued records are written."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def close(self):
+        """Flush and stop the writer thread; later records are written inline."""
+        self.flush()
+        if self._thread is not None and self._pid == os.getpid():
+            try:
+                self._queue.put_nowait(None)
+                self._thread.join(timeout=1.0)
+            except queue.Full:
+                pass
+        self._thread = None
+        self.async_ = False
+
+    def stats(self) -> dict:
+        return {
+            "level": next(name for name, no in LEVELS.items() if no == self.level),
+            "format": self.fmt,
+            "async": self.async_,
+            "queued": self._queue.qsize(),
+            "emitted": self.emitted,
+            "dropped": self.dropped,
+        }
+
+
+def _from_settings() -> Logger:
+    from app.config import settings
+    return Logger(
+        level=settings.log_level,
+        fmt=settings.log_format,
+        async_=settings.log_async,
+        queue_size=settings.log_queue_size,
+    )
 
 
-log = Logger()
+log = _from_settings()
+atexit.register(log.close)
@@ -0,0 +1,161 @@
+"""
+Sentinel-AI — Metrics
+In-process counters and latency histograms, rendered in the Prometheus
+text exposition format (served at /api/metrics).
+
+Collectors are plain dicts of numbers updated from the event loop
+thread, so recording is a dict lookup and an addition: no locks. Each
+worker process keeps its own series; with several uvicorn workers,
+scrape every worker (or run one worker per port). Values that other
+components already count (cache hits, queue depths) are read at scrape
+time through registered callbacks instead of being counted twice.
+"""
+
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from contextvars import ContextVar
+
+# Seconds; covers sub-millisecond heuristics up to slow LLM calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# (labels, value) pairs for one metric family
+Samples = Iterable[tuple[dict[str, str], float]]
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.bounds = tuple(buckets)
+        # labels → [per-bucket counts (last = +Inf), sum]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.bounds) + 1), 0.0]
+        series[0][bisect_left(self.bounds, value)] += 1
+        series[1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[Counter | Histogram] = []
+        self._callbacks: list[tuple[str, str, str, Callable[[], Samples]]] = []
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def callback(self, name: str, kind: str, help: str, collect: Callable[[], Samples]):
+        """Register a family (gauge or counter) whose samples are read from `collect()` at scrape time."""
+        self._callbacks.append((name, kind, help, collect))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, kind, help, collect in self._callbacks:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in collect():
+                names = tuple(labels)
+                lines.append(f"{name}{_labels(names, tuple(labels[n] for n in names))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# ── Pipeline ──
+
+STAGE_SECONDS = registry.histogram(
+    "sentinel_stage_duration_seconds", "Wall time of each /analyze pipeline stage", ("stage",),
+)
+REQUEST_SECONDS = registry.histogram(
+    "sentinel_analyze_duration_seconds", "End-to-end /analyze pipeline time", ("mode",),
+)
+ANALYZE_ERRORS = registry.counter(
+    "sentinel_analyze_errors_total", "/analyze pipelines that raised", ("mode",),
+)
+ACTIONS = registry.counter("sentinel_actions_total", "Actions taken on analysed prompts", ("action",))
+VERDICTS = registry.counter(
+    "sentinel_verdicts_total", "Verdicts by the tier that produced them (heuristic, llm, signature, cache)", ("tier",),
+)
+
+# ── Providers ──
+
+PROVIDER_CALLS = registry.counter(
+    "sentinel_provider_requests_total", "LLM and embedding provider calls", ("provider", "operation", "outcome"),
+)
+PROVIDER_SECONDS = registry.histogram(
+    "sentinel_provider_request_duration_seconds", "LLM and embedding provider call latency", ("provider", "operation"),
+)
+FALLBACKS = registry.counter(
+    "sentinel_heuristic_fallbacks_total", "LLM-backed steps that fell back to heuristics after an error", ("engine",),
+)
+
+# Verdict steps of the current /analyze request → True when the LLM
+# answered, False when it failed and the heuristic result was used
+request_outcomes: ContextVar[dict[str, bool] | None] = ContextVar("sentinel_outcomes", default=None)
+
+
+def record_outcome(step: str, llm: bool):
+    if (outcomes := request_outcomes.get()) is not None:
+        outcomes[step] = llm
+
+
+def render() -> str:
+    return registry.render()
@@ -1,9 +1,16 @@
 """
 Sentinel-AI — Attack Patterns Database
 Regex patterns, keywords, and known jailbreak signatures for heuristic detection.
+Includes a single-pass scanner shared by the heuristic engines.
 """
 
 import re
+from dataclasses import dataclass, field
+
+try:
+    from re import _parser as _sre_parse, _constants as _sre
+except ImportError:  # Python < 3.11
+    import sre_parse as _sre_parse, sre_constants as _sre
 
 # ──────────────────────────── Prompt Injection Patterns ────────────────────────────
 
@@ -90,3 +97,141 @@ PATTERN_CATEGORIES = {
     "harmful_content": HARMFUL_CONTENT_PATTERNS,
     "social_engineering": SOCIAL_ENGINEERING_PATTERNS,
 }
+
+
+# ──────────────────────────── Rewrite Strip Patterns ────────────────────────────
+# Removed (in order) by the heuristic rewrite in engines/mitigation.py.
+
+REWRITE_STRIP_PATTERNS = [
+    re.compile(r"ignore\s+(all\s+)?previous\s+instructions?\.?\s*", re.IGNORECASE),
+    re.compile(r"disregard\s+(all\s+)?(prior|previous|above)\s+(instructions?|context)\.?\s*", re.IGNORECASE),
+    re.compile(r"forget\s+everything.*?\.?\s*", re.IGNORECASE),
+    re.compile(r"you\s+are\s+now\s+.*?\.\s*", re.IGNORECASE),
+    re.compile(r"from\s+now\s+on.*?\.\s*", re.IGNORECASE),
+    re.compile(r"system\s*:\s*.*?\n", re.IGNORECASE),
+    re.compile(r"\[system\].*?\n", re.IGNORECASE),
+    re.compile(r"bypass\s+(all\s+)?(safety|content|ethical).*?\.\s*", re.IGNORECASE),
+    re.compile(r"do\s+anything\s+now\.?\s*", re.IGNORECASE),
+    re.compile(r"DAN\s+mode.*?\.\s*", re.IGNORECASE),
+    re.compile(r"(reveal|show|tell)\s+(me\s+)?(your|the)\s+(system\s+)?prompt.*?\.\s*", re.IGNORECASE),
+    re.compile(r"(api|secret)\s*key.*?\.\s*", re.IGNORECASE),
+]
+
+# ──────────────────────────── Single-Pass Scanner ────────────────────────────
+
+STRIP_GROUP = "_rewrite_strip"
+
+
+@dataclass(frozen=True)
+class PatternHit:
+    """First match of one pattern in the prompt."""
+
+    category: str
+    index: int  # position of the pattern within its category list
+    start: int
+    end: int
+    text: str
+
+
+@dataclass
+class ScanResult:
+    """All pattern hits for one prompt, grouped by category in pattern order."""
+
+    hits: dict[str, list[PatternHit]] = field(default_factory=dict)
+
+    @property
+    def categories(self) -> list[str]:
+        """Matched attack categories, in PATTERN_CATEGORIES order."""
+        return [cat for cat in PATTERN_CATEGORIES if self.hits.get(cat)]
+
+    def first(self, category: str) -> PatternHit | None:
+        """The hit from the first matching pattern of a category."""
+        hits = self.hits.get(category)
+        return hits[0] if hits else None
+
+    @property
+    def strip_hits(self) -> list[PatternHit]:
+        return self.hits.get(STRIP_GROUP, [])
+
+    @property
+    def phrases(self) -> list[str]:
+        """First matched phrase per category (what the blue-team reports as risky)."""
+        return [self.first(cat).text for cat in self.categories]
+
+
+def _required_literals(pattern: re.Pattern) -> tuple[str, ...] | None:
+    """
+    Lowercase literals of which at least one must occur for `pattern` to match.
+    Returns None when no such literal can be derived (the regex always runs).
+    """
+    def clause(items) -> tuple[str, ...] | None:
+        clauses: list[tuple[str, ...]] = []
+        run = ""
+        for op, arg in items:
+            if op is _sre.LITERAL:
+                run += chr(arg).lower()
+                continue
+            if run:
+                clauses.append((run,))
+                run = ""
+            if op is _sre.SUBPATTERN:
+                sub = clause(arg[-1])
+                if sub:
+                    clauses.append(sub)
+            elif op is _sre.BRANCH:
+                alts = [clause(alt) for alt in arg[1]]
+                if all(alts):
+                    clauses.append(tuple(lit for alt in alts for lit in alt))
+            elif op in (_sre.MAX_REPEAT, _sre.MIN_REPEAT) and arg[0] >= 1:
+                sub = clause(arg[2])
+                if sub:
+                    clauses.append(sub)
+        if run:
+            clauses.append((run,))
+        # Most selective clause: the one whose shortest alternative is longest
+        return max(clauses, key=lambda c: min(len(lit) for lit in c), default=None)
+
+    try:
+        return clause(_sre_parse.parse(pattern.pattern, pattern.flags))
+    except Exception:
+        return None
+
+
+class PatternScanner:
+    """
+    Runs every pattern group against a prompt once and reports all hits.
+
+    Each regex is gated by a literal prefilter derived from the regex
+    itself: when none of its required keywords appear in the lowercased
+    prompt, the regex is skipped. Non-ASCII prompts bypass the prefilter,
+    since IGNORECASE matching there is broader than str.lower().
+    """
+
+    def __init__(self, groups: dict[str, list[re.Pattern]]):
+        self.groups = {
+            name: [(pattern, _required_literals(pattern)) for pattern in patterns]
+            for name, patterns in groups.items()
+        }
+
+    def scan(self, prompt: str) -> ScanResult:
+        lowered = prompt.lower() if prompt.isascii() else None
+        result = ScanResult()
+        for name, patterns in self.groups.items():
+            hits = []
+            for i, (pattern, literals) in enumerate(patterns):
+                if lowered is not None and literals and not any(lit in lowered for lit in literals):
+                    continue
+                match = pattern.search(prompt)
+                if match:
+                    hits.append(PatternHit(name, i, match.start(), match.end(), match.group()))
+            if hits:
+                result.hits[name] = hits
+        return result
+
+
+_scanner = PatternScanner({**PATTERN_CATEGORIES, STRIP_GROUP: REWRITE_STRIP_PATTERNS})
+
+
+def scan_prompt(prompt: str) -> ScanResult:
+    """Scan a prompt against every attack category and the rewrite strip list."""
+    return _scanner.scan(prompt)
@@ -0,0 +1,390 @@
+"""
+Sentinel-AI — Request Tracing
+Per-request breakdown of where /analyze spends its time, and an exporter
+that writes sampled traces as OpenTelemetry spans.
+
+A RequestTrace is active (through a context variable) while a traced
+request runs. Pipeline stage timings come from the StageGraph run;
+provider calls, provider retries and SQL statements add themselves to
+the active trace, tagged with the stage they ran in. Requests sent with
+`X-Sentinel-Trace: 1` get the breakdown back as a `timings` block; when
+TRACE_EXPORT_PATH is set, those requests plus a TRACE_SAMPLE_RATE share
+of all others are appended to a size-rotated JSONL file, one OTLP/JSON
+`resourceSpans` document per line (a root span, one span per stage, and
+one per provider call). Untraced requests pay one context-variable
+lookup per provider call and SQL statement.
+"""
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.utils.logger import log
+from app.utils.stages import StageRun, current_stage
+
+
+@dataclass
+class ProviderCall:
+    provider: str
+    operation: str
+    outcome: str
+    stage: str | None
+    start_ms: float  # offset from the start of the request
+    duration_ms: float
+
+
+class RequestTrace:
+    """Timings collected for one request."""
+
+    def __init__(self, name: str, requested: bool, export: bool):
+        self.name = name
+        self.requested = requested  # caller asked for the timings block
+        self.export = export
+        self.trace_id = os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.start_ns = time.time_ns()
+        self.t0 = time.perf_counter()
+        self.total_ms = 0.0
+        self.pipeline_ms = 0.0  # offset at which the stage graph started
+        self.stages: dict[str, tuple[float, float]] = {}  # name → (start_ms, duration_ms), in start order
+        self.providers: list[ProviderCall] = []
+        self.db: dict[str | None, list] = {}  # stage → [statements, seconds]
+        self.retries = 0  # provider attempts beyond the first, across all calls
+        self.http_attempts = 0  # requests sent through the shared provider HTTP pool
+        self.http_calls = 0  # provider calls made through that pool
+        self.attributes: dict = {}
+        self.error: str | None = None
+        self.finished = False
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.t0) * 1000
+
+    def record_stages(self, run: StageRun):
+        """Copy stage timings from a finished pipeline run, relative to the request start."""
+        for name, timing in sorted(run.timings.items(), key=lambda item: item[1].start_ms):
+            self.stages[name] = (self.pipeline_ms + timing.start_ms, timing.duration_ms)
+
+    def record_provider_call(self, provider: str, operation: str, outcome: str, start: float):
+        self.providers.append(ProviderCall(
+            provider, operation, outcome, current_stage.get(),
+            (start - self.t0) * 1000, (time.perf_counter() - start) * 1000,
+        ))
+        if provider != "gemini":
+            self.http_calls += 1
+
+    def record_query(self, seconds: float):
+        totals = self.db.get(stage := current_stage.get())
+        if totals is None:
+            totals = self.db[stage] = [0, 0.0]
+        totals[0] += 1
+        totals[1] += seconds
+
+    def finish(self, error: str | None = None):
+        self.total_ms = self.elapsed_ms()
+        self.error = error
+        self.finished = True
+
+    @property
+    def total_retries(self) -> int:
+        # HTTP attempts not matched by a provider call were SDK-level retries
+        return self.retries + max(0, self.http_attempts - self.http_calls)
+
+    # ── Output ──
+
+    def timings(self) -> dict:
+        """The `timings` block returned to callers that asked for it."""
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": round(self.total_ms, 2),
+            "stages": {
+                name: {
+                    "start_ms": round(start, 2),
+                    "duration_ms": round(duration, 2),
+                    "db_queries": self.db.get(name, (0, 0.0))[0],
+                    "db_ms": round(self.db.get(name, (0, 0.0))[1] * 1000, 2),
+                }
+                for name, (start, duration) in self.stages.items()
+            },
+            "providers": [
+                {
+                    "provider": call.provider,
+                    "operation": call.operation,
+                    "outcome": call.outcome,
+                    "stage": call.stage,
+                    "start_ms": round(call.start_ms, 2),
+                    "duration_ms": round(call.duration_ms, 2),
+                }
+                for call in self.providers
+            ],
+            "provider_ms": round(sum((call.duration_ms for call in self.providers), 0.0), 2),
+            "retries": self.total_retries,
+            "db": {
+                "queries": sum(count for count, _ in self.db.values()),
+                "ms": round(sum(seconds for _, seconds in self.db.values()) * 1000, 2),
+            },
+        }
+
+    def to_otlp(self) -> dict:
+        """This trace as one OTLP/JSON ExportTraceServiceRequest."""
+
+        def ns(offset_ms: float) -> str:
+            return str(self.start_ns + int(offset_ms * 1e6))
+
+        root = _span(self.trace_id, self.span_id, None, self.name, 2, ns(0), ns(self.total_ms), {
+            **self.attributes,
+            "sentinel.retries": self.total_retries,
+            "sentinel.provider_ms": round(sum((call.duration_ms for call in self.providers), 0.0), 2),
+            "db.queries": sum(count for count, _ in self.db.values()),
+            "db.duration_ms": round(sum(seconds for _, seconds in self.db.values()) * 1000, 2),
+        }, self.error)
+
+        spans = [root]
+        stage_ids = {}
+        for name, (start, duration) in self.stages.items():
+            stage_ids[name] = span_id = os.urandom(8).hex()
+            count, seconds = self.db.get(name, (0, 0.0))
+            spans.append(_span(self.trace_id, span_id, self.span_id, f"stage {name}", 1, ns(start), ns(start + duration), {
+                "sentinel.stage": name,
+                "db.queries": count,
+                "db.duration_ms": round(seconds * 1000, 2),
+            }))
+        for call in self.providers:
+            spans.append(_span(
+                self.trace_id, os.urandom(8).hex(), stage_ids.get(call.stage, self.span_id),
+                f"{call.provider} {call.operation}", 3, ns(call.start_ms), ns(call.start_ms + call.duration_ms),
+                {"gen_ai.system": call.provider, "gen_ai.operation.name": call.operation, "sentinel.outcome": call.outcome},
+                call.outcome if call.outcome == "error" else None,
+            ))
+
+        return {"resourceSpans": [{
+            "resource": {"attributes": _attributes({"service.name": "sentinel-ai"})},
+            "scopeSpans": [{"scope": {"name": "sentinel.analyze"}, "spans": spans}],
+        }]}
+
+
+def _span(trace_id: str, span_id: str, parent_id: str | None, name: str, kind: int,
+          start_ns: str, end_ns: str, attributes: dict, error: str | None = None) -> dict:
+    span = {
+        "traceId": trace_id,
+        "spanId": span_id,
+        "name": name,
+        "kind": kind,  # 1 internal, 2 server, 3 client
+        "startTimeUnixNano": start_ns,
+        "endTimeUnixNano": end_ns,
+        "attributes": _attributes(attributes),
+        "status": {"code": 2, "message": error} if error else {"code": 1},
+    }
+    if parent_id is not None:
+        span["parentSpanId"] = parent_id
+    return span
+
+
+def _attributes(values: dict) -> list[dict]:
+    """OTLP/JSON AnyValue encoding (int64 values are strings)."""
+    encoded = []
+    for key, value in values.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            encoded.append({"key": key, "value": {"boolValue": value}})
+        elif isinstance(value, int):
+            encoded.append({"key": key, "value": {"intValue": str(value)}})
+        elif isinstance(value, float):
+            encoded.append({"key": key, "value": {"doubleValue": value}})
+        else:
+            encoded.append({"key": key, "value": {"stringValue": str(value)}})
+    return encoded
+
+
+# ── Active trace ──
+
+current_trace: ContextVar[RequestTrace | None] = ContextVar("sentinel_trace", default=None)
+
+
+def trace_requested(header: str | None) -> bool:
+    """Whether an X-Sentinel-Trace header value asks for the timings block."""
+    return header is not None and header.strip().lower() in ("1", "true", "yes", "on")
+
+
+def start_trace(name: str, requested: bool = False) -> RequestTrace | None:
+    """A new trace if the caller asked for timings or the request is sampled for export, else None."""
+    export = get_exporter() is not None and (requested or random.random() < settings.trace_sample_rate)
+    if not requested and not export:
+        return None
+    return RequestTrace(name, requested, export)
+
+
+def end_trace(trace: RequestTrace, error: str | None = None):
+    """Close `trace` and hand it to the exporter if it was sampled."""
+    if trace.finished:
+        return
+    trace.finish(error)
+    if trace.export and (exporter := get_exporter()) is not None:
+        exporter.submit(trace)
+
+
+def record_provider_call(provider: str, operation: str, outcome: str, start: float):
+    trace = current_trace.get()
+    if trace is not None:
+        trace.record_provider_call(provider, operation, outcome, start)
+
+
+def record_retry():
+    trace = current_trace.get()
+    if trace is not None:
+        trace.retries += 1
+
+
+async def count_http_attempt(request):
+    """httpx request hook: every attempt, including SDK retries, passes through here."""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.http_attempts += 1
+
+
+def instrument_engine(engine):
+    """Time SQL statements issued while a trace is active (async engines run these hooks in the caller's context)."""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and current_trace.get() is not None:
+        context._trace_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_trace_start", None)
+    if start is not None and (trace := current_trace.get()) is not None:
+        trace.record_query(time.perf_counter() - start)
+
+
+# ── Span export ──
+
+class SpanExporter:
+    """
+    Appends finished traces to a JSONL file from a daemon thread.
+
+    The file is rotated once it would exceed `max_bytes` (path → path.1 →
+    … → path.N, oldest dropped). When the queue is full, traces are
+    dropped and counted rather than waiting.
+    """
+
+    def __init__(self, path: str, max_bytes: int, backups: int, queue_size: int = 1000):
+        self.path = path
+        self.max_bytes = max(1, max_bytes)
+        self.backups = max(0, backups)
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._drain, name="sentinel-span-exporter", daemon=True)
+        self._thread.start()
+        self.exported = 0
+        self.dropped = 0
+        self.failures = 0
+        self.rotations = 0
+
+    def submit(self, trace: RequestTrace):
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self):
+        while True:
+            traces = [self._queue.get()]
+            while True:
+                try:
+                    traces.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(t is None for t in traces)
+            lines = [json.dumps(t.to_otlp(), separators=(",", ":")) + "\n" for t in traces if t is not None]
+            try:
+                self._write(lines)
+                self.exported += len(lines)
+            except OSError as e:
+                self.failures += len(lines)
+                log.error("Span export failed", path=self.path, error=str(e))
+            for _ in traces:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, lines: list[str]):
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        pending: list[str] = []
+        for line in lines:
+            encoded = len(line.encode("utf-8"))
+            if size and size + encoded > self.max_bytes:
+                self._append(pending)
+                pending, size = [], 0
+                self._rotate()
+            pending.append(line)
+            size += encoded
+        self._append(pending)
+
+    def _append(self, lines: list[str]):
+        if lines:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+
+    def _rotate(self):
+        self.rotations += 1
+        if self.backups == 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def close(self, timeout: float = 2.0):
+        """Write what is queued (up to `timeout`) and stop the thread."""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout=timeout)
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "sample_rate": settings.trace_sample_rate,
+            "queued": self._queue.qsize(),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failures": self.failures,
+            "rotations": self.rotations,
+        }
+
+
+_exporter: SpanExporter | None = None
+
+
+def get_exporter() -> SpanExporter | None:
+    """The process-wide span exporter, or None when TRACE_EXPORT_PATH is unset."""
+    global _exporter
+    if not settings.trace_export_path:
+        return None
+    if _exporter is None:
+        _exporter = SpanExporter(
+            settings.trace_export_path,
+            settings.trace_export_max_mb * 1024 * 1024,
+            settings.trace_export_backups,
+        )
+    return _exporter
+
+
+def close_exporter():
+    """Flush and stop the span exporter (called from the app lifespan)."""
+    global _exporter
+    if _exporter is not None:
+        _exporter.close()
+        _exporter = None
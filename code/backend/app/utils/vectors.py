@@ -0,0 +1,38 @@
+"""
+Sentinel-AI — Binary Vector Codec
+Compact BLOB encoding for embeddings: an 8-byte header followed by raw
+little-endian float16/float32/float64 values. Decoding is a zero-copy
+`np.frombuffer` view; the header keeps the payload 8-byte aligned.
+"""
+
+import struct
+import numpy as np
+
+_HEADER = struct.Struct("<4sI")  # magic (dtype tag), dimension
+
+_TAGS = {
+    "float16": b"VF16",
+    "float32": b"VF32",
+    "float64": b"VF64",
+}
+_DTYPES = {
+    b"VF16": np.dtype("<f2"),
+    b"VF32": np.dtype("<f4"),
+    b"VF64": np.dtype("<f8"),
+}
+
+
+def encode_vector(vector, dtype: str = "float32") -> bytes:
+    """Encode a vector (list or ndarray) as header + raw values."""
+    tag = _TAGS[dtype]
+    arr = np.asarray(vector, dtype=_DTYPES[tag]).ravel()
+    return _HEADER.pack(tag, arr.shape[0]) + arr.tobytes()
+
+
+def decode_vector(blob: bytes | memoryview) -> np.ndarray:
+    """Return a read-only ndarray view over an encoded vector (no copy)."""
+    tag, dim = _HEADER.unpack_from(blob)
+    dtype = _DTYPES.get(tag)
+    if dtype is None:
+        raise ValueError(f"Unknown vector encoding: {tag!r}")
+    return np.frombuffer(blob, dtype=dtype, count=dim, offset=_HEADER.size)
@@ -0,0 +1,293 @@
+"""
+Sentinel-AI — Engine Microbenchmark Suite
+Times the CPU-bound engine paths that run on every /analyze request
+(heuristic red-team, blue-team and rewrite, the TF-IDF embedding, centroid
+and cosine distance, drift, and risk scoring) over generated prompt
+corpora of several lengths and conversation depths.
+
+Rounds of all cases are interleaved and the best round is kept, so a
+burst of background load is spread over every case instead of landing on
+one. A fixed calibration workload (string scanning and small numpy math)
+is timed the same way, and cases are compared with the stored baseline
+relative to it, which cancels most of the difference between machines
+and CPU frequency states. A case slower than baseline × (1 + tolerance)
+is a regression once --confirm re-timings of just those cases (which
+rule out a burst of load) agree, and the run exits with status 1.
+Results are printed as a table and can be written as JSON; re-record
+the baseline (--save-baseline) after an intentional change or on very
+different hardware.
+
+Usage (from code/backend):
+    python -m benchmarks.bench_engines [--json out.json] [--tolerance 0.25]
+    python -m benchmarks.bench_engines --save-baseline
+    python -m benchmarks.bench_engines --only redteam,drift
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.bench_scanner import make_prompt
+
+BASELINE_PATH = Path(__file__).with_name("baseline_engines.json")
+
+# Prompt lengths (characters) and conversation depths (prior user turns)
+PROMPT_SIZES = {"short": 200, "medium": 2_000, "long": 20_000}
+DEPTHS = (1, 10, 50)
+EMBEDDING_DIMS = {"tfidf": 128, "openai": 1536}
+
+# Prompts per corpus; every other prompt carries an injection attempt
+_CORPUS_SIZE = 8
+
+_REFERENCE = "_reference"
+
+
+def prompt_corpus(size: int, seed: int = 0) -> list[str]:
+    return [make_prompt(size, attack=i % 2 == 1, seed=seed + i) for i in range(_CORPUS_SIZE)]
+
+
+def conversation(depth: int, dim: int, seed: int = 0) -> list[list[float]]:
+    """`depth` prior user-turn embeddings, unit length, as the engines receive them (lists)."""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((depth, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.tolist()
+
+
+# ── Timing ──
+
+def _calibrate(run: Callable[[], int], min_time: float) -> tuple[int, int]:
+    """(passes per round, calls per pass) so that one round lasts at least `min_time`."""
+    calls = run()  # warm-up (regex caches, numpy dispatch)
+    passes = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(passes):
+            run()
+        if time.perf_counter() - start >= min_time:
+            return passes, calls
+        passes *= 2
+
+
+def _round(run: Callable[[], int], passes: int, calls: int) -> float:
+    """Seconds per call over one round."""
+    start = time.perf_counter()
+    for _ in range(passes):
+        run()
+    return (time.perf_counter() - start) / (passes * calls)
+
+
+def reference_workload() -> Callable[[], int]:
+    """Fixed mix of the work the engines do (regex and string scanning, small vector math)."""
+    import re
+
+    text = make_prompt(2_000, attack=True, seed=1234)
+    pattern = re.compile(r"ignore\s+(all\s+)?previous|system\s+prompt", re.IGNORECASE)
+    vectors = np.asarray(conversation(16, 256, seed=1234), dtype=np.float32)
+
+    def run() -> int:
+        pattern.findall(text)
+        sum(len(word) for word in text.split())
+        np.linalg.norm(vectors @ vectors[0])
+        return 1
+    return run
+
+
+def _sync_loop(fn: Callable, args: list[tuple]) -> Callable[[], int]:
+    def run() -> int:
+        for a in args:
+            fn(*a)
+        return len(args)
+    return run
+
+
+def _async_loop(fn: Callable, args: list[tuple], loop: asyncio.AbstractEventLoop) -> Callable[[], int]:
+    async def calls():
+        for a in args:
+            await fn(*a)
+
+    def run() -> int:
+        loop.run_until_complete(calls())
+        return len(args)
+    return run
+
+
+# ── Cases ──
+
+def build_cases(loop: asyncio.AbstractEventLoop) -> dict[str, Callable[[], int]]:
+    """Case name → one pass over that case's corpus."""
+    from app.engines.blueteam import _heuristic_blueteam
+    from app.engines.drift import compute_drift
+    from app.engines.embedding import _tfidf_embedding, compute_centroid, cosine_distance, running_centroid
+    from app.engines.mitigation import _heuristic_rewrite
+    from app.engines.redteam import _heuristic_redteam
+    from app.engines.risk_scorer import compute_risk
+
+    cases: dict[str, Callable[[], int]] = {}
+
+    for label, size in PROMPT_SIZES.items():
+        prompts = prompt_corpus(size)
+        reds = [_heuristic_redteam(p) for p in prompts]
+        cases[f"redteam/{label}"] = _sync_loop(_heuristic_redteam, [(p,) for p in prompts])
+        cases[f"blueteam/{label}"] = _sync_loop(_heuristic_blueteam, list(zip(prompts, reds)))
+        cases[f"rewrite/{label}"] = _sync_loop(_heuristic_rewrite, [(p,) for p in prompts])
+        cases[f"tfidf_embedding/{label}"] = _sync_loop(_tfidf_embedding, [(p,) for p in prompts])
+
+    for kind, dim in EMBEDDING_DIMS.items():
+        current = conversation(_CORPUS_SIZE, dim, seed=99)
+        for depth in DEPTHS:
+            history = conversation(depth, dim)
+            centroid = running_centroid(np.sum(np.asarray(history, dtype=np.float64), axis=0), depth)
+            cases[f"centroid/{kind}/depth{depth}"] = _sync_loop(compute_centroid, [(history,)] * _CORPUS_SIZE)
+            cases[f"drift/{kind}/depth{depth}"] = _async_loop(
+                compute_drift, [(vec, centroid, depth + 1) for vec in current], loop,
+            )
+        cases[f"cosine_distance/{kind}"] = _sync_loop(cosine_distance, list(zip(current, current[1:] + current[:1])))
+
+    # Risk scoring over the verdicts of the medium corpus, each with the drift of a random next turn
+    prompts = prompt_corpus(PROMPT_SIZES["medium"])
+    history = conversation(10, EMBEDDING_DIMS["tfidf"])
+    centroid = np.mean(np.asarray(history, dtype=np.float64), axis=0)
+    verdicts = []
+    for i, prompt in enumerate(prompts):
+        red = _heuristic_redteam(prompt)
+        blue = _heuristic_blueteam(prompt, red)
+        vec = conversation(1, EMBEDDING_DIMS["tfidf"], seed=i)[0]
+        drift = loop.run_until_complete(compute_drift(vec, centroid, 11))
+        verdicts.append((red, blue, drift))
+    cases["risk"] = _sync_loop(compute_risk, verdicts)
+    return cases
+
+
+def run_suite(select: Callable[[str], bool], rounds: int, min_time: float) -> tuple[dict[str, float], float]:
+    """(case name → best microseconds per call, calibration microseconds per pass) for the selected cases."""
+    loop = asyncio.new_event_loop()
+    try:
+        cases = {name: run for name, run in build_cases(loop).items() if select(name)}
+        cases[_REFERENCE] = reference_workload()
+        plans = {name: _calibrate(run, min_time) for name, run in cases.items()}
+        best = dict.fromkeys(cases, float("inf"))
+        for _ in range(rounds):
+            for name, run in cases.items():
+                best[name] = min(best[name], _round(run, *plans[name]))
+        reference = best.pop(_REFERENCE)
+        return {name: round(seconds * 1e6, 3) for name, seconds in best.items()}, round(reference * 1e6, 3)
+    finally:
+        loop.close()
+
+
+# ── Baseline comparison ──
+
+def compare(results: dict[str, float], reference: float, baseline: dict, tolerance: float) -> list[tuple]:
+    """
+    (case, µs, baseline µs or None, ratio or None, status) per case. The
+    ratio compares times relative to each run's calibration workload.
+    """
+    scale = baseline.get("reference_us", reference) / reference
+    rows = []
+    for name, us in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            rows.append((name, us, None, None, "new"))
+            continue
+        ratio = us * scale / base if base else float("inf")
+        if ratio > 1 + tolerance:
+            status = "REGRESSION"
+        elif ratio < 1 / (1 + tolerance):
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((name, us, base, ratio, status))
+    return rows
+
+
+def _environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", help="Write results (and the comparison) to this file")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="Baseline file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Record this run as the baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before a case fails (0.25 = 25%%)")
+    parser.add_argument("--only", help="Comma-separated engine names (redteam, blueteam, rewrite, tfidf_embedding, centroid, cosine_distance, drift, risk)")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--confirm", type=int, default=2, help="Re-time apparent regressions up to N times before failing")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Seconds per timed round")
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "")
+    from app.utils.logger import log
+
+    log.set_level("error")  # compute_risk logs every verdict; logger cost is covered by bench_logger
+
+    only = set(args.only.split(",")) if args.only else None
+    results, reference = run_suite(lambda name: not only or name.split("/")[0] in only, args.rounds, args.min_time)
+    document = {"environment": _environment(), "unit": "us_per_call", "reference_us": reference, "results": results}
+
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(document, indent=2) + "\n")
+        for name, us in results.items():
+            print(f"{name:<28}{us:>12.2f} µs")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline.get("environment") != document["environment"]:
+            print(f"note: baseline was recorded on a different environment ({baseline.get('environment')})")
+    else:
+        print(f"note: no baseline at {args.baseline}; run with --save-baseline to record one")
+
+    rows = compare(results, reference, baseline, args.tolerance)
+    for _ in range(args.confirm):
+        # A slow round can be background load; keep the best time seen, on this run's calibration scale
+        slow = {row[0] for row in rows if row[4] == "REGRESSION"}
+        if not slow:
+            break
+        again, again_reference = run_suite(slow.__contains__, args.rounds, args.min_time)
+        for name, us in again.items():
+            results[name] = round(min(results[name], us * reference / again_reference), 3)
+        rows = compare(results, reference, baseline, args.tolerance)
+    if "reference_us" in baseline:
+        print(f"calibration {reference:.2f} µs (baseline {baseline['reference_us']:.2f} µs); changes are relative to it")
+    print(f"{'case':<28}{'µs/call':>12}{'baseline':>12}{'change':>9}  status")
+    for name, us, base, ratio, status in rows:
+        base_s = f"{base:>12.2f}" if base is not None else f"{'—':>12}"
+        change = f"{(ratio - 1) * 100:>+8.1f}%" if ratio is not None else f"{'':>9}"
+        print(f"{name:<28}{us:>12.2f}{base_s}{change}  {status}")
+
+    regressions = [r for r in rows if r[4] == "REGRESSION"]
+    if args.json:
+        document["comparison"] = {
+            "baseline": args.baseline,
+            "tolerance": args.tolerance,
+            "cases": {name: {"baseline": base, "ratio": ratio and round(ratio, 4), "status": status}
+                      for name, _, base, ratio, status in rows},
+            "regressions": [r[0] for r in regressions],
+        }
+        Path(args.json).write_text(json.dumps(document, indent=2) + "\n")
+
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than baseline by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
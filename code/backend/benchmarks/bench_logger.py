@@ -0,0 +1,88 @@
+"""
+Sentinel-AI — Logger Call Latency
+Measures what a log call costs the calling thread (the event loop) when
+stderr is a slow consumer: a pipe drained at a fixed rate with periodic
+stalls, as with a busy terminal or log shipper. Compares inline writes
+(LOG_ASYNC=false), the queued writer, and a call filtered out by level.
+
+Usage (from code/backend):
+    python -m benchmarks.bench_logger [--calls N] [--stall-ms N]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+
+def _drain_slowly(fd: int, chunk: int, stall_every: float, stall: float, stop: threading.Event):
+    """Read the pipe in small chunks, pausing `stall` seconds every `stall_every` seconds."""
+    next_stall = time.monotonic() + stall_every
+    os.set_blocking(fd, False)
+    while not stop.is_set():
+        try:
+            os.read(fd, chunk)
+        except BlockingIOError:
+            pass
+        time.sleep(0.0005)
+        if time.monotonic() >= next_stall:
+            time.sleep(stall)
+            next_stall = time.monotonic() + stall_every
+    os.set_blocking(fd, True)
+
+
+def _measure(logger, level: str, calls: int) -> list[float]:
+    emit = getattr(logger, level)
+    samples = []
+    for i in range(calls):
+        start = time.perf_counter()
+        emit(f"Analysis complete", action="allow", score=f"{i % 100}/100", drift="0.123", tier="heuristic", total_ms=7)
+        samples.append((time.perf_counter() - start) * 1e6)
+        if i % 50 == 0:
+            time.sleep(0.001)  # requests arrive over time, not as one burst
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--stall-ms", type=float, default=50.0, help="Consumer pause every 100 ms")
+    args = parser.parse_args()
+
+    from app.utils.logger import Logger
+
+    read_fd, write_fd = os.pipe()
+    saved_stderr = os.dup(2)
+    sys.stderr.flush()
+    os.dup2(write_fd, 2)
+    stop = threading.Event()
+    reader = threading.Thread(target=_drain_slowly, args=(read_fd, 4096, 0.1, args.stall_ms / 1000, stop), daemon=True)
+    reader.start()
+
+    results = {}
+    try:
+        for name, logger, level in (
+            ("inline write", Logger(async_=False), "info"),
+            ("queued writer", Logger(async_=True), "info"),
+            ("below level", Logger(level="info"), "debug"),
+        ):
+            samples = _measure(logger, level, args.calls)
+            logger.close()
+            results[name] = (samples, logger.stats()["dropped"])
+    finally:
+        stop.set()
+        reader.join()
+        sys.stderr.flush()
+        os.dup2(saved_stderr, 2)
+
+    print(f"{args.calls} calls, stderr drained at ~8 MB/s with {args.stall_ms:.0f} ms stalls every 100 ms")
+    print(f"{'mode':<16}{'p50':>10}{'p99':>10}{'max':>12}{'dropped':>9}")
+    for name, (samples, dropped) in results.items():
+        q = statistics.quantiles(samples, n=100)
+        print(f"{name:<16}{q[49]:>7.1f} µs{q[98]:>7.1f} µs{max(samples) / 1000:>9.1f} ms{dropped:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Sentinel-AI — Per-Request Database Round Trips
+Runs /api/analyze in-process (dry-run, throwaway SQLite database) against
+conversations with 0 and N prior turns and reports, per request, the SQL
+statements issued, commits, and bytes of row data read back.
+
+Usage (from code/backend):
+    python -m benchmarks.bench_state_loader [--turns N] [--requests N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from collections import Counter
+
+
+def _value_size(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return 8
+
+
+class StatementCounter:
+    """Counts statements by verb and the bytes of every fetched row (aiosqlite buffers rows on execute)."""
+
+    def __init__(self):
+        self.statements = Counter()
+        self.bytes_read = 0
+        self.commits = 0
+
+    def reset(self):
+        self.statements.clear()
+        self.bytes_read = 0
+        self.commits = 0
+
+    def after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        self.statements[verb] += 1
+        for row in getattr(cursor, "_rows", None) or ():
+            self.bytes_read += sum(_value_size(v) for v in row)
+
+    def on_commit(self, conn):
+        self.commits += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=30, help="Prior turns in the existing conversation")
+    parser.add_argument("--requests", type=int, default=20, help="Measured requests per case")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="sentinel-bench-")
+    os.environ.update(
+        DATABASE_URL=f"sqlite+aiosqlite:///{tmp}/bench.db",
+        OPENAI_API_KEY="",
+        EMBEDDING_CACHE_PATH="",
+        SIGNATURE_INDEX_ENABLED="false",
+        VERDICT_CACHE_ENABLED="false",
+    )
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    from app.database import engine
+    from app.main import app
+
+    counter = StatementCounter()
+    event.listen(engine.sync_engine, "after_cursor_execute", counter.after_execute)
+    event.listen(engine.sync_engine, "commit", counter.on_commit)
+
+    def measure(client, conversation_ids):
+        counter.reset()
+        for i, cid in enumerate(conversation_ids):
+            r = client.post("/api/analyze", json={"conversation_id": cid, "user_id": "bench", "prompt": f"Tell me about topic {i}"})
+            r.raise_for_status()
+        n = len(conversation_ids)
+        per_verb = ", ".join(f"{verb} {count / n:.1f}" for verb, count in sorted(counter.statements.items()))
+        return sum(counter.statements.values()) / n, per_verb, counter.commits / n, counter.bytes_read / n
+
+    with TestClient(app) as client:
+        for i in range(args.turns):
+            client.post("/api/analyze", json={"conversation_id": "existing", "user_id": "bench", "prompt": f"Warm-up turn {i}"})
+
+        cases = {
+            "new conversation": [f"new-{i}" for i in range(args.requests)],
+            f"existing ({args.turns}+ turns)": ["existing"] * args.requests,
+        }
+        print(f"{'case':<24} {'statements':>10} {'commits':>8} {'bytes read':>11}  breakdown")
+        for name, ids in cases.items():
+            statements, per_verb, commits, bytes_read = measure(client, ids)
+            print(f"{name:<24} {statements:>10.1f} {commits:>8.1f} {bytes_read:>11,.0f}  {per_verb}")
+
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
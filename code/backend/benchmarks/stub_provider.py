@@ -0,0 +1,249 @@
+"""
+Sentinel-AI — Local OpenAI-Compatible Stub Provider
+Serves the OpenAI chat-completions (plain and streamed) and embeddings
+wire formats with configurable latency and error injection, so the
+gateway can be load-tested without calling a paid API.
+
+Analysis calls are answered like a well-behaved model: the red-team,
+blue-team, fused and rewrite system prompts get valid JSON/text derived
+from the gateway's own heuristics, explanations get a short sentence, and
+main-LLM calls get `--response-words` words (streamed word by word when
+asked). Embeddings are deterministic hashed bag-of-words vectors, so
+related prompts land near each other and drift behaves as with a real
+model. Latencies are log-normal around the configured median; injected
+errors return the provider's error body with --error-status (429s carry a
+retry-after-ms header). GET /stub/stats reports call and error counts.
+
+Point the gateway at it with OPENAI_BASE_URL=http://127.0.0.1:8900/v1 and
+any OPENAI_API_KEY. Requires uvicorn (see requirements.txt).
+
+Usage (from code/backend):
+    python -m benchmarks.stub_provider [--port 8900] [--chat-latency-ms 400] [--error-rate 0.02]
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+_WORDS = (
+    "the gateway reviewed your request and here is a concise helpful answer covering the main "
+    "points with a short example followed by practical next steps and a brief summary"
+).split()
+
+
+@dataclass
+class StubConfig:
+    chat_latency_ms: float = 400.0  # median time to a full (or first streamed) response
+    embedding_latency_ms: float = 40.0
+    latency_sigma: float = 0.35  # log-normal spread; 0 = fixed latency
+    token_interval_ms: float = 15.0  # between streamed chunks
+    error_rate: float = 0.0  # share of calls that fail
+    error_status: int = 500
+    retry_after_ms: int = 100  # sent with 429s
+    response_words: int = 60
+    dim: int = 1536
+    seed: int = 0
+
+
+class _Counters:
+    def __init__(self):
+        self.calls: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        self.started = time.time()
+
+    def hit(self, endpoint: str, failed: bool):
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        if failed:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+def create_app(config: StubConfig) -> FastAPI:
+    from app.engines.blueteam import BLUETEAM_SYSTEM_PROMPT, _heuristic_blueteam
+    from app.engines.fused import FUSED_SYSTEM_PROMPT
+    from app.engines.mitigation import REWRITE_SYSTEM_PROMPT, _heuristic_rewrite
+    from app.engines.redteam import REDTEAM_SYSTEM_PROMPT, _heuristic_redteam
+    from app.models.schemas import RedTeamOutput
+
+    app = FastAPI(title="Sentinel-AI stub provider")
+    rng = random.Random(config.seed)
+    counters = _Counters()
+
+    def latency(median_ms: float) -> float:
+        if config.latency_sigma <= 0:
+            return median_ms / 1000
+        return median_ms * rng.lognormvariate(0, config.latency_sigma) / 1000
+
+    def fail(endpoint: str) -> JSONResponse | None:
+        failed = rng.random() < config.error_rate
+        counters.hit(endpoint, failed)
+        if not failed:
+            return None
+        kind = "rate_limit_exceeded" if config.error_status == 429 else "server_error"
+        headers = {"retry-after-ms": str(config.retry_after_ms)} if config.error_status == 429 else None
+        body = {"error": {"message": f"Injected {kind} from the stub provider", "type": kind, "param": None, "code": kind}}
+        return JSONResponse(body, status_code=config.error_status, headers=headers)
+
+    def user_prompt(content: str) -> str:
+        """The analysed prompt inside an engine's user message."""
+        if "User Prompt:\n" in content:
+            content = content.rsplit("User Prompt:\n", 1)[1]
+        elif content.startswith("Original Prompt:\n"):
+            content = content[len("Original Prompt:\n"):]
+        return content.split("\n\nRed-Team Analysis:\n", 1)[0]
+
+    def answer(messages: list[dict]) -> str:
+        system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        content = messages[-1].get("content", "") if messages else ""
+        if system == REDTEAM_SYSTEM_PROMPT:
+            return json.dumps(_heuristic_redteam(user_prompt(content)).model_dump())
+        if system == BLUETEAM_SYSTEM_PROMPT:
+            prompt = user_prompt(content)
+            red = RedTeamOutput(**json.loads(content.split("\n\nRed-Team Analysis:\n", 1)[1]))
+            return json.dumps(_heuristic_blueteam(prompt, red).model_dump())
+        if system == FUSED_SYSTEM_PROMPT:
+            prompt = user_prompt(content)
+            red = _heuristic_redteam(prompt)
+            blue = _heuristic_blueteam(prompt, red)
+            return json.dumps({
+                "red_team": red.model_dump(),
+                "blue_team": blue.model_dump(),
+                "explanation": f"Classified as {blue.risk_level} ({blue.attack_category}) by the stub provider.",
+            })
+        if system == REWRITE_SYSTEM_PROMPT:
+            return _heuristic_rewrite(user_prompt(content))
+        if not system:
+            return "The prompt was scored by the stub provider; see the risk breakdown for the contributing signals."
+        return " ".join(_WORDS[i % len(_WORDS)] for i in range(config.response_words))
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if (error := fail("chat")) is not None:
+            await asyncio.sleep(latency(config.chat_latency_ms) / 4)
+            return error
+        content = answer(body.get("messages", []))
+        model = body.get("model", "stub")
+        created = int(time.time())
+        completion_id = f"chatcmpl-stub-{counters.calls['chat']}"
+        usage = {"prompt_tokens": 0, "completion_tokens": len(content.split()), "total_tokens": len(content.split())}
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency(config.chat_latency_ms))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        def chunk(delta: dict, finish: str | None = None) -> str:
+            return "data: " + json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }) + "\n\n"
+
+        async def stream():
+            await asyncio.sleep(latency(config.chat_latency_ms))
+            yield chunk({"role": "assistant", "content": ""})
+            for word in re.findall(r"\S+\s*", content):
+                yield chunk({"content": word})
+                await asyncio.sleep(config.token_interval_ms / 1000)
+            yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        if (error := fail("embeddings")) is not None:
+            await asyncio.sleep(latency(config.embedding_latency_ms) / 4)
+            return error
+        texts = body.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        await asyncio.sleep(latency(config.embedding_latency_ms))
+        data = []
+        for i, text in enumerate(texts):
+            vector = embed(text, config.dim)
+            if body.get("encoding_format") == "base64":
+                value = base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii")
+            else:
+                value = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": value})
+        tokens = sum(len(t.split()) for t in texts)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "stub"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    @app.get("/stub/stats")
+    async def stats():
+        return {"calls": counters.calls, "errors": counters.errors, "uptime_seconds": round(time.time() - counters.started, 1)}
+
+    return app
+
+
+@lru_cache(maxsize=50_000)
+def _token_vector(token: str, dim: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+
+
+def embed(text: str, dim: int) -> np.ndarray:
+    """Unit-length sum of per-token random vectors (stable across processes)."""
+    tokens = re.findall(r"[a-z]+", text.lower())[:512] or ["<empty>"]
+    vector = np.sum([_token_vector(t, dim) for t in tokens], axis=0)
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--chat-latency-ms", type=float, default=StubConfig.chat_latency_ms)
+    parser.add_argument("--embedding-latency-ms", type=float, default=StubConfig.embedding_latency_ms)
+    parser.add_argument("--latency-sigma", type=float, default=StubConfig.latency_sigma)
+    parser.add_argument("--token-interval-ms", type=float, default=StubConfig.token_interval_ms)
+    parser.add_argument("--error-rate", type=float, default=StubConfig.error_rate)
+    parser.add_argument("--error-status", type=int, default=StubConfig.error_status, help="e.g. 500, 503 or 429")
+    parser.add_argument("--response-words", type=int, default=StubConfig.response_words)
+    parser.add_argument("--dim", type=int, default=StubConfig.dim)
+    parser.add_argument("--seed", type=int, default=StubConfig.seed)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = StubConfig(
+        chat_latency_ms=args.chat_latency_ms,
+        embedding_latency_ms=args.embedding_latency_ms,
+        latency_sigma=args.latency_sigma,
+        token_interval_ms=args.token_interval_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        response_words=args.response_words,
+        dim=args.dim,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
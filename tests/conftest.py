@@ -0,0 +1,50 @@
+"""
+Sentinel-AI — Test Setup
+Puts code/backend on sys.path and pins a throwaway dry-run configuration
+before app.config is imported: a temporary SQLite database, no provider
+key, and every optional on-disk tier (signatures, caches, traces) off.
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+_BACKEND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code", "backend")
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+_TMP = tempfile.mkdtemp(prefix="sentinel-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite+aiosqlite:///{_TMP}/sentinel.db",
+    "DATABASE_READ_URL": "",
+    "LLM_PROVIDER": "openai",
+    "OPENAI_API_KEY": "",
+    "ANALYSIS_MODE": "hybrid",
+    "SIGNATURE_INDEX_ENABLED": "false",
+    "EMBEDDING_CACHE_PATH": "",
+    "VERDICT_CACHE_PATH": "",
+    "WRITE_BEHIND_ENABLED": "false",
+    "RETENTION_ENABLED": "false",
+    "TRACE_EXPORT_PATH": "",
+    "LOG_LEVEL": "error",
+    "LOG_ASYNC": "false",
+})
+
+
+@pytest.fixture(scope="session")
+def client():
+    """The app behind a TestClient, started once (lifespan creates the tables)."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def conversation_id() -> str:
+    """A conversation id no other test uses (the database is shared by the session)."""
+    return f"test-{uuid.uuid4().hex[:12]}"
@@ -0,0 +1,64 @@
+"""
+Tests for POST /api/analyze/batch — per-conversation ordering under
+concurrent lanes, and the grouped write of buffered turns.
+"""
+
+import math
+import uuid
+
+from app.config import settings
+
+from tests.test_analyze import _analyze
+
+PROMPTS = ["hello there", "what is the weather", "tell me a joke", "summarise the news", "thanks, bye"]
+
+
+def _interleaved(conversation_ids: list[str]) -> list[dict]:
+    # Round-robin submission, so every lane has to keep its own conversation in order
+    return [
+        {"conversation_id": cid, "user_id": "batch-tester", "prompt": f"{prompt} ({cid[-4:]})"}
+        for prompt in PROMPTS
+        for cid in conversation_ids
+    ]
+
+
+def test_concurrent_conversations_keep_turn_order(client, monkeypatch):
+    monkeypatch.setattr(settings, "batch_commit_every", 3)
+    conversation_ids = [f"batch-{uuid.uuid4().hex[:12]}" for _ in range(4)]
+    items = _interleaved(conversation_ids)
+
+    response = client.post("/api/analyze/batch", json={"items": items, "concurrency": 4})
+    assert response.status_code == 200, response.text
+    body = response.json()
+
+    assert body["succeeded"] == len(items) and body["failed"] == 0
+    assert body["transactions"] == math.ceil(len(items) / 3)
+    assert [r["index"] for r in body["results"]] == list(range(len(items)))
+
+    for cid in conversation_ids:
+        results = [r["result"] for r in body["results"] if r["conversation_id"] == cid]
+        assert [r["original_prompt"] for r in results] == [f"{p} ({cid[-4:]})" for p in PROMPTS]
+        # History counts user and assistant messages, so turn k sees 2k earlier messages
+        assert [r["risk_analysis"]["drift"]["turn_number"] for r in results] == [2 * k + 1 for k in range(len(PROMPTS))]
+
+
+def test_batch_matches_one_request_per_turn(client, conversation_id):
+    batch_id = f"batch-{uuid.uuid4().hex[:12]}"
+    items = [{"conversation_id": batch_id, "user_id": "batch-tester", "prompt": p} for p in PROMPTS]
+    batched = client.post("/api/analyze/batch", json={"items": items}).json()["results"]
+
+    for prompt, item in zip(PROMPTS, batched):
+        single = _analyze(client, conversation_id, prompt).json()
+        assert item["result"]["risk_analysis"] == single["risk_analysis"]
+
+
+def test_every_buffered_turn_is_persisted(client, monkeypatch):
+    monkeypatch.setattr(settings, "batch_commit_every", 2)
+    conversation_ids = [f"batch-{uuid.uuid4().hex[:12]}" for _ in range(3)]
+    items = _interleaved(conversation_ids)
+    assert client.post("/api/analyze/batch", json={"items": items, "concurrency": 3}).json()["failed"] == 0
+
+    for cid in conversation_ids:
+        messages = client.get(f"/api/sessions/{cid}").json()["messages"]
+        assert [m["role"] for m in messages] == ["user", "assistant"] * len(PROMPTS)
+        assert [m["content"] for m in messages if m["role"] == "user"] == [f"{p} ({cid[-4:]})" for p in PROMPTS]
@@ -0,0 +1,75 @@
+"""
+Tests for app.engines.embedding.EmbeddingBatcher against a fake provider client.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.engines import embedding
+from app.engines.embedding import EmbeddingBatcher
+
+
+class FakeEmbeddings:
+    def __init__(self, respond):
+        self.respond = respond
+        self.calls: list[list[str]] = []
+
+    async def create(self, model, input):
+        self.calls.append(list(input))
+        return SimpleNamespace(data=self.respond(input))
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    def install(respond) -> FakeEmbeddings:
+        fake = FakeEmbeddings(respond)
+        monkeypatch.setattr(embedding, "get_providers", lambda: SimpleNamespace(openai=SimpleNamespace(embeddings=fake)))
+        return fake
+    return install
+
+
+async def _embed_all(batcher: EmbeddingBatcher, texts: list[str]):
+    # A hung future fails the test instead of the run
+    return await asyncio.wait_for(asyncio.gather(*(batcher.embed(t) for t in texts)), timeout=2)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_call(provider):
+    fake = provider(lambda texts: [SimpleNamespace(index=i, embedding=[float(len(t))]) for i, t in enumerate(texts)])
+    batcher = EmbeddingBatcher(max_items=16, max_wait_ms=5)
+
+    vectors = await _embed_all(batcher, ["a", "bb", "a", "cccc"])
+
+    assert vectors == [[1.0], [2.0], [1.0], [4.0]]
+    assert fake.calls == [["a", "bb", "cccc"]]  # identical texts share a slot
+    assert batcher.stats()["failures"] == 0
+
+
+@pytest.mark.asyncio
+async def test_malformed_response_resolves_every_caller(provider):
+    # Items without an `index` used to raise out of the detached send task and leave callers waiting forever
+    fake = provider(lambda texts: [SimpleNamespace(embedding=[1.0]) for _ in texts])
+    batcher = EmbeddingBatcher(max_items=16, max_wait_ms=5)
+
+    vectors = await _embed_all(batcher, ["one", "two", "three"])
+
+    assert vectors == [None, None, None]
+    assert len(fake.calls) == 4  # the batch, then each item on its own
+    assert batcher.stats()["failures"] == 3
+
+
+@pytest.mark.asyncio
+async def test_one_bad_item_only_fails_itself(provider):
+    def respond(texts):
+        if len(texts) > 1 or texts[0] == "bad":
+            raise ValueError("invalid input")
+        return [SimpleNamespace(index=0, embedding=[float(len(texts[0]))])]
+
+    provider(respond)
+    batcher = EmbeddingBatcher(max_items=3, max_wait_ms=1000)
+
+    vectors = await _embed_all(batcher, ["ok", "bad", "fine"])
+
+    assert vectors == [[2.0], None, [4.0]]
@@ -0,0 +1,108 @@
+"""
+Tests for GET /api/sessions — keyset pagination over (created_at, id).
+"""
+
+import base64
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.models.db_models import Conversation
+
+T0 = datetime(2026, 1, 15, 12, 0, 0)
+
+
+@pytest.fixture
+def insert_conversations(client):
+    """Insert conversation rows with chosen timestamps straight into the test database."""
+    url = os.environ["DATABASE_URL"].replace("sqlite+aiosqlite", "sqlite")
+    engine = create_engine(url)
+
+    def insert(user_id: str, timestamps: list[datetime]) -> list[tuple[datetime, str]]:
+        rows = [(ts, f"conv-{uuid.uuid4().hex[:12]}") for ts in timestamps]
+        with Session(engine) as db:
+            db.add_all(
+                Conversation(id=cid, user_id=user_id, created_at=ts, embedding_count=0, message_count=0)
+                for ts, cid in rows
+            )
+            db.commit()
+        return rows
+
+    yield insert
+    engine.dispose()
+
+
+def _pages(client, user_id: str, limit: int) -> list[dict]:
+    pages, cursor = [], None
+    while True:
+        params = {"user_id": user_id, "limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/sessions", params=params)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        pages.append(page)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def _user() -> str:
+    return f"user-{uuid.uuid4().hex[:12]}"
+
+
+def test_cursor_walks_every_row_once_across_timestamp_ties(client, insert_conversations):
+    user_id = _user()
+    # Three rows share one timestamp, so a page boundary falls inside the tie
+    timestamps = [T0 + timedelta(seconds=1)] * 2 + [T0] * 3 + [T0 - timedelta(seconds=1)] * 2
+    rows = insert_conversations(user_id, timestamps)
+    expected = [cid for _, cid in sorted(rows, reverse=True)]
+
+    pages = _pages(client, user_id, limit=2)
+    seen = [s["id"] for page in pages for s in page["sessions"]]
+    assert seen == expected
+    assert [len(page["sessions"]) for page in pages] == [2, 2, 2, 1]
+    assert all(s["user_id"] == user_id for page in pages for s in page["sessions"])
+
+
+def test_last_page_has_no_cursor(client, insert_conversations):
+    user_id = _user()
+    insert_conversations(user_id, [T0 - timedelta(minutes=i) for i in range(4)])
+
+    pages = _pages(client, user_id, limit=2)
+    # An exact multiple of the page size ends without an empty extra page
+    assert [len(page["sessions"]) for page in pages] == [2, 2]
+    assert pages[-1]["next_cursor"] is None
+
+
+def test_single_page_and_empty_result(client, insert_conversations):
+    user_id = _user()
+    [(_, cid)] = insert_conversations(user_id, [T0])
+
+    [page] = _pages(client, user_id, limit=50)
+    assert [s["id"] for s in page["sessions"]] == [cid]
+    assert page["next_cursor"] is None
+    assert _pages(client, _user(), limit=50) == [{"sessions": [], "next_cursor": None}]
+
+
+def _b64(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode("utf-8")).decode("ascii")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    "é",
+    base64.urlsafe_b64encode(b"not json").decode("ascii"),
+    _b64(["2026-01-15T12:00:00"]),
+    _b64(["yesterday", "conv-1"]),
+    _b64({"created_at": "2026-01-15T12:00:00", "id": "conv-1"}),
+])
+def test_malformed_cursor_is_rejected(client, cursor):
+    response = client.get("/api/sessions", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,120 @@
+"""
+Tests for app.utils.stages — the DAG scheduler behind /api/analyze.
+"""
+
+import asyncio
+
+import pytest
+
+from app.utils.stages import Stage, StageGraph, current_stage
+
+
+def test_stages_are_ordered_after_their_dependencies():
+    # Declared out of order on purpose
+    graph = StageGraph([
+        Stage("score", lambda red, blue: red + blue, deps=("red", "blue")),
+        Stage("blue", lambda red: red * 10, deps=("red",)),
+        Stage("red", lambda: 1),
+    ])
+    order = [stage.name for stage in graph.stages]
+    assert order.index("red") < order.index("blue") < order.index("score")
+
+
+def test_seed_inputs_satisfy_dependencies():
+    graph = StageGraph([Stage("double", lambda prompt: prompt * 2, deps=("prompt",))], inputs=("prompt",))
+    run = asyncio.run(graph.run(prompt="ab"))
+    assert run["double"] == "abab"
+    assert run["prompt"] == "ab"
+
+
+def test_missing_seed_input_is_rejected():
+    graph = StageGraph([Stage("double", lambda prompt: prompt * 2, deps=("prompt",))], inputs=("prompt",))
+    with pytest.raises(ValueError, match="Missing pipeline inputs"):
+        asyncio.run(graph.run())
+
+
+def test_cycle_is_rejected():
+    with pytest.raises(ValueError, match="cycle"):
+        StageGraph([
+            Stage("a", lambda c: c, deps=("c",)),
+            Stage("b", lambda a: a, deps=("a",)),
+            Stage("c", lambda b: b, deps=("b",)),
+        ])
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError, match="unknown stage 'missing'"):
+        StageGraph([Stage("a", lambda missing: missing, deps=("missing",))])
+
+
+def test_duplicate_stage_name_is_rejected():
+    with pytest.raises(ValueError, match="Duplicate stage name"):
+        StageGraph([Stage("a", lambda: 1), Stage("a", lambda: 2)])
+
+
+def test_results_flow_through_sync_and_async_stages():
+    async def embed(prompt):
+        await asyncio.sleep(0)
+        return len(prompt)
+
+    graph = StageGraph([
+        Stage("embed", embed, deps=("prompt",)),
+        Stage("scan", lambda prompt: prompt.upper(), deps=("prompt",)),
+        Stage("score", lambda embed, scan: f"{scan}:{embed}", deps=("embed", "scan")),
+    ], inputs=("prompt",))
+    run = asyncio.run(graph.run(prompt="hi"))
+    assert run["score"] == "HI:2"
+    assert set(run.timings) == {"embed", "scan", "score"}
+    assert run.timings["score"].start_ms >= run.timings["embed"].start_ms + run.timings["embed"].duration_ms
+
+
+def test_independent_stages_run_concurrently():
+    async def wait():
+        await asyncio.sleep(0.1)
+
+    graph = StageGraph([Stage(name, wait) for name in ("a", "b", "c", "d")])
+    run = asyncio.run(graph.run())
+    # Sequentially this would take 400 ms
+    assert run.total_ms < 300
+
+
+def test_failure_cancels_running_stages_and_skips_dependents():
+    events = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            events.append("slow cancelled")
+            raise
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    def after(boom):
+        events.append("dependent ran")
+
+    graph = StageGraph([Stage("slow", slow), Stage("boom", boom), Stage("after", after, deps=("boom",))])
+
+    async def main():
+        with pytest.raises(RuntimeError, match="provider down"):
+            await graph.run()
+        # Nothing is left running on the loop
+        return [t for t in asyncio.all_tasks() if t.get_name().startswith("stage:")]
+
+    leftover = asyncio.run(main())
+    assert events == ["slow cancelled"]
+    assert leftover == []
+
+
+def test_current_stage_names_the_running_stage():
+    async def which():
+        await asyncio.sleep(0)
+        return current_stage.get()
+
+    graph = StageGraph([Stage("memory", which), Stage("embed", which)])
+    run = asyncio.run(graph.run())
+    assert run["memory"] == "memory"
+    assert run["embed"] == "embed"
+    assert current_stage.get() is None
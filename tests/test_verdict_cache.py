@@ -0,0 +1,62 @@
+"""
+Tests for app.engines.verdict_cache — hit counts survive the disk tier.
+"""
+
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.engines.verdict_cache import VerdictCache, VerdictEntry
+from app.models.schemas import RiskAnalysis
+
+
+@pytest.fixture
+def make_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "verdict_cache_path", str(tmp_path / "verdicts.db"))
+
+    def make(size: int = 8) -> VerdictCache:
+        monkeypatch.setattr(settings, "verdict_cache_size", size)
+        return VerdictCache()
+    return make
+
+
+def _entry() -> VerdictEntry:
+    return VerdictEntry(RiskAnalysis(final_score=12.0, action="allow"), "benign", "llm")
+
+
+def test_entry_round_trips_hits():
+    entry = _entry()
+    entry.hits = 7
+    restored = VerdictEntry.from_json(entry.to_json())
+    assert restored.hits == 7
+    assert restored.risk == entry.risk
+
+
+async def _hit(cache: VerdictCache, key: str, times: int):
+    for _ in range(times):
+        assert await cache.get(key) is not None
+
+
+@pytest.mark.asyncio
+async def test_hits_survive_restart(make_cache):
+    cache = make_cache()
+    await cache.put("k", _entry())
+    await _hit(cache, "k", 3)
+    await asyncio.to_thread(cache.close)
+
+    reopened = make_cache()
+    entry = await reopened.get("k")  # loaded from disk, counts as a hit itself
+    assert entry.hits == 4
+    reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_hits_survive_memory_eviction(make_cache):
+    cache = make_cache(size=1)
+    await cache.put("a", _entry())
+    await _hit(cache, "a", 2)
+    await cache.put("b", _entry())  # evicts "a" from memory
+
+    assert (await cache.get("a")).hits == 3
+    cache.close()
@@ -0,0 +1,246 @@
+"""
+Tests for app.engines.write_behind against an in-memory SQLite database:
+read-your-writes through the overlay, retries and dead letters, discard
+during a flush, and the drain on shutdown.
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.engines import write_behind
+from app.engines.memory import BufferedTurn, ConversationState, load_conversation_state
+from app.engines.write_behind import WriteBehindQueue
+from app.models.db_models import Message
+
+CID = "wb-conversation"
+
+
+@pytest_asyncio.fixture
+async def session(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(write_behind, "async_session", factory)
+    yield factory
+    await engine.dispose()
+
+
+def _queue(**overrides) -> WriteBehindQueue:
+    options = {"batch_size": 100, "flush_ms": 1, "max_pending": 1000, "max_attempts": 3}
+    return WriteBehindQueue(**{**options, **overrides})
+
+
+def _turn(vector: list[float], prompt: str = "hello", conversation_id: str = CID) -> BufferedTurn:
+    return BufferedTurn(conversation_id, prompt, "reply", np.array(vector), 0.0, 0.0, "allow", {}, {})
+
+
+async def _read(queue: WriteBehindQueue, session, conversation_id: str = CID):
+    """What /analyze sees: the overlay snapshot first, then the database."""
+    overlay = queue.snapshot(conversation_id)
+    async with session() as db:
+        if overlay is not None and overlay.inserting:
+            state = ConversationState(conversation_id, None, 0, [])
+        else:
+            state = await load_conversation_state(db, conversation_id, "tester", create=False)
+    if overlay is None:
+        return state.history, state.centroid()
+    return overlay.merge_history(state.history), overlay.centroid(state)
+
+
+async def _stored(session, conversation_id: str = CID) -> list[str]:
+    async with session() as db:
+        rows = await db.execute(
+            select(Message.content)
+            .where(Message.conversation_id == conversation_id, Message.role == "user")
+            .order_by(Message.created_at)
+        )
+        return list(rows.scalars())
+
+
+async def _seed(queue: WriteBehindQueue, session, *turns: BufferedTurn):
+    queue.create_conversation(CID, "tester")
+    for turn in turns:
+        await queue.enqueue(turn)
+    await queue.flush()
+
+
+@pytest.mark.asyncio
+async def test_queued_turns_are_readable_before_the_flush(session):
+    queue = _queue()
+    queue.create_conversation(CID, "tester")
+    await queue.enqueue(_turn([1.0, 0.0], "first"))
+    await queue.enqueue(_turn([0.0, 1.0], "second"))
+
+    history, centroid = await _read(queue, session)
+    assert [m["content"] for m in history] == ["first", "reply", "second", "reply"]
+    assert np.allclose(centroid, [0.5, 0.5])
+    assert await _stored(session) == []
+
+    assert await queue.flush() == 2
+    assert CID not in queue
+    history, centroid = await _read(queue, session)
+    assert [m["content"] for m in history] == ["first", "reply", "second", "reply"]
+    assert np.allclose(centroid, [0.5, 0.5])
+
+
+@pytest.mark.asyncio
+async def test_turn_flushed_while_a_request_runs_still_counts(session):
+    queue = _queue()
+    await _seed(queue, session, _turn([3.0, 0.0], "t1"))
+
+    # Request A reads the row (one turn), then spends seconds in the LLM...
+    await _read(queue, session)
+    # ...while request B's turn is queued and flushed, which drops the overlay
+    await queue.enqueue(_turn([0.0, 3.0], "t2"))
+    await queue.flush()
+    assert CID not in queue
+    # A's turn re-creates the overlay; the next read must include B's turn
+    await queue.enqueue(_turn([0.0, 0.0], "t3"))
+
+    history, centroid = await _read(queue, session)
+    assert [m["content"] for m in history if m["role"] == "user"] == ["t1", "t2", "t3"]
+    assert np.allclose(centroid, [1.0, 1.0])
+
+
+@pytest.mark.asyncio
+async def test_flush_between_snapshot_and_read_is_not_double_counted(session):
+    queue = _queue()
+    await _seed(queue, session, _turn([2.0, 0.0], "t1"))
+    await queue.enqueue(_turn([0.0, 2.0], "t2"))
+    await queue.enqueue(_turn([0.0, 2.0], "t3"))
+
+    overlay = queue.snapshot(CID)
+    queue.batch_size = 1
+    await queue.flush()  # commits t2 and t3 after the snapshot
+    await queue.enqueue(_turn([2.0, 0.0], "t4"))  # not in the snapshot
+    async with session() as db:
+        state = await load_conversation_state(db, CID, "tester", create=False)
+
+    history = overlay.merge_history(state.history)
+    assert [m["content"] for m in history if m["role"] == "user"] == ["t1", "t2", "t3"]
+    assert np.allclose(overlay.centroid(state), [2 / 3, 4 / 3])
+
+
+@pytest.mark.asyncio
+async def test_failing_batch_is_retried_then_bad_row_dead_lettered(session, monkeypatch):
+    real_write_turns = write_behind.write_turns
+    calls = []
+
+    async def write_turns(db, turns):
+        calls.append([t.prompt for t in turns])
+        if any(t.prompt == "poison" for t in turns):
+            raise RuntimeError("constraint failed")
+        await real_write_turns(db, turns)
+
+    monkeypatch.setattr(write_behind, "write_turns", write_turns)
+    queue = _queue(max_attempts=3)
+    queue.create_conversation(CID, "tester")
+    for prompt in ("ok-1", "poison", "ok-2"):
+        await queue.enqueue(_turn([1.0, 1.0], prompt))
+
+    for _ in range(queue.max_attempts):
+        await queue.flush()
+        assert len(queue) in (0, 3)
+        await asyncio.sleep(0.05)  # past the backoff
+
+    assert queue.failures == 3
+    assert queue.dead_letters == 1
+    assert calls[-3:] == [["ok-1"], ["poison"], ["ok-2"]]  # one transaction per row after the last attempt
+    assert len(queue) == 0 and CID not in queue
+    assert await _stored(session) == ["ok-1", "ok-2"]
+
+
+@pytest.mark.asyncio
+async def test_retry_waits_for_the_backoff(session, monkeypatch):
+    async def write_turns(db, turns):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(write_behind, "write_turns", write_turns)
+    queue = _queue(flush_ms=1000)
+    await queue.enqueue(_turn([1.0], "t1"))
+
+    await queue.flush()
+    await queue.flush()  # still inside the 2 s backoff: no second attempt
+    assert queue.failures == 1
+    assert len(queue) == 1
+
+
+@pytest.mark.asyncio
+async def test_discard_waits_for_a_running_flush(session, monkeypatch):
+    real_write_turns = write_behind.write_turns
+    writing, release = asyncio.Event(), asyncio.Event()
+
+    async def write_turns(db, turns):
+        writing.set()
+        await release.wait()
+        await real_write_turns(db, turns)
+
+    queue = _queue(batch_size=1)
+    await _seed(queue, session)  # the conversation row, written up front
+    monkeypatch.setattr(write_behind, "write_turns", write_turns)
+    await queue.enqueue(_turn([1.0], "t1"))
+    await queue.enqueue(_turn([1.0], "t2"))
+
+    flush = asyncio.create_task(queue.flush())
+    await writing.wait()
+    discard = asyncio.create_task(queue.discard(CID))
+    await asyncio.sleep(0.01)
+    assert not discard.done()  # blocked on the flush lock
+
+    release.set()
+    # The flush runs to the end of the queue before discard gets the lock
+    assert await flush == 2
+    assert await discard == 0
+    assert len(queue) == 0 and CID not in queue
+
+
+@pytest.mark.asyncio
+async def test_discard_drops_queued_turns(session):
+    queue = _queue()
+    await _seed(queue, session, _turn([1.0], "t1"))
+    await queue.enqueue(_turn([1.0], "t2"))
+    await queue.enqueue(_turn([1.0], "other", conversation_id="wb-other"))
+
+    assert await queue.discard(CID) == 1
+    assert CID not in queue
+    assert len(queue) == 1
+    await queue.flush()
+    assert await _stored(session) == ["t1"]
+
+
+@pytest.mark.asyncio
+async def test_drain_writes_everything_and_stops_the_flusher(session):
+    queue = _queue(flush_ms=60_000)  # the timer never fires during the test
+    queue.start()
+    queue.create_conversation(CID, "tester")
+    for i in range(5):
+        await queue.enqueue(_turn([float(i)], f"t{i}"))
+
+    await queue.drain()
+    assert queue._task is None
+    assert len(queue) == 0 and CID not in queue
+    assert await _stored(session) == [f"t{i}" for i in range(5)]
+    assert queue.stats()["written"] == 5
+
+
+@pytest.mark.asyncio
+async def test_drain_dead_letters_instead_of_hanging(session, monkeypatch):
+    async def write_turns(db, turns):
+        raise RuntimeError("disk I/O error")
+
+    monkeypatch.setattr(write_behind, "write_turns", write_turns)
+    queue = _queue(flush_ms=60_000, max_attempts=2)
+    queue.start()
+    await queue.enqueue(_turn([1.0], "t1"))
+
+    await asyncio.wait_for(queue.drain(), timeout=2)
+    assert len(queue) == 0
+    assert queue.dead_letters == 1